@@ -45,55 +45,16 @@ class JobBidSerializer(serializers.ModelSerializer):
         Returns:
             dict: Contains average rating, review count, and verification status.
         """
-        from django.db.models import Avg, Count
+        from recommendations.services.cleaner_stats import CleanerStatsService
         
-        # Check if reviews model is available
-        try:
-            from reviews.models import Review
-            
-            # Get reviews for this cleaner
-            reviews = Review.objects.filter(reviewee=obj.cleaner)
-            if not reviews.exists():
-                return {
-                    'avg_rating': None,
-                    'review_count': 0,
-                    'is_verified': getattr(obj.cleaner, 'is_verified_cleaner', False),
-                    'jobs_completed': 0,
-                }
-            
-            # Calculate review statistics
-            stats = reviews.aggregate(
-                avg_rating=Avg('overall_rating'),
-                review_count=Count('id')
-            )
-            
-            # Count completed jobs
-            from .models import CleaningJob
-            completed_jobs = CleaningJob.objects.filter(
-                cleaner=obj.cleaner,
-                status='completed'
-            ).count()
-            
-            return {
-                'avg_rating': round(stats['avg_rating'], 1) if stats['avg_rating'] else None,
-                'review_count': stats['review_count'],
-                'is_verified': getattr(obj.cleaner, 'is_verified_cleaner', False),
-                'jobs_completed': completed_jobs,
-            }
-        except ImportError:
-            # Reviews model not available, return minimal data
-            from .models import CleaningJob
-            completed_jobs = CleaningJob.objects.filter(
-                cleaner=obj.cleaner,
-                status='completed'
-            ).count()
-            
-            return {
-                'avg_rating': None,
-                'review_count': 0,
-                'is_verified': getattr(obj.cleaner, 'is_verified_cleaner', False),
-                'jobs_completed': completed_jobs,
-            }
+        stats = CleanerStatsService.get_stats(obj.cleaner)
+        
+        return {
+            'avg_rating': round(stats.avg_rating, 1) if stats.avg_rating else None,
+            'review_count': stats.review_count,
+            'is_verified': getattr(obj.cleaner, 'is_verified_cleaner', False),
+            'jobs_completed': stats.completed_jobs,
+        }
 
 
 class CleaningJobSerializer(serializers.ModelSerializer):
@@ -8,7 +8,7 @@ from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.db import transaction
 from .models import CleaningJob, JobBid
-from core.events import event_publisher
+from core.outbox import event_outbox
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,12 +58,12 @@ def _handle_job_save(job, created):
             }
             
             # Publish job_created event
-            event_publisher.publish_event(
+            event_outbox.publish_event(
                 topic='jobs',
                 event_type='job_created',
                 data=job_data
             )
-            logger.info(f"Published job_created event for job {job.id}")
+            logger.info(f"Queued job_created event for job {job.id}")
         
         else:
             # Job updated - check for status changes
@@ -93,37 +93,32 @@ def _handle_job_save(job, created):
                     }
                     
                     # Publish status change event
-                    event_publisher.publish_event(
-                        topic='jobs',
-                        event_type='job_status_changed',
-                        data=job_data
-                    )
+                    events = [{
+                        'topic': 'jobs',
+                        'event_type': 'job_status_changed',
+                        'data': job_data,
+                    }]
                     
                     # Publish specific events based on new status
+                    specific_event = None
                     if job.status == 'bid_accepted' and job.cleaner:
-                        event_publisher.publish_event(
-                            topic='jobs',
-                            event_type='job_accepted',
-                            data=job_data
-                        )
+                        specific_event = 'job_accepted'
                     elif job.status == 'in_progress':
-                        event_publisher.publish_event(
-                            topic='jobs',
-                            event_type='job_started',
-                            data=job_data
-                        )
+                        specific_event = 'job_started'
                     elif job.status == 'completed':
-                        event_publisher.publish_event(
-                            topic='jobs',
-                            event_type='job_completed',
-                            data=job_data
-                        )
+                        specific_event = 'job_completed'
                     elif job.status == 'cancelled':
-                        event_publisher.publish_event(
-                            topic='jobs',
-                            event_type='job_cancelled',
-                            data=job_data
-                        )
+                        specific_event = 'job_cancelled'
+                    
+                    if specific_event:
+                        events.append({
+                            'topic': 'jobs',
+                            'event_type': specific_event,
+                            'data': job_data,
+                        })
+                    
+                    # Queued together, so the worker publishes both in one batch
+                    event_outbox.publish_events(events)
                     
             except CleaningJob.DoesNotExist:
                 # This shouldn't happen, but handle gracefully
@@ -183,13 +178,13 @@ def _handle_bid_save(bid, created):
             }
             
             # Publish bid_received event
-            event_publisher.publish_event(
+            event_outbox.publish_event(
                 topic='jobs',
                 event_type='bid_received',
                 data=bid_data,
                 user_id=bid.job.client.id if bid.job.client else None
             )
-            logger.info(f"Published bid_received event for bid {bid.id}")
+            logger.info(f"Queued bid_received event for bid {bid.id}")
         
         else:
             # Bid updated - check for status changes
@@ -218,7 +213,7 @@ def _handle_bid_save(bid, created):
                     
                     if bid.status == 'accepted':
                         # Notify the cleaner their bid was accepted
-                        event_publisher.publish_event(
+                        event_outbox.publish_event(
                             topic='jobs',
                             event_type='bid_accepted',
                             data=bid_data,
@@ -226,7 +221,7 @@ def _handle_bid_save(bid, created):
                         )
                     elif bid.status == 'rejected':
                         # Notify the cleaner their bid was rejected
-                        event_publisher.publish_event(
+                        event_outbox.publish_event(
                             topic='jobs',
                             event_type='bid_rejected',
                             data=bid_data,
@@ -0,0 +1,132 @@
+"""
+Worker-pool dispatcher for the event subscriber.
+
+The subscriber's receive loop hands each event to an EventDispatcher instead
+of processing it inline. Events are queued per topic and run on a shared
+thread pool, with at most `topic_concurrency[topic]` events of a topic in
+flight at once, so a slow topic (e.g. a job broadcast creating hundreds of
+notifications) can no longer hold chat and payment events behind it.
+
+- A topic limit of 1 keeps that topic's events strictly in order.
+- At most `max_pending` events may be queued or running in total; beyond
+  that dispatch() blocks the receive loop (backpressure).
+
+Threads rather than processes: handlers spend their time in the database
+and the channel layer, and each worker thread keeps its own DB connection.
+"""
+
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher:
+    """
+    Per-topic queues in front of a thread pool.
+    
+    Usage:
+        dispatcher = EventDispatcher(subscriber.handle_event, workers=8, topic_concurrency={'jobs': 2})
+        dispatcher.dispatch(message_json, on_done=lambda ok: ack(entry_id) if ok else None)
+    
+    The handler reports failure by raising or returning False; on_done
+    receives whether the event was handled.
+    """
+    
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Optional[bool]],
+        workers: int = 4,
+        topic_concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.topic_concurrency = topic_concurrency or {}
+        self.default_concurrency = default_concurrency or workers
+        
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='event-worker')
+        self._lock = threading.Lock()
+        self._queues = defaultdict(deque)   # topic -> waiting (event, on_done)
+        self._in_flight = defaultdict(int)  # topic -> running count
+        self._capacity = threading.BoundedSemaphore(max_pending or workers * 100)
+    
+    def limit_for(self, topic: str) -> int:
+        return self.topic_concurrency.get(topic, self.default_concurrency)
+    
+    def dispatch(self, event_data: str, on_done: Optional[Callable[[bool], None]] = None) -> None:
+        """
+        Queue a raw event message for processing.
+        
+        Args:
+            event_data: JSON event message
+            on_done: Called from the worker with True once the event was
+                handled or False if it failed, e.g. to acknowledge a stream
+                entry. Unparseable messages are reported as handled, since
+                retrying cannot fix them.
+        """
+        try:
+            event = json.loads(event_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON in event data: {e}")
+            if on_done:
+                on_done(True)
+            return
+        
+        self.dispatch_event(event, on_done)
+    
+    def dispatch_event(self, event: Dict[str, Any], on_done: Optional[Callable[[bool], None]] = None) -> None:
+        """Queue an already decoded event (see dispatch)."""
+        self._capacity.acquire()
+        
+        topic = event.get('topic')
+        with self._lock:
+            if self._in_flight[topic] < self.limit_for(topic):
+                self._in_flight[topic] += 1
+                self._executor.submit(self._run, topic, event, on_done)
+            else:
+                self._queues[topic].append((event, on_done))
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Running and queued events per topic."""
+        with self._lock:
+            topics = set(self._in_flight) | set(self._queues)
+            return {
+                topic: {'running': self._in_flight[topic], 'queued': len(self._queues[topic])}
+                for topic in topics
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+    
+    def _run(self, topic: str, event: Dict[str, Any], on_done: Optional[Callable[[bool], None]]) -> None:
+        ok = False
+        try:
+            ok = self.handler(event) is not False
+        except Exception as e:
+            logger.error(f"Error handling {topic} event {event.get('event_type')}: {e}", exc_info=True)
+        finally:
+            if on_done:
+                try:
+                    on_done(ok)
+                except Exception as e:
+                    logger.error(f"Error completing {topic} event {event.get('event_type')}: {e}")
+            close_old_connections()
+            self._capacity.release()
+            self._start_next(topic)
+    
+    def _start_next(self, topic: str) -> None:
+        """Hand the topic's next waiting event to the pool, or free its slot."""
+        with self._lock:
+            if self._queues[topic]:
+                event, on_done = self._queues[topic].popleft()
+                self._executor.submit(self._run, topic, event, on_done)
+            else:
+                self._in_flight[topic] -= 1
@@ -9,19 +9,39 @@ Key Features:
 - User-specific event targeting
 - Error handling and logging
 - Event payload standardization
+- Pipelined publishing: all channels of one or many events in one round trip
+- Optional durable transport: with EVENT_TRANSPORT = 'streams', topic events
+  are appended to Redis Streams (XADD) and consumed through consumer groups
+  (see EventSubscriber.consume_streams), so events published while no
+  subscriber is running are kept and replayed. User channels stay Pub/Sub.
 """
 
 import json
 import redis
 import logging
+import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
+def get_event_transport() -> str:
+    """'pubsub' (default) or 'streams'."""
+    return getattr(settings, 'EVENT_TRANSPORT', 'pubsub')
+
+
+def get_streams_config() -> Dict[str, Any]:
+    return getattr(settings, 'EVENT_STREAMS', {})
+
+
+def stream_key(topic: str) -> str:
+    """Redis Stream holding a topic's events (streams transport)."""
+    return f'stream:{topic}'
+
+
 class EventPublisher:
     """
     Centralized event publisher for Pub/Sub messaging.
@@ -101,54 +121,123 @@ class EventPublisher:
         Returns:
             bool: True if event was published successfully, False otherwise
         """
+        return self.publish_events([{
+            'topic': topic,
+            'event_type': event_type,
+            'data': data,
+            'user_id': user_id,
+            'target_users': target_users,
+        }])
+    
+    def publish_events(self, events: List[Dict[str, Any]], raise_errors: bool = False) -> bool:
+        """
+        Publish many events with a single Redis round trip.
+        
+        Every PUBLISH (topic channel, user channel and one per target user,
+        for every event) is sent in one non-transactional pipeline. With the
+        streams transport the topic message is an XADD to the topic stream
+        (trimmed to about EVENT_STREAMS['maxlen'] entries) instead.
+        
+        Args:
+            events: List of dicts with the publish_event arguments
+                ('topic', 'event_type', 'data', optional 'user_id',
+                'target_users', 'timestamp' and 'event_id')
+            raise_errors: Raise instead of logging and returning False
+                (redis.RedisError when Redis is unavailable, anything else
+                for bad events), so callers can tell the two apart
+            
+        Returns:
+            bool: True if all events were published successfully, False otherwise
+        """
+        if not events:
+            return True
+        
         self._ensure_connection()
         
         if not self.redis_client:
+            if raise_errors:
+                raise redis.ConnectionError("Redis connection not available")
             logger.error("Redis connection not available, cannot publish event")
             return False
         
-        event_message = {
-            'topic': topic,
-            'event_type': event_type,
-            'data': data,
-            'user_id': user_id,
-            'target_users': target_users,
-            'timestamp': timezone.now().isoformat(),
-            'event_id': self._generate_event_id()
-        }
+        event_types = ', '.join(event['event_type'] for event in events)
         
         try:
-            message_json = json.dumps(event_message)
-            
-            # Publish to topic-specific channel
-            topic_channel = f'topic:{topic}'
-            subscribers = self.redis_client.publish(topic_channel, message_json)
+            messages = [self._build_message(**event) for event in events]
+            use_streams = get_event_transport() == 'streams'
+            maxlen = get_streams_config().get('maxlen', 100000)
             
-            # Publish to user-specific channels if specified
-            if user_id:
-                user_channel = f'user:{user_id}'
-                self.redis_client.publish(user_channel, message_json)
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for event, (channels, message_json) in zip(events, messages):
+                if use_streams:
+                    # Topic channel -> durable stream entry
+                    pipeline.xadd(stream_key(event['topic']), {'event': message_json}, maxlen=maxlen, approximate=True)
+                    channels = channels[1:]
+                for channel in channels:
+                    pipeline.publish(channel, message_json)
+            results = pipeline.execute()
             
-            # Publish to multiple specific users if specified
-            if target_users:
-                for uid in target_users:
-                    user_channel = f'user:{uid}'
-                    self.redis_client.publish(user_channel, message_json)
-            
-            logger.info(
-                f"Published event '{event_type}' to topic '{topic}' "
-                f"(subscribers: {subscribers}, user_id: {user_id})"
-            )
+            # The first command of each event targets its topic (subscriber count or stream entry ID)
+            offset = 0
+            for event, (channels, _) in zip(events, messages):
+                delivery = f'stream entry: {results[offset]}' if use_streams else f'subscribers: {results[offset]}'
+                logger.info(
+                    f"Published event '{event['event_type']}' to topic '{event['topic']}' "
+                    f"({delivery}, user_id: {event.get('user_id')}, "
+                    f"channels: {len(channels)})"
+                )
+                offset += len(channels)
             
             return True
             
         except redis.RedisError as e:
-            logger.error(f"Redis error publishing event {event_type}: {e}")
+            if raise_errors:
+                raise
+            logger.error(f"Redis error publishing event {event_types}: {e}")
             return False
         except Exception as e:
-            logger.error(f"Failed to publish event {event_type}: {e}")
+            if raise_errors:
+                raise
+            logger.error(f"Failed to publish event {event_types}: {e}")
             return False
     
+    def _build_message(
+        self,
+        topic: str,
+        event_type: str,
+        data: Dict[str, Any],
+        user_id: Optional[int] = None,
+        target_users: Optional[list] = None,
+        timestamp: Optional[str] = None,
+        event_id: Optional[str] = None
+    ) -> Tuple[List[str], str]:
+        """
+        Serialize an event and list the channels it goes to.
+        
+        timestamp and event_id default to now / a new ID; the outbox passes
+        the values captured when the event was queued.
+        
+        Returns:
+            (channels, message_json): topic channel first, then each user
+            channel once
+        """
+        event_message = {
+            'topic': topic,
+            'event_type': event_type,
+            'data': data,
+            'user_id': user_id,
+            'target_users': target_users,
+            'timestamp': timestamp or timezone.now().isoformat(),
+            'event_id': event_id or self._generate_event_id()
+        }
+        
+        # Publish to topic-specific channel, then user-specific channels
+        channels = [f'topic:{topic}']
+        user_ids = ([user_id] if user_id else []) + list(target_users or [])
+        channels.extend(dict.fromkeys(f'user:{uid}' for uid in user_ids))
+        
+        return channels, json.dumps(event_message)
+    
     def publish_job_event(self, event_type: str, job_data: Dict[str, Any]) -> bool:
         """
         Convenience method for publishing job-related events.
@@ -216,7 +305,8 @@ class EventPublisher:
     
     def _generate_event_id(self) -> str:
         """Generate unique event ID for tracking."""
-        return f"evt_{int(timezone.now().timestamp() * 1000000)}"
+        # Random suffix: events of one batch share the same microsecond
+        return f"evt_{int(timezone.now().timestamp() * 1000000)}_{uuid.uuid4().hex[:8]}"
     
     def health_check(self) -> bool:
         """
@@ -252,4 +342,16 @@ def publish_event(topic: str, event_type: str, data: Dict[str, Any], **kwargs) -
     Returns:
         bool: True if published successfully
     """
-    return event_publisher.publish_event(topic, event_type, data, **kwargs)
\ No newline at end of file
+    return event_publisher.publish_event(topic, event_type, data, **kwargs)
+
+def publish_events(events: List[Dict[str, Any]]) -> bool:
+    """
+    Global function for publishing many events in one round trip.
+    
+    Args:
+        events: List of dicts with publish_event arguments
+        
+    Returns:
+        bool: True if all events were published successfully
+    """
+    return event_publisher.publish_events(events)
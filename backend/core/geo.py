@@ -0,0 +1,69 @@
+"""
+Vectorized great-circle distance utilities.
+
+Single haversine implementation shared by location search, service area
+checks, recommendation scoring and training-data preparation. Every function
+accepts scalars, lists, Decimals or NumPy arrays and broadcasts with NumPy,
+so scoring paths can compute distances for whole candidate sets at once.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+EARTH_RADIUS_MI = 3956.0
+
+
+def _earth_radius(unit):
+    """Earth radius in 'km' (default) or 'mi'."""
+    return EARTH_RADIUS_MI if unit == 'mi' else EARTH_RADIUS_KM
+
+
+def _to_radians(values):
+    return np.radians(np.asarray(values, dtype=np.float64))
+
+
+def haversine(lat1, lon1, lat2, lon2, unit='km'):
+    """
+    Element-wise great-circle distance between (lat1, lon1) and (lat2, lon2).
+    
+    Args:
+        lat1, lon1: First point(s) in decimal degrees
+        lat2, lon2: Second point(s) in decimal degrees
+        unit: 'km' for kilometers (default) or 'mi' for miles
+    
+    Returns:
+        NumPy array (or 0-d array for scalar inputs) of distances in unit
+    """
+    lat1, lon1, lat2, lon2 = (_to_radians(v) for v in (lat1, lon1, lat2, lon2))
+    
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    # Clip guards against tiny floating point overshoot above 1
+    return 2 * _earth_radius(unit) * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distances_from_point(latitude, longitude, latitudes, longitudes, unit='km'):
+    """
+    One-to-many distances from a single point.
+    
+    Returns:
+        1-D array with one distance per (latitudes[i], longitudes[i])
+    """
+    return np.atleast_1d(haversine(latitude, longitude, latitudes, longitudes, unit=unit))
+
+
+def distance_matrix(latitudes1, longitudes1, latitudes2, longitudes2, unit='km'):
+    """
+    Many-to-many distances.
+    
+    Returns:
+        2-D array of shape [len(latitudes1), len(latitudes2)]
+    """
+    lat1 = np.asarray(latitudes1, dtype=np.float64)[:, np.newaxis]
+    lon1 = np.asarray(longitudes1, dtype=np.float64)[:, np.newaxis]
+    lat2 = np.asarray(latitudes2, dtype=np.float64)[np.newaxis, :]
+    lon2 = np.asarray(longitudes2, dtype=np.float64)[np.newaxis, :]
+    
+    return haversine(lat1, lon1, lat2, lon2, unit=unit)
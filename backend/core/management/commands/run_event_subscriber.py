@@ -10,6 +10,11 @@ Usage:
 
     Options:
         --topics: Comma-separated list of topics to subscribe to
+        --transport: 'pubsub' or 'streams' (default: EVENT_TRANSPORT)
+        --consumers: Consumers in this process (streams transport only)
+        --consumer-name: Base consumer name in the group (streams transport only)
+        --workers: Worker threads handling events (1 = inline, in receive order)
+        --topic-concurrency: Per-topic limits, e.g. jobs=2,chat=1
         --verbosity: Set logging verbosity (0-3)
 """
 
@@ -17,6 +22,8 @@ import signal
 import sys
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from core.events import get_event_transport
+from core.dispatcher import EventDispatcher
 from core.subscribers import EventSubscriber
 import logging
 
@@ -41,6 +48,37 @@ class Command(BaseCommand):
             default=None,
             help='Comma-separated list of topics to subscribe to (default: from settings)'
         )
+        parser.add_argument(
+            '--transport',
+            choices=['pubsub', 'streams'],
+            default=None,
+            help='Event transport to consume (default: EVENT_TRANSPORT setting)'
+        )
+        parser.add_argument(
+            '--consumers',
+            type=int,
+            default=1,
+            help='Consumers to run in this process (streams transport only)'
+        )
+        parser.add_argument(
+            '--consumer-name',
+            type=str,
+            default=None,
+            help='Base consumer name in the group (streams transport, default: <hostname>-<pid>)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker threads handling events (default: EVENT_SUBSCRIBER_WORKERS; 1 = inline)'
+        )
+        parser.add_argument(
+            '--topic-concurrency',
+            type=str,
+            default=None,
+            help='Max events in flight per topic, e.g. jobs=2,chat=1 '
+                 '(default: EVENT_SUBSCRIBER_TOPIC_CONCURRENCY)'
+        )
         parser.add_argument(
             '--test-connection',
             action='store_true',
@@ -64,8 +102,9 @@ class Command(BaseCommand):
         )
         
         try:
-            # Initialize subscriber
+            # Initialize subscriber (with a worker pool if requested)
             subscriber = EventSubscriber()
+            subscriber.dispatcher = self.get_dispatcher(options, subscriber)
             
             # Test connection if requested
             if options['test_connection']:
@@ -78,14 +117,28 @@ class Command(BaseCommand):
             
             # Determine topics to subscribe to
             topics = self.get_topics(options)
+            transport = options['transport'] or get_event_transport()
             
             self.stdout.write(
-                self.style.SUCCESS(f'Starting event subscriber for topics: {topics}')
+                self.style.SUCCESS(f'Starting event subscriber for topics: {topics} (transport: {transport})')
             )
+            if subscriber.dispatcher is not None:
+                dispatcher = subscriber.dispatcher
+                limits = ', '.join(f'{topic}={dispatcher.limit_for(topic)}' for topic in topics)
+                self.stdout.write(f'Worker pool: {dispatcher.workers} threads (per topic: {limits})')
             self.stdout.write('Press Ctrl+C to stop the subscriber')
             
             # Start subscribing to events
-            subscriber.subscribe_to_topics(topics)
+            if transport == 'streams':
+                if options['consumers'] < 1:
+                    raise CommandError('--consumers must be at least 1')
+                subscriber.consume_streams(
+                    topics,
+                    consumers=options['consumers'],
+                    consumer_name=options['consumer_name']
+                )
+            else:
+                subscriber.subscribe_to_topics(topics)
             
         except Exception as e:
             raise CommandError(f'Failed to start event subscriber: {e}')
@@ -122,6 +175,34 @@ class Command(BaseCommand):
         
         return topics
     
+    def get_dispatcher(self, options, subscriber):
+        """Build the worker-pool dispatcher, or None to process events inline."""
+        workers = options['workers']
+        if workers is None:
+            workers = getattr(settings, 'EVENT_SUBSCRIBER_WORKERS', 1)
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+        if workers == 1:
+            return None
+        
+        topic_concurrency = dict(getattr(settings, 'EVENT_SUBSCRIBER_TOPIC_CONCURRENCY', {}))
+        if options['topic_concurrency']:
+            for item in options['topic_concurrency'].split(','):
+                topic, _, limit = item.partition('=')
+                try:
+                    topic_concurrency[topic.strip()] = int(limit)
+                except ValueError:
+                    raise CommandError(f'Invalid --topic-concurrency entry: {item!r} (expected topic=N)')
+        
+        if any(limit < 1 for limit in topic_concurrency.values()):
+            raise CommandError('Topic concurrency limits must be at least 1')
+        
+        return EventDispatcher(
+            subscriber.handle_event,
+            workers=workers,
+            topic_concurrency=topic_concurrency
+        )
+    
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully."""
         self.stdout.write(
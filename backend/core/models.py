@@ -0,0 +1,25 @@
+"""
+Core models.
+
+OutboxEvent holds events the in-process outbox (core/outbox.py) could not
+hand to Redis: overflow of its bounded queue, or batches that failed while
+Redis was unavailable. They are replayed once publishing succeeds again.
+"""
+
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    An event spilled from the in-process outbox, waiting to be published.
+    """
+    topic = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(help_text="publish_events() arguments, including event_id and timestamp")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.topic}:{self.event_type} ({self.payload.get('event_id')})"
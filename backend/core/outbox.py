@@ -0,0 +1,310 @@
+"""
+In-process event outbox for non-blocking publishing.
+
+Request code enqueues events onto a bounded in-memory queue and returns
+immediately; a background thread drains it and publishes in batches with
+EventPublisher.publish_events (one Redis round trip per batch). Request
+latency therefore no longer depends on Redis.
+
+Events are serialized when queued, so a payload that can't be encoded as
+JSON is rejected (logged, counted as 'invalid') in the caller's
+publish_events instead of failing a whole batch later.
+
+When the queue is full, or a batch fails because Redis is unavailable
+(redis.RedisError), the overflow policy applies:
+- 'spill': events are stored as OutboxEvent rows and replayed (oldest
+  first) once publishing succeeds again, by whichever process gets there
+  first (rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED)
+- 'drop': events are discarded and counted
+
+Replayed events keep their original event_id and timestamp, but may arrive
+after newer events. stats() exposes queue depth and counters for
+backpressure monitoring.
+
+The worker is a daemon thread in both WSGI and ASGI deployments (on_commit
+callbacks run in sync context either way). It is started lazily per
+process, so pre-fork servers get one per worker.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import redis
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .events import event_publisher
+
+logger = logging.getLogger(__name__)
+
+# Warn when the queue fills past this fraction
+HIGH_WATER_FRACTION = 0.8
+
+
+class EventOutbox:
+    """
+    Bounded, batching outbox in front of the event publisher.
+    
+    Usage:
+        event_outbox.publish_event(topic='jobs', event_type='job_created', data=job_data)
+        event_outbox.stats()  # {'queued': ..., 'published': ..., 'spilled': ...}
+    """
+    
+    COUNTERS = ('enqueued', 'published', 'failed', 'spilled', 'dropped', 'replayed', 'invalid')
+    
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._high_water_warned = False
+        self._last_replay = 0.0
+        self._redis_available = True
+    
+    @property
+    def config(self) -> Dict:
+        return getattr(settings, 'EVENT_OUTBOX', {})
+    
+    def publish_event(
+        self,
+        topic: str,
+        event_type: str,
+        data: Dict[str, Any],
+        user_id: Optional[int] = None,
+        target_users: Optional[list] = None
+    ) -> bool:
+        """
+        Queue an event for publishing (same arguments as EventPublisher.publish_event).
+        
+        Returns:
+            bool: True if the event was queued or spilled, False if dropped
+        """
+        return self.publish_events([{
+            'topic': topic,
+            'event_type': event_type,
+            'data': data,
+            'user_id': user_id,
+            'target_users': target_users,
+        }])
+    
+    def publish_events(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        Queue many events; never waits on Redis.
+        
+        Returns:
+            bool: True if every event was queued or spilled (False if any
+            was dropped or could not be serialized)
+        """
+        if not self.config.get('enabled', True):
+            return event_publisher.publish_events(events)
+        
+        # Identity and time are fixed now, not when the worker publishes
+        events = [
+            {
+                **event,
+                'event_id': event.get('event_id') or event_publisher._generate_event_id(),
+                'timestamp': event.get('timestamp') or timezone.now().isoformat(),
+            }
+            for event in events
+        ]
+        
+        # Reject what can't be published here, where the caller sees it
+        valid = []
+        for event in events:
+            try:
+                json.dumps(event)
+            except (TypeError, ValueError) as e:
+                logger.error(
+                    f"Event outbox: rejected {event.get('topic')}/{event.get('event_type')} "
+                    f"event, payload is not JSON serializable: {e}"
+                )
+                continue
+            valid.append(event)
+        self._count('invalid', len(events) - len(valid))
+        all_valid = len(valid) == len(events)
+        events = valid
+        if not events:
+            return all_valid
+        
+        event_queue = self._ensure_worker()
+        overflow = []
+        for event in events:
+            try:
+                event_queue.put_nowait(event)
+            except queue.Full:
+                overflow.append(event)
+        
+        self._count('enqueued', len(events) - len(overflow))
+        self._check_high_water(event_queue)
+        
+        if overflow:
+            logger.warning(f"Event outbox full ({event_queue.maxsize}); {len(overflow)} event(s) overflowed")
+            return self._handle_overflow(overflow) and all_valid
+        return all_valid
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, capacity and counters since process start."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queued'] = self._queue.qsize() if self._queue is not None else 0
+        stats['capacity'] = self.config.get('max_size', 10000)
+        stats['redis_available'] = self._redis_available
+        return stats
+    
+    def flush(self):
+        """Publish everything still queued (used at interpreter exit)."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        
+        batch_size = self.config.get('batch_size', 100)
+        while True:
+            batch = self._take(batch_size)
+            if not batch:
+                break
+            self._publish(batch)
+    
+    def _ensure_worker(self) -> queue.Queue:
+        """Start the worker for this process (after a fork, start a new one)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return self._queue
+        
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.config.get('max_size', 10000))
+                self._pid = os.getpid()
+                atexit.register(self.flush)
+            
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-outbox', daemon=True)
+                self._thread.start()
+        
+        return self._queue
+    
+    def _run(self):
+        batch_size = self.config.get('batch_size', 100)
+        replay_interval = self.config.get('replay_interval', 30)
+        
+        while True:
+            try:
+                first = self._queue.get(timeout=replay_interval)
+            except queue.Empty:
+                first = None
+            
+            try:
+                if first is not None:
+                    self._publish([first] + self._take(batch_size - 1))
+                
+                if self._redis_available and time.monotonic() - self._last_replay >= replay_interval:
+                    self._replay_spilled(batch_size)
+            except Exception as e:
+                logger.error(f"Event outbox worker error: {e}", exc_info=True)
+            finally:
+                # The worker owns its own DB connection; honour CONN_MAX_AGE
+                close_old_connections()
+    
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _publish(self, batch: List[Dict[str, Any]]):
+        try:
+            event_publisher.publish_events(batch, raise_errors=True)
+        except redis.RedisError as e:
+            # Redis is down: keep the batch for replay
+            if self._redis_available:
+                logger.warning(f"Event outbox: Redis unavailable ({e})")
+            self._count('failed', len(batch))
+            self._redis_available = False
+            self._handle_overflow(batch)
+            return
+        except Exception as e:
+            # Not an outage: publish one by one so only the bad event is lost
+            if len(batch) > 1:
+                for event in batch:
+                    self._publish([event])
+                return
+            logger.error(f"Event outbox: dropped unpublishable {batch[0].get('event_type')} event: {e}")
+            self._count('failed', 1)
+            self._count('dropped', 1)
+            return
+        
+        self._count('published', len(batch))
+        if not self._redis_available:
+            logger.info("Event outbox: publishing recovered")
+        self._redis_available = True
+    
+    def _handle_overflow(self, events: List[Dict[str, Any]]) -> bool:
+        """Apply the overflow policy; returns True if the events were kept."""
+        from .models import OutboxEvent
+        
+        if self.config.get('overflow_policy', 'spill') == 'spill':
+            try:
+                OutboxEvent.objects.bulk_create([
+                    OutboxEvent(topic=event['topic'], event_type=event['event_type'], payload=event)
+                    for event in events
+                ])
+                self._count('spilled', len(events))
+                return True
+            except Exception as e:
+                logger.error(f"Event outbox: failed to spill {len(events)} event(s) to the database: {e}")
+        
+        self._count('dropped', len(events))
+        logger.warning(f"Event outbox: dropped {len(events)} event(s)")
+        return False
+    
+    def _replay_spilled(self, batch_size: int):
+        """Publish spilled events oldest first, deleting each batch once sent."""
+        from .models import OutboxEvent
+        
+        self._last_replay = time.monotonic()
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    OutboxEvent.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+                )
+                if not rows:
+                    return
+                
+                try:
+                    event_publisher.publish_events([row.payload for row in rows], raise_errors=True)
+                except redis.RedisError:
+                    self._redis_available = False
+                    return
+                except Exception as e:
+                    logger.error(f"Event outbox: replay of {len(rows)} spilled event(s) failed: {e}")
+                    return
+                
+                OutboxEvent.objects.filter(id__in=[row.id for row in rows]).delete()
+            
+            self._count('replayed', len(rows))
+    
+    def _check_high_water(self, event_queue: queue.Queue):
+        depth = event_queue.qsize()
+        high_water = event_queue.maxsize * HIGH_WATER_FRACTION
+        if depth >= high_water and not self._high_water_warned:
+            self._high_water_warned = True
+            logger.warning(f"Event outbox backlog at {depth}/{event_queue.maxsize}")
+        elif depth < high_water / 2:
+            self._high_water_warned = False
+    
+    def _count(self, counter: str, amount: int):
+        if amount:
+            with self._lock:
+                self._counters[counter] += amount
+
+
+# Global event outbox instance
+event_outbox = EventOutbox()
@@ -11,21 +11,37 @@ Key Features:
 - Notification creation from events
 - WebSocket real-time updates
 - Error handling and retry logic
+- Durable consumption from Redis Streams with consumer groups (optional)
 """
 
 import json
+import os
 import redis
+import socket
 import asyncio
 import logging
-from typing import List, Dict, Any
+import threading
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from django.db import DatabaseError, close_old_connections, transaction
+
+from core.events import get_streams_config, stream_key
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Failures worth retrying: the database, Redis or the channel layer being
+# unavailable. Handlers re-raise these instead of logging them away, so a
+# stream entry stays pending and is delivered again. WebSocket sends are the
+# exception: they follow committed notification rows, so they only log
+# (a retry would insert those rows again).
+TRANSIENT_ERRORS = (DatabaseError, redis.RedisError, OSError)
+
 
 class EventSubscriber:
     """
@@ -40,8 +56,18 @@ class EventSubscriber:
         subscriber.subscribe_to_topics(['jobs', 'notifications', 'chat'])
     """
     
-    def __init__(self):
-        """Initialize Redis connection and channel layer for WebSocket updates."""
+    def __init__(self, dispatcher=None):
+        """
+        Initialize Redis connection and channel layer for WebSocket updates.
+        
+        Args:
+            dispatcher: Optional EventDispatcher; when set, events are handled
+                on its worker pool instead of inline in the receive loop
+        """
+        self.dispatcher = dispatcher
+        self._in_flight_entries = defaultdict(set)  # (stream, consumer) -> entry ids being handled
+        self._claims_lock = threading.Lock()
+        self.notification_batch_size = max(1, int(getattr(settings, 'EVENT_NOTIFICATION_BATCH_SIZE', 500)))
         try:
             # Parse Redis URL if provided, otherwise use individual settings
             redis_url = getattr(settings, 'REDIS_URL', None)
@@ -112,7 +138,7 @@ class EventSubscriber:
                 for message in pubsub.listen():
                     if message['type'] == 'message':
                         try:
-                            self.process_event(message['data'])
+                            self.receive(message['data'])
                         except Exception as e:
                             logger.error(f"Error processing message: {e}", exc_info=True)
                             # Continue processing other messages even if one fails
@@ -153,15 +179,333 @@ class EventSubscriber:
                     except Exception as e:
                         logger.error(f"Error closing pubsub: {e}")
     
-    def process_event(self, event_data: str) -> None:
+    def consume_streams(
+        self,
+        topics: List[str],
+        consumers: int = 1,
+        consumer_name: Optional[str] = None
+    ) -> None:
+        """
+        Consume topic streams as part of a consumer group (streams transport).
+        
+        Runs `consumers` consumers in this process, one thread each; more
+        processes can join the same group. Each entry is delivered to one
+        consumer in the group and acknowledged (XACK) only once it was
+        handled successfully; failed entries stay pending and are retried.
+        
+        - Entries left pending longer than EVENT_STREAMS['claim_idle_ms'] (a
+          crashed consumer, or a failed attempt) are reclaimed with XAUTOCLAIM.
+        - Entries still queued or running here keep their claim fresh
+          (XCLAIM ... JUSTID), so slow handlers don't get them reclaimed.
+        - An entry delivered more than EVENT_STREAMS['max_deliveries'] times
+          is moved to the dead-letter stream <stream>:dead and acknowledged.
+        - Successfully handled event_ids are remembered for
+          EVENT_STREAMS['dedupe_ttl'] seconds, so an entry redelivered after
+          it was handled (e.g. a lost XACK) is acknowledged without
+          handling it again. Delivery is still at-least-once: an event that
+          failed halfway may repeat side effects on retry.
+        
+        Args:
+            topics: Topic names; each maps to the stream stream:<topic>
+            consumers: Number of consumer threads in this process
+            consumer_name: Base consumer name (default: <hostname>-<pid>)
+        
+        Note:
+            This method runs indefinitely, like subscribe_to_topics.
+        """
+        config = get_streams_config()
+        group = config.get('group', 'event-subscribers')
+        streams = [stream_key(topic) for topic in topics]
+        
+        self._ensure_stream_groups(streams, group)
+        
+        base_name = consumer_name or f'{socket.gethostname()}-{os.getpid()}'
+        names = [base_name if consumers == 1 else f'{base_name}-{i}' for i in range(consumers)]
+        
+        logger.info(f"Event stream consumers {names} ready in group '{group}', streams: {streams}")
+        
+        threading.Thread(
+            target=self._keep_stream_claims,
+            args=(group,),
+            name='event-consumer-claims',
+            daemon=True
+        ).start()
+        
+        # Extra consumers run in daemon threads; the first one runs here
+        for name in names[1:]:
+            threading.Thread(
+                target=self._consume_stream_loop,
+                args=(streams, group, name),
+                name=f'event-consumer-{name}',
+                daemon=True
+            ).start()
+        
+        self._consume_stream_loop(streams, group, names[0])
+    
+    def _ensure_stream_groups(self, streams: List[str], group: str) -> None:
+        """Create the consumer group on each stream if it doesn't exist yet."""
+        for stream in streams:
+            try:
+                # '$': a new group starts with events published from now on
+                self.redis_client.xgroup_create(stream, group, id='$', mkstream=True)
+                logger.info(f"Created consumer group '{group}' on {stream}")
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+    
+    def _consume_stream_loop(self, streams: List[str], group: str, consumer: str) -> None:
+        """Read, process and acknowledge entries until interrupted, recovering from errors."""
+        config = get_streams_config()
+        batch_size = config.get('batch_size', 50)
+        block_ms = config.get('block_ms', 5000)
+        claim_idle_ms = config.get('claim_idle_ms', 60000)
+        
+        retry_delay = 5  # seconds
+        last_claim = 0.0
+        
+        while True:
+            try:
+                # Take over entries left unacknowledged (crashed consumer or failed attempt)
+                if time.monotonic() - last_claim >= claim_idle_ms / 1000:
+                    last_claim = time.monotonic()
+                    for stream in streams:
+                        _, entries, *_ = self.redis_client.xautoclaim(
+                            stream, group, consumer,
+                            min_idle_time=claim_idle_ms,
+                            start_id='0-0',
+                            count=batch_size
+                        )
+                        if entries:
+                            logger.info(f"{consumer}: reclaimed {len(entries)} pending entries from {stream}")
+                            entries = self._dead_letter_exhausted(stream, group, consumer, entries)
+                            self._process_stream_entries(stream, group, consumer, entries)
+                
+                response = self.redis_client.xreadgroup(
+                    group, consumer,
+                    {stream: '>' for stream in streams},
+                    count=batch_size,
+                    block=block_ms
+                )
+                for stream, entries in response or []:
+                    self._process_stream_entries(stream, group, consumer, entries)
+                
+                retry_delay = 5
+                
+            except KeyboardInterrupt:
+                logger.info(f"Event stream consumer {consumer} stopped by user")
+                break
+                
+            except redis.ConnectionError as e:
+                logger.error(f"{consumer}: Redis connection lost: {e}; reconnecting in {retry_delay} seconds...")
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)  # Exponential backoff, max 60s
+            
+            except redis.ResponseError as e:
+                if 'NOGROUP' in str(e):
+                    # Stream or group deleted (e.g. a reset); recreate and keep consuming
+                    logger.warning(f"{consumer}: consumer group missing ({e}), recreating")
+                    try:
+                        self._ensure_stream_groups(streams, group)
+                        continue
+                    except redis.RedisError as create_error:
+                        logger.error(f"{consumer}: could not recreate consumer group: {create_error}")
+                else:
+                    logger.error(f"{consumer}: Redis error: {e}", exc_info=True)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+            
+            except Exception as e:
+                logger.error(f"{consumer}: error in event stream consumer: {e}; retrying in {retry_delay} seconds...", exc_info=True)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+            
+            finally:
+                close_old_connections()
+    
+    def _dead_letter_exhausted(self, stream: str, group: str, consumer: str, entries) -> list:
+        """
+        Move reclaimed entries delivered more than max_deliveries times to
+        <stream>:dead and acknowledge them.
+        
+        Returns:
+            The remaining entries, to be processed again
+        """
+        config = get_streams_config()
+        max_deliveries = config.get('max_deliveries', 5)
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(stream, group, min=entry_id, max=entry_id, count=1, consumername=consumer)
+        pending = pipe.execute()
+        
+        retry, exhausted = [], []
+        for (entry_id, fields), details in zip(entries, pending):
+            deliveries = details[0]['times_delivered'] if details else 0
+            if fields and deliveries > max_deliveries:
+                exhausted.append((entry_id, fields, deliveries))
+            else:
+                retry.append((entry_id, fields))
+        
+        if exhausted:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for entry_id, fields, deliveries in exhausted:
+                pipe.xadd(
+                    f'{stream}:dead',
+                    {'event': fields.get('event', '{}'), 'entry_id': entry_id, 'deliveries': deliveries},
+                    maxlen=config.get('maxlen', 100000),
+                    approximate=True
+                )
+            pipe.xack(stream, group, *[entry_id for entry_id, _, _ in exhausted])
+            pipe.execute()
+            logger.error(
+                f"{consumer}: moved {len(exhausted)} entries from {stream} to {stream}:dead "
+                f"after more than {max_deliveries} deliveries"
+            )
+        
+        return retry
+    
+    def _process_stream_entries(self, stream: str, group: str, consumer: str, entries) -> None:
+        """
+        Process entries inline, or hand them to the dispatcher when one is
+        set; each is acknowledged once handled successfully (see consume_streams).
+        """
+        config = get_streams_config()
+        dedupe_ttl = config.get('dedupe_ttl', 86400)
+        done = []
+        
+        decoded = []
+        for entry_id, fields in entries:
+            # XAUTOCLAIM reports entries trimmed from the stream with no fields
+            if not fields:
+                done.append(entry_id)
+                continue
+            
+            try:
+                event = json.loads(fields.get('event', '{}'))
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid JSON in stream entry {entry_id}: {e}")
+                done.append(entry_id)
+                continue
+            
+            event_id = event.get('event_id')
+            dedupe_key = f'event:handled:{group}:{event_id}' if event_id else None
+            decoded.append((entry_id, event, dedupe_key))
+        
+        # One round trip for the whole batch's dedupe check
+        pipe = self.redis_client.pipeline(transaction=False)
+        for _, _, dedupe_key in decoded:
+            if dedupe_key:
+                pipe.exists(dedupe_key)
+        handled = iter(pipe.execute())
+        
+        to_handle = []
+        for entry_id, event, dedupe_key in decoded:
+            if dedupe_key and next(handled):
+                logger.info(f"Skipping already handled event {event.get('event_id')} ({stream} {entry_id})")
+                done.append(entry_id)
+            else:
+                to_handle.append((entry_id, event, dedupe_key))
+        
+        if done:
+            self.redis_client.xack(stream, group, *done)
+        
+        # Claims of the whole batch are kept fresh while it waits its turn
+        for entry_id, _, _ in to_handle:
+            self._track_stream_entry(stream, consumer, entry_id)
+        
+        def finish(ok, entry_id, dedupe_key):
+            self._untrack_stream_entry(stream, consumer, entry_id)
+            if not ok:
+                logger.warning(f"Stream entry {entry_id} on {stream} failed; left pending for retry")
+                return
+            pipe = self.redis_client.pipeline(transaction=False)
+            if dedupe_key:
+                pipe.set(dedupe_key, 1, ex=dedupe_ttl)
+            pipe.xack(stream, group, entry_id)
+            pipe.execute()
+        
+        handed_off = 0
+        try:
+            for entry_id, event, dedupe_key in to_handle:
+                if self.dispatcher is not None:
+                    self.dispatcher.dispatch_event(
+                        event,
+                        on_done=lambda ok, entry_id=entry_id, dedupe_key=dedupe_key: finish(ok, entry_id, dedupe_key)
+                    )
+                else:
+                    finish(self.handle_event(event), entry_id, dedupe_key)
+                handed_off += 1
+        finally:
+            # Stop refreshing claims of entries this call never got to
+            for entry_id, _, _ in to_handle[handed_off:]:
+                self._untrack_stream_entry(stream, consumer, entry_id)
+    
+    def _track_stream_entry(self, stream: str, consumer: str, entry_id: str) -> None:
+        with self._claims_lock:
+            self._in_flight_entries[(stream, consumer)].add(entry_id)
+    
+    def _untrack_stream_entry(self, stream: str, consumer: str, entry_id: str) -> None:
+        with self._claims_lock:
+            self._in_flight_entries[(stream, consumer)].discard(entry_id)
+    
+    def _keep_stream_claims(self, group: str) -> None:
+        """
+        Reset the idle time of entries queued or running in this process
+        (XCLAIM ... JUSTID to their current consumer) well before
+        claim_idle_ms, so other consumers' XAUTOCLAIM leaves them alone.
+        """
+        claim_idle_ms = get_streams_config().get('claim_idle_ms', 60000)
+        interval = max(claim_idle_ms / 3000, 1.0)
+        
+        while True:
+            time.sleep(interval)
+            with self._claims_lock:
+                in_flight = {key: list(ids) for key, ids in self._in_flight_entries.items() if ids}
+            
+            for (stream, consumer), entry_ids in in_flight.items():
+                try:
+                    self.redis_client.xclaim(
+                        stream, group, consumer,
+                        min_idle_time=0,
+                        message_ids=entry_ids,
+                        justid=True
+                    )
+                except Exception as e:
+                    logger.error(f"Error refreshing claims on {stream} for {consumer}: {e}")
+    
+    def process_event(self, event_data: str) -> bool:
         """
         Process incoming event and route to appropriate handler.
         
         Args:
             event_data: JSON string containing event information
+        
+        Returns:
+            bool: False if handling failed and may succeed on retry
         """
         try:
             event = json.loads(event_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON in event data: {e}")
+            return True
+        
+        return self.handle_event(event)
+    
+    def handle_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Route a decoded event to its topic handler.
+        
+        Handlers log and skip bad data, but let TRANSIENT_ERRORS (database,
+        Redis unavailable) propagate, which fails the event. WebSocket sends
+        are best effort and never fail it.
+        
+        Args:
+            event: Event message dict (topic, event_type, data, ...)
+        
+        Returns:
+            bool: True if the event was handled, False if it failed
+        """
+        try:
             topic = event.get('topic')
             event_type = event.get('event_type')
             data = event.get('data', {})
@@ -178,11 +522,33 @@ class EventSubscriber:
                 self.handle_payment_event(event_type, data)
             else:
                 logger.warning(f"Unknown topic: {topic}")
+            
+            return True
                 
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in event data: {e}")
         except Exception as e:
             logger.error(f"Error processing event: {e}")
+            return False
+    
+    def receive(self, event_data: str, on_done=None) -> None:
+        """
+        Process a received message inline, or hand it to the dispatcher's
+        worker pool when one is set (see core/dispatcher.py).
+        
+        Args:
+            event_data: JSON event message
+            on_done: Called with True once the event was handled, or False
+                if it failed (e.g. to acknowledge it)
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(event_data, on_done=on_done)
+            return
+        
+        ok = False
+        try:
+            ok = self.process_event(event_data)
+        finally:
+            if on_done:
+                on_done(ok)
     
     def handle_job_event(self, event_type: str, data: Dict[str, Any]) -> None:
         """
@@ -219,6 +585,8 @@ class EventSubscriber:
                 'event_type': event_type,
                 'data': data
             })
+        except TRANSIENT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error handling job event {event_type}: {e}")
     
@@ -230,23 +598,24 @@ class EventSubscriber:
         """
         try:
             # Find cleaners in the job area
-            eligible_cleaners = self.find_cleaners_for_job(data)
+            cleaner_ids = self.find_cleaner_ids_for_job(data)
             
-            # Create notifications for eligible cleaners
-            for cleaner in eligible_cleaners:
-                self.create_notification(
-                    user=cleaner,
-                    template_key='job_created',
-                    context={
-                        'job_title': data.get('services_description', 'New Job'),
-                        'job_location': data.get('property_address', 'Unknown Location'),
-                        'job_budget': data.get('client_budget', '0'),
-                        'job_id': data.get('job_id')
-                    }
-                )
+            # Fan out one notification per cleaner in bulk
+            created = self.create_notifications_bulk(
+                user_ids=cleaner_ids,
+                template_key='job_created',
+                context={
+                    'job_title': data.get('services_description', 'New Job'),
+                    'job_location': data.get('property_address', 'Unknown Location'),
+                    'job_budget': data.get('client_budget', '0'),
+                    'job_id': data.get('job_id')
+                }
+            )
             
-            logger.info(f"Created job notifications for {len(eligible_cleaners)} cleaners")
+            logger.info(f"Created job notifications for {created} cleaners")
             
+        except TRANSIENT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error handling job_created event: {e}")
     
@@ -425,6 +794,8 @@ class EventSubscriber:
         try:
             if event_type == 'message_received':
                 self.handle_message_received(data)
+        except TRANSIENT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error handling chat event {event_type}: {e}")
     
@@ -469,6 +840,34 @@ class EventSubscriber:
             cleaners = User.objects.filter(role='cleaner', is_active=True)
             return list(cleaners)
             
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error finding cleaners for job: {e}")
+            return []
+    
+    def find_cleaner_ids_for_job(self, job_data: Dict[str, Any]) -> List[int]:
+        """
+        Find the IDs of cleaners eligible for a job.
+        
+        Same selection as find_cleaners_for_job, but only the primary keys are
+        fetched so large fan-outs don't materialise a User object per cleaner.
+        
+        Args:
+            job_data: Job information including location
+            
+        Returns:
+            List of cleaner user IDs
+        """
+        try:
+            # For now, return all cleaners. In the future, implement location-based filtering
+            cleaner_ids = User.objects.filter(
+                role='cleaner', is_active=True
+            ).values_list('id', flat=True)
+            return list(cleaner_ids.iterator(chunk_size=self.notification_batch_size))
+            
+        except TRANSIENT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error finding cleaners for job: {e}")
             return []
@@ -522,9 +921,91 @@ class EventSubscriber:
             logger.info(f"Created notification for user {user.id}: {template_key} with action_url: {notification.action_url}")
             self.send_user_notification(user.id, notification_data)
             
+        except TRANSIENT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error creating notification: {e}")
     
+    def create_notifications_bulk(self, user_ids: List[int], template_key: str,
+                                  context: Dict[str, Any]) -> int:
+        """
+        Create the same templated notification for many users at once.
+        
+        The template is fetched and rendered once, rows are inserted with
+        bulk_create in chunks of EVENT_NOTIFICATION_BATCH_SIZE (in one
+        transaction), and each chunk's WebSocket messages are sent in a
+        single batch.
+        
+        Args:
+            user_ids: IDs of the users to notify
+            template_key: Notification template key
+            context: Template context variables (shared by all recipients)
+            
+        Returns:
+            int: Number of notifications created
+        """
+        if not user_ids:
+            return 0
+        
+        try:
+            from notifications.models import NotificationTemplate, Notification
+            
+            template = NotificationTemplate.objects.filter(
+                notification_type=template_key,
+                is_active=True
+            ).first()
+            
+            if not template:
+                logger.error(f"Notification template not found: {template_key}")
+                return 0
+            
+            title, message = template.render(context)
+            action_url = self.generate_action_url(template_key, context)
+            batch_size = self.notification_batch_size
+            
+            # All rows or none: a database error rolls the whole fan-out back
+            # and the event is retried from scratch. Nothing after the commit
+            # can fail the event (WebSocket sends only log), so a retry never
+            # inserts these rows twice.
+            chunks = []
+            with transaction.atomic():
+                for start in range(0, len(user_ids), batch_size):
+                    chunks.append(Notification.objects.bulk_create([
+                        Notification(
+                            recipient_id=user_id,
+                            title=title,
+                            message=message,
+                            notification_type=template_key,
+                            action_url=action_url
+                        )
+                        for user_id in user_ids[start:start + batch_size]
+                    ]))
+            created = sum(len(notifications) for notifications in chunks)
+            
+            for notifications in chunks:
+                self.send_user_notifications([
+                    (notification.recipient_id, {
+                        'id': notification.id,
+                        'title': notification.title,
+                        'message': notification.message,
+                        'type': notification.notification_type,
+                        'notification_type': notification.notification_type,  # Add both for compatibility
+                        'created_at': notification.created_at.isoformat(),
+                        'is_read': notification.is_read,
+                        'action_url': notification.action_url
+                    })
+                    for notification in notifications
+                ])
+            
+            logger.info(f"Created {created} {template_key} notifications with action_url: {action_url}")
+            return created
+            
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error creating bulk notifications: {e}")
+            return 0
+    
     def generate_action_url(self, notification_type: str, context: Dict[str, Any]) -> str:
         """
         Generate action URL based on notification type.
@@ -597,6 +1078,7 @@ class EventSubscriber:
                     }
                 )
         except Exception as e:
+            # Best effort: the event's database work is already committed
             logger.error(f"Error sending WebSocket update: {e}")
     
     def send_user_notification(self, user_id: int, notification_data: Dict[str, Any]) -> None:
@@ -619,4 +1101,50 @@ class EventSubscriber:
                 )
                 logger.info(f"Sent WebSocket notification to group: {group_name}")
         except Exception as e:
-            logger.error(f"Error sending user notification: {e}")
\ No newline at end of file
+            # Best effort: the notification row is already committed
+            logger.error(f"Error sending user notification: {e}")
+    
+    def send_user_notifications(self, notifications: List[tuple]) -> None:
+        """
+        Send notifications to many users via WebSocket in one batch.
+        
+        All group_send calls are awaited together inside a single event-loop
+        hop, so the channel layer can overlap the Redis round trips instead of
+        paying one async_to_sync bridge per user.
+        
+        Args:
+            notifications: (user_id, notification_data) pairs
+        """
+        if not notifications or not self.channel_layer:
+            return
+        
+        channel_layer = self.channel_layer
+        
+        async def send_all():
+            results = await asyncio.gather(
+                *(
+                    channel_layer.group_send(
+                        f'notifications_{user_id}',
+                        {
+                            'type': 'notification_message',
+                            'notification': notification_data
+                        }
+                    )
+                    for user_id, notification_data in notifications
+                ),
+                return_exceptions=True
+            )
+            return [result for result in results if isinstance(result, Exception)]
+        
+        try:
+            errors = async_to_sync(send_all)()
+            if errors:
+                logger.error(
+                    f"Failed to send {len(errors)} of {len(notifications)} "
+                    f"WebSocket notifications: {errors[0]}"
+                )
+            else:
+                logger.info(f"Sent {len(notifications)} WebSocket notifications")
+        except Exception as e:
+            # Best effort: the notification rows are already committed
+            logger.error(f"Error sending user notifications: {e}")
@@ -0,0 +1,459 @@
+import json
+import queue
+import threading
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+import redis
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.dispatcher import EventDispatcher
+from core.events import EventPublisher
+from core.geo import distance_matrix, distances_from_point, haversine
+from core.models import OutboxEvent
+from core.outbox import EventOutbox
+from core.subscribers import EventSubscriber
+from notifications.models import Notification, NotificationTemplate
+from users.models import User
+
+OUTBOX_SETTINGS = {
+    'enabled': True,
+    'max_size': 1,
+    'batch_size': 100,
+    'overflow_policy': 'spill',
+    'replay_interval': 30,
+}
+
+
+def make_event(number):
+    return {'topic': 'jobs', 'event_type': 'job_created', 'data': {'job_id': number}}
+
+
+@override_settings(EVENT_OUTBOX=OUTBOX_SETTINGS)
+class EventOutboxSpillTests(TestCase):
+    """Overflow spilling and replay of core.outbox.EventOutbox"""
+
+    def setUp(self):
+        self.outbox = EventOutbox()
+        # No worker thread: events stay in a one-slot queue so overflow is deterministic
+        self.event_queue = queue.Queue(maxsize=1)
+        worker_patcher = mock.patch.object(self.outbox, '_ensure_worker', return_value=self.event_queue)
+        worker_patcher.start()
+        self.addCleanup(worker_patcher.stop)
+
+    def patch_publish(self, ok):
+        side_effect = None if ok else redis.ConnectionError('Redis unavailable')
+        patcher = mock.patch('core.outbox.event_publisher.publish_events', return_value=True, side_effect=side_effect)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_full_queue_spills_to_database(self):
+        self.assertTrue(self.outbox.publish_events([make_event(1), make_event(2), make_event(3)]))
+
+        self.assertEqual(self.event_queue.qsize(), 1)
+        spilled = list(OutboxEvent.objects.values_list('payload', flat=True))
+        self.assertEqual([payload['data']['job_id'] for payload in spilled], [2, 3])
+        self.assertTrue(all(payload['event_id'] and payload['timestamp'] for payload in spilled))
+
+        stats = self.outbox.stats()
+        self.assertEqual((stats['enqueued'], stats['spilled'], stats['dropped']), (1, 2, 0))
+
+    @override_settings(EVENT_OUTBOX={**OUTBOX_SETTINGS, 'overflow_policy': 'drop'})
+    def test_drop_policy_discards_overflow(self):
+        self.assertFalse(self.outbox.publish_events([make_event(1), make_event(2)]))
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(self.outbox.stats()['dropped'], 1)
+
+    def test_failed_batch_spills(self):
+        self.patch_publish(False)
+
+        self.outbox._publish([make_event(1), make_event(2)])
+
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        stats = self.outbox.stats()
+        self.assertEqual((stats['failed'], stats['spilled']), (2, 2))
+        self.assertFalse(stats['redis_available'])
+
+    def test_unserializable_event_is_rejected_when_queued(self):
+        bad_event = {**make_event(2), 'data': {'amount': object()}}
+
+        with self.assertLogs('core.outbox', level='ERROR'):
+            self.assertFalse(self.outbox.publish_events([make_event(1), bad_event]))
+
+        self.assertEqual(self.event_queue.qsize(), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+        stats = self.outbox.stats()
+        self.assertEqual((stats['enqueued'], stats['invalid'], stats['spilled']), (1, 1, 0))
+
+    def test_bad_event_in_batch_is_dropped_alone(self):
+        def publish_events(batch, raise_errors=False):
+            if any(event['data']['job_id'] == 2 for event in batch):
+                raise TypeError('not serializable')
+            return True
+
+        patcher = mock.patch('core.outbox.event_publisher.publish_events', side_effect=publish_events)
+        publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.assertLogs('core.outbox', level='ERROR'):
+            self.outbox._publish([make_event(1), make_event(2), make_event(3)])
+
+        self.assertEqual(publish.call_count, 4)
+        self.assertFalse(OutboxEvent.objects.exists())
+        stats = self.outbox.stats()
+        self.assertEqual((stats['published'], stats['dropped']), (2, 1))
+        self.assertTrue(stats['redis_available'])
+
+    def test_replay_publishes_oldest_first_and_deletes(self):
+        self.outbox.publish_events([make_event(1), make_event(2), make_event(3)])
+        publish = self.patch_publish(True)
+
+        self.outbox._replay_spilled(batch_size=1)
+
+        replayed = [call.args[0][0]['data']['job_id'] for call in publish.call_args_list]
+        self.assertEqual(replayed, [2, 3])
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(self.outbox.stats()['replayed'], 2)
+
+    def test_failed_replay_keeps_rows(self):
+        self.outbox.publish_events([make_event(1), make_event(2)])
+        self.patch_publish(False)
+
+        self.outbox._replay_spilled(batch_size=100)
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertEqual(self.outbox.stats()['replayed'], 0)
+        self.assertFalse(self.outbox.stats()['redis_available'])
+
+
+class EventPublisherTests(SimpleTestCase):
+    """Pipelined fan-out of core.events.EventPublisher.publish_events"""
+
+    def setUp(self):
+        self.publisher = EventPublisher()
+        self.publisher.redis_client = mock.MagicMock()
+        self.publisher._initialized = True
+        self.pipeline = self.publisher.redis_client.pipeline.return_value
+        self.pipeline.execute.return_value = [1] * 10
+
+    def published(self):
+        return [(call.args[0], json.loads(call.args[1])) for call in self.pipeline.publish.call_args_list]
+
+    def test_user_channels_are_deduplicated(self):
+        self.assertTrue(self.publisher.publish_event(
+            'jobs', 'job_created', {'job_id': 1}, user_id=5, target_users=[5, 6, 6]
+        ))
+
+        published = self.published()
+        self.assertEqual([channel for channel, _ in published], ['topic:jobs', 'user:5', 'user:6'])
+        self.assertEqual(len({message['event_id'] for _, message in published}), 1)
+
+    def test_many_events_share_one_pipeline(self):
+        self.assertTrue(self.publisher.publish_events([
+            {'topic': 'jobs', 'event_type': 'job_created', 'data': {'job_id': 1}, 'user_id': 5},
+            {'topic': 'bids', 'event_type': 'bid_created', 'data': {'bid_id': 2}, 'target_users': [7, 8]},
+        ]))
+
+        self.publisher.redis_client.pipeline.assert_called_once_with(transaction=False)
+        self.pipeline.execute.assert_called_once_with()
+        self.assertEqual(
+            [channel for channel, _ in self.published()],
+            ['topic:jobs', 'user:5', 'topic:bids', 'user:7', 'user:8']
+        )
+
+    @override_settings(EVENT_TRANSPORT='streams', EVENT_STREAMS={'maxlen': 1000})
+    def test_streams_transport_appends_topic_events(self):
+        self.publisher.publish_event('jobs', 'job_created', {'job_id': 1}, user_id=5)
+
+        self.pipeline.xadd.assert_called_once_with('stream:jobs', mock.ANY, maxlen=1000, approximate=True)
+        self.assertEqual(json.loads(self.pipeline.xadd.call_args.args[1]['event'])['event_type'], 'job_created')
+        self.assertEqual([channel for channel, _ in self.published()], ['user:5'])
+
+    def test_redis_errors_are_reported(self):
+        self.pipeline.execute.side_effect = redis.ConnectionError('Redis unavailable')
+        event = {'topic': 'jobs', 'event_type': 'job_created', 'data': {'job_id': 1}}
+
+        with self.assertLogs('core.events', level='ERROR'):
+            self.assertFalse(self.publisher.publish_events([event]))
+        with self.assertRaises(redis.ConnectionError):
+            self.publisher.publish_events([event], raise_errors=True)
+
+
+class EventDispatcherTests(SimpleTestCase):
+    """Per-topic concurrency and completion reporting of core.dispatcher.EventDispatcher"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.handled = []
+        self.done = queue.Queue()
+
+    def blocking_handler(self, event):
+        self.release.wait(timeout=5)
+        self.handled.append(event['data'])
+        return event.get('result')
+
+    def make_dispatcher(self, handler, **kwargs):
+        dispatcher = EventDispatcher(handler, **kwargs)
+        self.addCleanup(dispatcher.shutdown)
+        self.addCleanup(self.release.set)
+        return dispatcher
+
+    def dispatch(self, dispatcher, topic, data, **extra):
+        dispatcher.dispatch(
+            json.dumps({'topic': topic, 'data': data, **extra}),
+            on_done=lambda ok: self.done.put((data, ok))
+        )
+
+    def wait_done(self, count):
+        return dict(self.done.get(timeout=5) for _ in range(count))
+
+    def test_topic_limit_queues_excess_events(self):
+        dispatcher = self.make_dispatcher(self.blocking_handler, workers=4, topic_concurrency={'jobs': 1})
+        for number in range(3):
+            self.dispatch(dispatcher, 'jobs', f'job-{number}')
+        self.dispatch(dispatcher, 'chat', 'chat-0')
+
+        self.assertEqual(dispatcher.stats(), {
+            'jobs': {'running': 1, 'queued': 2},
+            'chat': {'running': 1, 'queued': 0},
+        })
+
+        self.release.set()
+        self.wait_done(4)
+        # on_done runs before the topic slot is freed; let the pool finish
+        dispatcher.shutdown()
+
+        self.assertEqual([data for data in self.handled if data.startswith('job')], ['job-0', 'job-1', 'job-2'])
+        self.assertEqual(dispatcher.stats()['jobs'], {'running': 0, 'queued': 0})
+
+    def test_slow_topic_does_not_block_others(self):
+        def handler(event):
+            if event['topic'] == 'jobs':
+                return self.blocking_handler(event)
+            self.handled.append(event['data'])
+
+        dispatcher = self.make_dispatcher(handler, workers=2, topic_concurrency={'jobs': 1})
+        self.dispatch(dispatcher, 'jobs', 'job-0')
+        self.dispatch(dispatcher, 'jobs', 'job-1')
+        self.dispatch(dispatcher, 'chat', 'chat-0')
+
+        self.assertEqual(self.wait_done(1), {'chat-0': True})
+        self.assertEqual(dispatcher.stats()['jobs'], {'running': 1, 'queued': 1})
+
+    def test_on_done_reports_handler_result(self):
+        def handler(event):
+            if event['data'] == 'raises':
+                raise RuntimeError('handler failed')
+            return event.get('result')
+
+        dispatcher = self.make_dispatcher(handler, workers=2)
+        self.dispatch(dispatcher, 'jobs', 'handled')
+        self.dispatch(dispatcher, 'jobs', 'failed', result=False)
+        with self.assertLogs('core.dispatcher', level='ERROR'):
+            self.dispatch(dispatcher, 'jobs', 'raises')
+            done = self.wait_done(3)
+
+        self.assertEqual(done, {'handled': True, 'failed': False, 'raises': False})
+
+    def test_invalid_json_is_reported_handled(self):
+        dispatcher = self.make_dispatcher(self.blocking_handler)
+
+        with self.assertLogs('core.dispatcher', level='ERROR'):
+            dispatcher.dispatch('{not json', on_done=lambda ok: self.done.put(('invalid', ok)))
+
+        self.assertEqual(self.wait_done(1), {'invalid': True})
+        self.assertEqual(self.handled, [])
+
+
+@override_settings(EVENT_NOTIFICATION_BATCH_SIZE=2)
+class BulkNotificationTests(TestCase):
+    """job_created fan-out through EventSubscriber.create_notifications_bulk"""
+
+    def setUp(self):
+        self.channel_layer = mock.MagicMock()
+        self.channel_layer.group_send = mock.AsyncMock()
+        for target, value in [
+            ('core.subscribers.redis.from_url', mock.MagicMock()),
+            ('core.subscribers.get_channel_layer', self.channel_layer),
+        ]:
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.subscriber = EventSubscriber()
+
+        NotificationTemplate.objects.create(
+            name='New job', notification_type='job_created',
+            title_template='New job: {job_title}', message_template='{job_location} for {job_budget}',
+        )
+        self.cleaner_ids = {
+            User.objects.create_user(email=f'cleaner{number}@example.com', password='testpass123', role='cleaner').id
+            for number in range(5)
+        }
+        User.objects.create_user(email='client@example.com', password='testpass123', role='client')
+        self.data = {
+            'job_id': 7, 'services_description': 'Deep clean',
+            'property_address': '1 Test Street', 'client_budget': '80.00',
+        }
+
+    def created_notifications(self):
+        return Notification.objects.filter(notification_type='job_created')
+
+    def test_rows_are_inserted_in_chunks(self):
+        with mock.patch.object(Notification.objects, 'bulk_create', wraps=Notification.objects.bulk_create) as bulk_create:
+            self.subscriber.handle_job_created(self.data)
+
+        self.assertEqual(bulk_create.call_count, 3)
+        self.assertEqual(set(self.created_notifications().values_list('recipient_id', flat=True)), self.cleaner_ids)
+        self.assertEqual(set(self.created_notifications().values_list('title', 'action_url')), {('New job: Deep clean', '/jobs?job=7')})
+
+    def test_template_is_fetched_once(self):
+        with mock.patch.object(NotificationTemplate.objects, 'filter', wraps=NotificationTemplate.objects.filter) as template_filter:
+            self.subscriber.handle_job_created(self.data)
+
+        self.assertEqual(template_filter.call_count, 1)
+
+    def test_each_chunk_is_sent_in_one_batch(self):
+        with mock.patch.object(self.subscriber, 'send_user_notifications') as send:
+            self.subscriber.handle_job_created(self.data)
+
+        self.assertEqual(send.call_count, 3)
+        sent = [pair for call in send.call_args_list for pair in call.args[0]]
+        self.assertEqual({user_id for user_id, _ in sent}, self.cleaner_ids)
+        self.assertEqual(
+            {notification['id'] for _, notification in sent},
+            set(self.created_notifications().values_list('id', flat=True))
+        )
+
+    def test_websocket_failure_does_not_fail_event(self):
+        self.channel_layer.group_send.side_effect = OSError('channel layer unavailable')
+
+        with self.assertLogs('core.subscribers', level='ERROR'):
+            handled = self.subscriber.handle_event({'topic': 'jobs', 'event_type': 'job_created', 'data': self.data})
+
+        # A failed event would be retried and insert every row again
+        self.assertTrue(handled)
+        self.assertEqual(self.created_notifications().count(), 5)
+
+
+class HaversineTests(SimpleTestCase):
+    """Known great-circle distances from core.geo"""
+
+    ATHENS = (37.9838, 23.7275)
+    THESSALONIKI = (40.6401, 22.9444)
+
+    def test_known_city_distances(self):
+        self.assertAlmostEqual(float(haversine(*self.ATHENS, *self.THESSALONIKI)), 302.95, places=1)
+        self.assertAlmostEqual(float(haversine(*self.ATHENS, *self.THESSALONIKI, unit='mi')), 188.11, places=1)
+        # Big Ben to the Statue of Liberty
+        self.assertAlmostEqual(float(haversine(51.5007, -0.1246, 40.6892, -74.0445)), 5574.84, places=1)
+
+    def test_one_degree_on_the_equator_and_across_the_antimeridian(self):
+        self.assertAlmostEqual(float(haversine(0, 0, 0, 1)), 111.19, places=2)
+        self.assertAlmostEqual(float(haversine(0, 179.5, 0, -179.5)), 111.19, places=2)
+        self.assertEqual(float(haversine(*self.ATHENS, *self.ATHENS)), 0.0)
+
+    def test_decimal_inputs(self):
+        distance = haversine(Decimal('37.9838'), Decimal('23.7275'), Decimal('40.6401'), Decimal('22.9444'))
+
+        self.assertAlmostEqual(float(distance), 302.95, places=1)
+
+    def test_vectorized_helpers_match_scalar_distances(self):
+        latitudes = [self.ATHENS[0], self.THESSALONIKI[0], 0.0]
+        longitudes = [self.ATHENS[1], self.THESSALONIKI[1], 0.0]
+        expected = [float(haversine(*self.ATHENS, lat, lon)) for lat, lon in zip(latitudes, longitudes)]
+
+        np.testing.assert_allclose(distances_from_point(*self.ATHENS, latitudes, longitudes), expected)
+
+        matrix = distance_matrix(latitudes[:2], longitudes[:2], latitudes, longitudes)
+        self.assertEqual(matrix.shape, (2, 3))
+        np.testing.assert_allclose(matrix[0], expected)
+        np.testing.assert_allclose(matrix, distance_matrix(latitudes, longitudes, latitudes[:2], longitudes[:2]).T)
+
+
+class StreamConsumerTests(SimpleTestCase):
+    """Acknowledgement, dedupe and dead-lettering of stream entries in EventSubscriber"""
+
+    STREAM = 'stream:jobs'
+    GROUP = 'event-subscribers'
+
+    def setUp(self):
+        for target in ['core.subscribers.redis.from_url', 'core.subscribers.get_channel_layer']:
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.subscriber = EventSubscriber()
+        self.redis_client = self.subscriber.redis_client
+        self.pipeline = self.redis_client.pipeline.return_value
+
+        handle_patcher = mock.patch.object(self.subscriber, 'handle_event', return_value=True)
+        self.handle_event = handle_patcher.start()
+        self.addCleanup(handle_patcher.stop)
+
+    def entry(self, entry_id, event_id):
+        event = {**make_event(1), 'event_id': event_id}
+        return entry_id, {'event': json.dumps(event)}
+
+    def process(self, entries):
+        self.subscriber._process_stream_entries(self.STREAM, self.GROUP, 'consumer-1', entries)
+
+    def test_handled_entry_is_remembered_and_acknowledged(self):
+        self.pipeline.execute.side_effect = [[0], []]
+
+        self.process([self.entry('1-0', 'event-1')])
+
+        self.handle_event.assert_called_once()
+        self.pipeline.exists.assert_called_once_with(f'event:handled:{self.GROUP}:event-1')
+        self.pipeline.set.assert_called_once_with(f'event:handled:{self.GROUP}:event-1', 1, ex=86400)
+        self.pipeline.xack.assert_called_once_with(self.STREAM, self.GROUP, '1-0')
+        self.assertEqual(self.subscriber._in_flight_entries[(self.STREAM, 'consumer-1')], set())
+
+    def test_failed_entry_stays_pending(self):
+        self.pipeline.execute.side_effect = [[0]]
+        self.handle_event.return_value = False
+
+        with self.assertLogs('core.subscribers', level='WARNING'):
+            self.process([self.entry('1-0', 'event-1')])
+
+        self.pipeline.set.assert_not_called()
+        self.pipeline.xack.assert_not_called()
+        self.redis_client.xack.assert_not_called()
+
+    def test_already_handled_event_is_acknowledged_without_handling(self):
+        self.pipeline.execute.side_effect = [[1, 0], []]
+
+        self.process([self.entry('1-0', 'event-1'), self.entry('2-0', 'event-2')])
+
+        self.assertEqual(self.handle_event.call_count, 1)
+        self.assertEqual(self.handle_event.call_args.args[0]['event_id'], 'event-2')
+        self.redis_client.xack.assert_called_once_with(self.STREAM, self.GROUP, '1-0')
+        self.pipeline.xack.assert_called_once_with(self.STREAM, self.GROUP, '2-0')
+
+    def test_trimmed_and_invalid_entries_are_acknowledged(self):
+        self.pipeline.execute.side_effect = [[]]
+
+        with self.assertLogs('core.subscribers', level='ERROR'):
+            self.process([('1-0', {}), ('2-0', {'event': '{not json'})])
+
+        self.handle_event.assert_not_called()
+        self.redis_client.xack.assert_called_once_with(self.STREAM, self.GROUP, '1-0', '2-0')
+
+    @override_settings(EVENT_STREAMS={'max_deliveries': 3, 'maxlen': 100})
+    def test_exhausted_entries_move_to_dead_letter_stream(self):
+        exhausted, retried = self.entry('1-0', 'event-1'), self.entry('2-0', 'event-2')
+        self.pipeline.execute.side_effect = [[[{'times_delivered': 4}], [{'times_delivered': 3}]], []]
+
+        with self.assertLogs('core.subscribers', level='ERROR'):
+            remaining = self.subscriber._dead_letter_exhausted(
+                self.STREAM, self.GROUP, 'consumer-1', [exhausted, retried]
+            )
+
+        self.assertEqual(remaining, [retried])
+        self.pipeline.xadd.assert_called_once_with(
+            f'{self.STREAM}:dead',
+            {'event': exhausted[1]['event'], 'entry_id': '1-0', 'deliveries': 4},
+            maxlen=100,
+            approximate=True
+        )
+        self.pipeline.xack.assert_called_once_with(self.STREAM, self.GROUP, '1-0')
@@ -272,10 +272,65 @@ if REDIS_PASSWORD:
 else:
     REDIS_URL = os.environ.get('REDIS_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}')
 
+# Shared cache in Redis (its own DB, apart from Pub/Sub and the Celery broker)
+# Version counters bumped by Celery workers and management commands
+# (recommendation lists, service area and open job indexes) must reach the
+# web processes, which a per-process LocMemCache can't do
+CACHE_REDIS_DB = int(os.environ.get('CACHE_REDIS_DB', 2))
+if REDIS_PASSWORD:
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', f'redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{CACHE_REDIS_DB}')
+else:
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/{CACHE_REDIS_DB}')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': 'e_clean',
+    },
+}
+
+# Grid cell size (degrees) for the in-memory service area index (~11 km at 0.1)
+SERVICE_AREA_INDEX_CELL_DEGREES = float(os.environ.get('SERVICE_AREA_INDEX_CELL_DEGREES', '0.1'))
+
 # Event publishing settings
 EVENT_PUBLISHER_ENABLED = True
 EVENT_SUBSCRIBER_TOPICS = ['jobs', 'notifications', 'chat', 'payments']
 
+# Bulk notification fan-out (rows per bulk_create / WebSocket send batch)
+EVENT_NOTIFICATION_BATCH_SIZE = int(os.environ.get('EVENT_NOTIFICATION_BATCH_SIZE', '500'))
+
+# Event subscriber worker pool (run_event_subscriber --workers / --topic-concurrency)
+EVENT_SUBSCRIBER_WORKERS = int(os.environ.get('EVENT_SUBSCRIBER_WORKERS', '1'))  # 1 = handle events inline
+EVENT_SUBSCRIBER_TOPIC_CONCURRENCY = {  # Max events in flight per topic (1 = strictly ordered)
+    'jobs': 2,
+    'notifications': 2,
+    'chat': 1,
+    'payments': 1,
+}
+
+# Event transport: 'pubsub' (fire-and-forget) or 'streams' (Redis Streams with
+# consumer groups; events survive subscriber restarts and are acknowledged)
+EVENT_TRANSPORT = os.environ.get('EVENT_TRANSPORT', 'pubsub')
+EVENT_STREAMS = {
+    'group': os.environ.get('EVENT_STREAMS_GROUP', 'event-subscribers'),  # Consumer group name
+    'maxlen': int(os.environ.get('EVENT_STREAMS_MAXLEN', '100000')),  # Approximate entries kept per stream
+    'batch_size': int(os.environ.get('EVENT_STREAMS_BATCH_SIZE', '50')),  # Entries per XREADGROUP
+    'block_ms': int(os.environ.get('EVENT_STREAMS_BLOCK_MS', '5000')),  # XREADGROUP block time
+    'claim_idle_ms': int(os.environ.get('EVENT_STREAMS_CLAIM_IDLE_MS', '60000')),  # Reclaim pending entries idle this long
+    'max_deliveries': int(os.environ.get('EVENT_STREAMS_MAX_DELIVERIES', '5')),  # Then move to <stream>:dead
+    'dedupe_ttl': int(os.environ.get('EVENT_STREAMS_DEDUPE_TTL', '86400')),  # Seconds handled event_ids are remembered
+}
+
+# In-process outbox: signal handlers queue events, a background thread publishes them in batches
+EVENT_OUTBOX = {
+    'enabled': os.environ.get('EVENT_OUTBOX_ENABLED', 'true').lower() == 'true',  # False = publish synchronously
+    'max_size': int(os.environ.get('EVENT_OUTBOX_MAX_SIZE', '10000')),  # Bounded queue capacity (events)
+    'batch_size': int(os.environ.get('EVENT_OUTBOX_BATCH_SIZE', '100')),  # Events per Redis round trip
+    'overflow_policy': os.environ.get('EVENT_OUTBOX_OVERFLOW_POLICY', 'spill'),  # 'spill' to OutboxEvent or 'drop'
+    'replay_interval': float(os.environ.get('EVENT_OUTBOX_REPLAY_INTERVAL', '30')),  # Seconds between spill replays
+}
+
 # WebSocket Settings
 WEBSOCKET_ACCEPT_ALL = True  # For development only
 
@@ -378,12 +433,42 @@ RECOMMENDATION_ENSEMBLE_WEIGHTS = {
 
 # Cache TTL for recommendation results (in seconds)
 # Recommendations are expensive to calculate, so we cache them
-# Invalidate when new reviews are posted or cleaner scores updated
+# Job, bid, review, CleanerScore and service area signals invalidate them
+# (versioned keys in the shared cache, see RecommendationCache); the TTL
+# bounds staleness from changes made without signals
 RECOMMENDATION_CACHE_TTL = int(os.getenv('RECOMMENDATION_CACHE_TTL', '3600'))  # 1 hour
 
+# Maximum number of candidate cleaners scored per job (after geographic and SQL filters)
+RECOMMENDATION_MAX_CANDIDATES = int(os.getenv('RECOMMENDATION_MAX_CANDIDATES', '50'))
+
+# Recommendation impression tracking (buffered, written by a background flusher)
+RECOMMENDATION_TRACKING_CONFIG = {
+    'flush_interval': float(os.getenv('RECOMMENDATION_TRACKING_FLUSH_INTERVAL', '5')),  # Seconds between flushes
+    'flush_size': int(os.getenv('RECOMMENDATION_TRACKING_FLUSH_SIZE', '500')),  # Pending rows that trigger an early flush
+}
+
+# Embedding-based candidate retrieval (neural/ensemble modes with a trained model)
+RECOMMENDATION_ANN_CONFIG = {
+    'enabled': os.getenv('RECOMMENDATION_ANN_ENABLED', 'true').lower() == 'true',
+    'backend': os.getenv('RECOMMENDATION_ANN_BACKEND', 'numpy'),  # INDEX_BACKENDS key or dotted class path
+    'cold_start_candidates': int(os.getenv('RECOMMENDATION_ANN_COLD_START_CANDIDATES', '10')),  # Slots for cleaners without embeddings
+}
+
+# Rolling window for the market price index (days of bids per bucket)
+RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS = int(os.getenv('RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS', '180'))
+
 # Model storage directory (for PyTorch checkpoints)
 RECOMMENDATION_MODELS_DIR = BASE_DIR / 'recommendations' / 'models'
 
+# Offline NN dataset directory (memory-mapped float32 .npy splits + scaler arrays)
+RECOMMENDATION_NN_DATA_DIR = BASE_DIR / 'nn_data'
+
+# Content-hashed text embedding cache used by add_text_embeddings
+RECOMMENDATION_EMBEDDING_CACHE_DIR = RECOMMENDATION_NN_DATA_DIR / 'embedding_cache'
+
+# How often (seconds) the model registry checks RECOMMENDATION_MODELS_DIR for a newer checkpoint
+RECOMMENDATION_MODEL_RELOAD_INTERVAL = int(os.getenv('RECOMMENDATION_MODEL_RELOAD_INTERVAL', '60'))
+
 # Neural network settings (for training)
 RECOMMENDATION_NN_CONFIG = {
     'cf_embedding_dim': 64,          # Collaborative filtering embedding size
@@ -395,6 +480,15 @@ RECOMMENDATION_NN_CONFIG = {
     'batch_size': 256,               # Training batch size
     'max_epochs': 50,                # Maximum training epochs
     'early_stopping_patience': 5,    # Early stopping patience
+    'num_workers': int(os.getenv('RECOMMENDATION_TRAIN_NUM_WORKERS', '0')),  # DataLoader workers (0 = main process)
+    'num_threads': int(os.getenv('RECOMMENDATION_TRAIN_NUM_THREADS', '0')) or None,  # torch CPU threads (None = default)
+}
+
+# CPU inference: TorchScript + dynamic int8 quantized model variants
+RECOMMENDATION_QUANTIZATION_CONFIG = {
+    'export': os.getenv('RECOMMENDATION_QUANTIZED_EXPORT', 'true').lower() == 'true',  # Export on save_model
+    'prefer_quantized': os.getenv('RECOMMENDATION_PREFER_QUANTIZED', 'true').lower() == 'true',  # Serve it on CPU
+    'max_delta': float(os.getenv('RECOMMENDATION_QUANTIZATION_MAX_DELTA', '0.02')),  # Max |quantized - float| score
 }
 
 # Feature extraction settings
@@ -410,6 +504,10 @@ RECOMMENDATION_FEATURE_CONFIG = {
     },
 }
 
+# How long (seconds) per-cleaner feature blocks stay cached; entries are also
+# keyed by CleanerScore.last_calculated, so a rescore invalidates them
+RECOMMENDATION_FEATURE_CACHE_TIMEOUT = int(os.getenv('RECOMMENDATION_FEATURE_CACHE_TIMEOUT', '86400'))
+
 # ===========================
 # Django Allauth Configuration
 # ===========================
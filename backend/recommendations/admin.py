@@ -5,6 +5,8 @@ Recommendation System Admin Configuration
 from django.contrib import admin
 from .models import (
     CleanerScore,
+    MarketPriceIndex,
+    CleanerStats,
     JobRecommendation,
     CleanerRecommendation,
     BidSuggestion,
@@ -50,6 +52,26 @@ class CleanerScoreAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(MarketPriceIndex)
+class MarketPriceIndexAdmin(admin.ModelAdmin):
+    list_display = [
+        'property_type', 'size_bucket', 'bid_count', 'avg_bid_amount',
+        'p25_bid_amount', 'median_bid_amount', 'p75_bid_amount', 'last_updated'
+    ]
+    list_filter = ['property_type']
+    readonly_fields = ['last_updated']
+
+
+@admin.register(CleanerStats)
+class CleanerStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        'cleaner', 'completed_jobs', 'assigned_jobs', 'total_jobs',
+        'review_count', 'avg_rating', 'last_updated'
+    ]
+    search_fields = ['cleaner__username', 'cleaner__email']
+    readonly_fields = ['last_updated']
+
+
 @admin.register(JobRecommendation)
 class JobRecommendationAdmin(admin.ModelAdmin):
     list_display = [
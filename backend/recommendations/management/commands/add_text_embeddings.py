@@ -6,6 +6,7 @@ to the existing feature dataset using sentence-transformers.
 
 Usage:
     python manage.py add_text_embeddings --input FILENAME --output FILENAME
+    python manage.py add_text_embeddings --input FILENAME --embeddings-file nn_data/embeddings.npy
 
 The command:
 1. Loads the base feature dataset
@@ -14,16 +15,28 @@ The command:
 4. Appends embedding features to dataset
 5. Saves enhanced dataset
 
+With --embeddings-file the embeddings are streamed into a float32
+memory-mapped .npy (rows aligned with the input CSV) instead of being
+added as CSV columns, and only the review ID column of the input is parsed.
+
+Vectors are cached on disk keyed by a hash of (model name, review text), so
+repeat runs only encode new or edited reviews. Use --no-cache to bypass it.
+
 Requirements:
     pip install sentence-transformers torch
 """
 
 from django.core.management.base import BaseCommand
+from django.conf import settings
 from reviews.models import Review
+from recommendations.services.embedding_cache import EmbeddingCache
 import pandas as pd
 import numpy as np
 
 
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+
 class Command(BaseCommand):
     help = 'Add text embeddings from review comments to NN training dataset'
 
@@ -40,17 +53,35 @@ class Command(BaseCommand):
             default='nn_training_dataset_with_embeddings.csv',
             help='Output CSV with embeddings added'
         )
+        parser.add_argument(
+            '--embeddings-file',
+            type=str,
+            default=None,
+            help='Write embeddings to this float32 .npy (memory-mappable) instead of CSV columns'
+        )
         parser.add_argument(
             '--batch-size',
             type=int,
             default=32,
             help='Batch size for embedding generation'
         )
+        parser.add_argument(
+            '--cache-dir',
+            type=str,
+            default=None,
+            help='Embedding cache directory (default: RECOMMENDATION_EMBEDDING_CACHE_DIR)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Encode every review without reading or updating the embedding cache'
+        )
 
     def handle(self, *args, **options):
         input_file = options['input']
         output_file = options['output']
         batch_size = options['batch_size']
+        embeddings_file = options['embeddings_file']
 
         self.stdout.write(self.style.SUCCESS('='*70))
         self.stdout.write(self.style.SUCCESS('TEXT EMBEDDING GENERATION'))
@@ -58,21 +89,13 @@ class Command(BaseCommand):
 
         # Load base features
         self.stdout.write(f'\n📁 Loading base features from {input_file}...')
-        df = pd.read_csv(input_file)
-        self.stdout.write(f'   Loaded {len(df)} samples with {len(df.columns)} features')
-
-        # Import sentence-transformers (lazy import to avoid dependency on startup)
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.stdout.write(f'\n🤖 Loading sentence-transformers model...')
-            model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-            self.stdout.write(f'   Model loaded: all-MiniLM-L6-v2 (384 dimensions)')
-        except ImportError:
-            self.stdout.write(self.style.ERROR(
-                '\n❌ Error: sentence-transformers not installed'
-            ))
-            self.stdout.write('   Run: pip install sentence-transformers torch')
-            return
+        if embeddings_file:
+            # Only the review IDs are needed to align embeddings with rows
+            df = pd.read_csv(input_file, usecols=['meta_review_id'])
+            self.stdout.write(f'   Loaded {len(df)} review IDs')
+        else:
+            df = pd.read_csv(input_file)
+            self.stdout.write(f'   Loaded {len(df)} samples with {len(df.columns)} features')
 
         # Retrieve review texts
         self.stdout.write(f'\n📝 Retrieving review texts...')
@@ -88,40 +111,94 @@ class Command(BaseCommand):
         non_empty = sum(1 for t in texts if t.strip())
         self.stdout.write(f'   Non-empty reviews: {non_empty}/{len(texts)} ({non_empty/len(texts)*100:.1f}%)')
 
-        # Generate embeddings in batches
-        self.stdout.write(f'\n🔮 Generating embeddings (batch size: {batch_size})...')
-        
-        all_embeddings = []
-        total_batches = (len(texts) + batch_size - 1) // batch_size
+        # Look up cached vectors; only new or edited texts need encoding
+        if options['no_cache']:
+            cache = None
+            to_encode = texts
+        else:
+            cache_dir = options['cache_dir'] or getattr(
+                settings, 'RECOMMENDATION_EMBEDDING_CACHE_DIR', 'nn_data/embedding_cache'
+            )
+            cache = EmbeddingCache(cache_dir, MODEL_NAME)
+            to_encode = cache.missing(texts)
+            self.stdout.write(f'\n🗄️  Embedding cache: {cache.directory} ({len(cache)} vectors)')
+            self.stdout.write(f'   Cached: {len(texts) - len(to_encode)}/{len(texts)}, to encode: {len(to_encode)} unique texts')
+
+        embedding_dim = cache.dim if cache is not None else None
+        encoded = None
         
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i+batch_size]
-            batch_num = i // batch_size + 1
+        if to_encode:
+            # Import sentence-transformers (lazy import to avoid dependency on startup)
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.stdout.write(f'\n🤖 Loading sentence-transformers model...')
+                model = SentenceTransformer(MODEL_NAME)
+                embedding_dim = model.get_sentence_embedding_dimension()
+                self.stdout.write(f'   Model loaded: all-MiniLM-L6-v2 ({embedding_dim} dimensions)')
+            except ImportError:
+                self.stdout.write(self.style.ERROR(
+                    '\n❌ Error: sentence-transformers not installed'
+                ))
+                self.stdout.write('   Run: pip install sentence-transformers torch')
+                return
+
+            # Generate embeddings in batches, written straight into one preallocated matrix
+            self.stdout.write(f'\n🔮 Generating embeddings (batch size: {batch_size})...')
+            encoded = np.empty((len(to_encode), embedding_dim), dtype=np.float32)
+            total_batches = (len(to_encode) + batch_size - 1) // batch_size
             
-            # Generate embeddings
-            embeddings = model.encode(
-                batch_texts,
-                show_progress_bar=False,
-                convert_to_numpy=True
-            )
-            all_embeddings.append(embeddings)
+            for i in range(0, len(to_encode), batch_size):
+                batch_texts = to_encode[i:i+batch_size]
+                batch_num = i // batch_size + 1
+                
+                # Generate embeddings
+                encoded[i:i+len(batch_texts)] = model.encode(
+                    batch_texts,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                )
+                
+                if batch_num % 10 == 0:
+                    self.stdout.write(f'   Processed batch {batch_num}/{total_batches}')
             
-            if batch_num % 10 == 0:
-                self.stdout.write(f'   Processed batch {batch_num}/{total_batches}')
+            if cache is not None:
+                cache.add(to_encode, encoded)
+                self.stdout.write(f'   💾 Cached {len(to_encode)} new vectors')
+        
+        if embeddings_file:
+            embeddings_matrix = np.lib.format.open_memmap(
+                embeddings_file,
+                mode='w+',
+                dtype=np.float32,
+                shape=(len(texts), embedding_dim)
+            )
+        else:
+            embeddings_matrix = np.empty((len(texts), embedding_dim), dtype=np.float32)
+        
+        if cache is not None:
+            cache.fill(texts, embeddings_matrix)
+        else:
+            embeddings_matrix[:] = encoded
         
-        # Combine all batches
-        embeddings_matrix = np.vstack(all_embeddings)
         self.stdout.write(f'   ✅ Generated embeddings: shape {embeddings_matrix.shape}')
+        
+        if embeddings_file:
+            embeddings_matrix.flush()
+            self.stdout.write(self.style.SUCCESS('\n' + '='*70))
+            self.stdout.write(self.style.SUCCESS('EMBEDDING GENERATION COMPLETE'))
+            self.stdout.write(self.style.SUCCESS('='*70))
+            self.stdout.write(f'Embedding features: {embedding_dim}')
+            self.stdout.write(f'Output file: {embeddings_file} (rows aligned with {input_file})')
+            self.stdout.write(self.style.SUCCESS('\n✅ Embeddings ready (open with np.load(mmap_mode="r"))!'))
+            return
 
         # Add embeddings as columns to dataframe
         self.stdout.write(f'\n📊 Adding embedding features to dataset...')
         
-        # Note: all-MiniLM-L6-v2 produces 384-dim embeddings, not 512
-        # Updating our documentation accordingly
-        embedding_dim = embeddings_matrix.shape[1]
-        
-        for i in range(embedding_dim):
-            df[f'emb_{i}'] = embeddings_matrix[:, i]
+        df = pd.concat(
+            [df, pd.DataFrame(embeddings_matrix, columns=[f'emb_{i}' for i in range(embedding_dim)], index=df.index)],
+            axis=1
+        )
         
         self.stdout.write(f'   Added {embedding_dim} embedding features')
 
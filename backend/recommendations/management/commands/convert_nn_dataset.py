@@ -0,0 +1,46 @@
+"""
+Management command to convert an nn_data directory to the mmap format.
+
+Rewrites the pickled feature scaler as plain arrays (feature_scaler.npz)
+and makes sure every split's features are stored as float32 .npy, so the
+dataset can be opened with np.load(mmap_mode='r').
+
+Usage:
+    python manage.py convert_nn_dataset
+    python manage.py convert_nn_dataset --dir nn_data
+"""
+
+from django.core.management.base import BaseCommand
+from recommendations.services.nn_dataset import NNDataset, SPLITS, LEGACY_SCALER_FILE
+
+
+class Command(BaseCommand):
+    help = 'Convert an nn_data directory to memory-mappable float32 arrays'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            type=str,
+            default=None,
+            help='Dataset directory (default: RECOMMENDATION_NN_DATA_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        dataset = NNDataset(options['dir'])
+        self.stdout.write(f'📁 Converting dataset in {dataset.directory}...')
+        
+        if (dataset.directory / LEGACY_SCALER_FILE).exists():
+            path = dataset.convert_legacy_scaler()
+            self.stdout.write(self.style.SUCCESS(f'✓ Scaler written to {path}'))
+        
+        for split in SPLITS:
+            if not dataset.features_path(split).exists():
+                self.stdout.write(f'   Skipping {split} (no features file)')
+                continue
+            
+            rewritten = dataset.ensure_float32(split)
+            features, target = dataset.load_split(split)
+            status = 'converted to float32' if rewritten else 'already float32'
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {split}: {features.shape[0]} samples x {features.shape[1]} features ({status})'
+            ))
@@ -0,0 +1,23 @@
+"""
+Management command to rebuild the cleaner stats table.
+
+Job and review signals keep rows up to date; run this after bulk imports,
+data fixes or when deploying the table for the first time.
+
+Usage:
+    python manage.py rebuild_cleaner_stats
+"""
+
+from django.core.management.base import BaseCommand
+from recommendations.services.cleaner_stats import CleanerStatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized per-cleaner job and review statistics'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding cleaner stats...')
+        
+        count = CleanerStatsService.rebuild_all()
+        
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt stats for {count} cleaners"))
@@ -0,0 +1,41 @@
+"""
+Management command to rebuild the market price index.
+
+Bids keep each bucket's count and average up to date as they are saved.
+Run with --stale-only frequently (e.g., every few minutes) to recompute the
+percentiles of buckets whose bids changed, and run a full rebuild
+periodically (e.g., nightly) so bids that fall outside the rolling window
+are dropped. See "Scheduled Maintenance" in
+docs/guides/RECOMMENDATION_DOCKER_DEPLOYMENT.md for a crontab.
+
+The index is seeded from existing bids by migration
+0005_seed_market_price_index.
+
+Usage:
+    python manage.py rebuild_market_price_index
+    python manage.py rebuild_market_price_index --stale-only
+"""
+
+from django.core.management.base import BaseCommand
+from recommendations.services.market_pricing import MarketPriceService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the market price index from recent bids'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-only',
+            action='store_true',
+            help='Only refresh buckets whose bids changed since their last refresh',
+        )
+
+    def handle(self, *args, **options):
+        if options['stale_only']:
+            self.stdout.write('Refreshing stale market price buckets...')
+            summary = MarketPriceService.refresh_stale_buckets()
+        else:
+            self.stdout.write('Rebuilding market price index...')
+            summary = MarketPriceService.rebuild_index()
+        
+        self.stdout.write(self.style.SUCCESS(f"✓ Refreshed {summary['buckets']} price buckets"))
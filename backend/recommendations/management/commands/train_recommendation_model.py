@@ -12,12 +12,14 @@ Workflow:
 Usage:
     python manage.py train_recommendation_model --epochs 50 --batch-size 256
 """
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, OuterRef, Subquery
 import torch
 import numpy as np
 from datetime import timedelta
+from itertools import islice
 from typing import Dict, List, Tuple
 
 from cleaning_jobs.models import CleaningJob, JobBid
@@ -30,6 +32,8 @@ from recommendations.services.ml_models import (
     train_hybrid_model
 )
 from recommendations.services.scoring_service import ScoringService
+from recommendations.services.embedding_index import CleanerEmbeddingIndex
+from recommendations.services.feature_store import FeatureStore, JOB_VALUE_FIELDS, NUM_FEATURES
 
 User = get_user_model()
 
@@ -43,6 +47,18 @@ class Command(BaseCommand):
         parser.add_argument('--learning-rate', type=float, default=0.001, help='Learning rate')
         parser.add_argument('--val-split', type=float, default=0.2, help='Validation split ratio')
         parser.add_argument('--model-version', type=str, default='1.0', help='Model version tag')
+        parser.add_argument(
+            '--num-workers',
+            type=int,
+            default=None,
+            help='DataLoader worker processes (default: RECOMMENDATION_NN_CONFIG num_workers)'
+        )
+        parser.add_argument(
+            '--num-threads',
+            type=int,
+            default=None,
+            help='Torch CPU threads (default: RECOMMENDATION_NN_CONFIG num_threads)'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting model training pipeline...'))
@@ -57,18 +73,28 @@ class Command(BaseCommand):
         self.stdout.write(f'Validation samples: {len(val_data["labels"])}')
         
         # Step 2: Train model
+        nn_config = getattr(settings, 'RECOMMENDATION_NN_CONFIG', {})
+        num_workers = options['num_workers']
+        if num_workers is None:
+            num_workers = nn_config.get('num_workers', 0)
+        num_threads = options['num_threads']
+        if num_threads is None:
+            num_threads = nn_config.get('num_threads')
+        
         self.stdout.write('Training hybrid recommendation model...')
         model = train_hybrid_model(
             train_data=train_data,
             val_data=val_data,
             num_epochs=options['epochs'],
             batch_size=options['batch_size'],
-            learning_rate=options['learning_rate']
+            learning_rate=options['learning_rate'],
+            num_workers=num_workers,
+            num_threads=num_threads
         )
         
-        # Step 3: Save model
+        # Step 3: Save model (with the ID mappings the training data was built from)
         self.stdout.write('Saving trained model...')
-        model_manager = ModelManager()
+        model_manager = self.model_manager
         
         metadata = {
             'version': options['model_version'],
@@ -77,23 +103,52 @@ class Command(BaseCommand):
             'epochs': options['epochs'],
             'batch_size': options['batch_size'],
             'learning_rate': options['learning_rate'],
-            'num_clients': len(set(train_data['client_ids'])),
-            'num_cleaners': len(set(train_data['cleaner_ids'])),
+            'num_clients': int(np.unique(train_data['client_ids']).size),
+            'num_cleaners': int(np.unique(train_data['cleaner_ids']).size),
         }
         
+        # Validation rows double as the accuracy probe for the quantized export
+        probe_size = min(len(val_data['labels']), 1024)
+        probe_inputs = None
+        if probe_size:
+            probe_inputs = (
+                torch.as_tensor(val_data['client_ids'][:probe_size], dtype=torch.long),
+                torch.as_tensor(val_data['cleaner_ids'][:probe_size], dtype=torch.long),
+                torch.as_tensor(val_data['property_types'][:probe_size], dtype=torch.long),
+                torch.as_tensor(val_data['features'][:probe_size], dtype=torch.float32),
+            )
+        
         checkpoint_path = model_manager.save_model(
             model=model,
             model_name='hybrid_recommendation',
             version=options['model_version'],
-            metadata=metadata
+            metadata=metadata,
+            probe_inputs=probe_inputs
         )
         
         self.stdout.write(self.style.SUCCESS(f'Model saved to: {checkpoint_path}'))
         
+        quantized = metadata.get('quantized')
+        if quantized:
+            status = '✅ accepted' if quantized['accepted'] else '⚠️  rejected'
+            self.stdout.write(
+                f'Quantized CPU variant {status} '
+                f'(max delta {quantized["max_abs_delta"]:.4f}, mean {quantized["mean_abs_delta"]:.4f})'
+            )
+        
+        # Export embeddings for candidate retrieval (only clients and cleaners the model was trained on)
+        embeddings_path = CleanerEmbeddingIndex.export_path(checkpoint_path)
+        CleanerEmbeddingIndex.from_model(
+            model, model_manager,
+            cleaner_rows=np.unique(train_data['cleaner_ids']),
+            client_rows=np.unique(train_data['client_ids'])
+        ).save(embeddings_path)
+        self.stdout.write(f'Embeddings exported to: {embeddings_path}')
+        
         # Step 4: Evaluate
         self._evaluate_model(model, val_data)
 
-    def _prepare_training_data(self, val_split: float = 0.2) -> Tuple[Dict, Dict]:
+    def _prepare_training_data(self, val_split: float = 0.2, chunk_size: int = 2000) -> Tuple[Dict, Dict]:
         """
         Prepare training and validation datasets from historical data.
         
@@ -105,94 +160,101 @@ class Command(BaseCommand):
         - Cleaner embedding ID
         - Property type (categorical)
         - Continuous: property_size, distance, cleaner_quality, cleaner_reliability,
-          cleaner_experience, bid_amount, etc.
+          cleaner_experience, client_budget, etc. (see FeatureStore)
+        
+        Streams one joined query in chunks (review rating fetched by a
+        subquery) and writes each chunk straight into preallocated NumPy
+        arrays.
         
         Returns:
-            (train_data, val_data) dictionaries
+            (train_data, val_data) dictionaries of NumPy arrays
         """
-        # Get all completed jobs with accepted bids
-        completed_jobs = CleaningJob.objects.filter(
+        # Review rating of the cleaner for the job (our target variable)
+        review_rating = Review.objects.filter(
+            job=OuterRef('pk'),
+            reviewee=OuterRef('cleaner')
+        ).order_by('-created_at').values('overall_rating')[:1]
+        
+        # Completed jobs with accepted bids and a review of the cleaner
+        training_jobs = CleaningJob.objects.filter(
             status='completed',
             accepted_bid__isnull=False
-        ).select_related('client', 'cleaner', 'property', 'accepted_bid')
+        ).annotate(
+            review_rating=Subquery(review_rating)
+        ).filter(review_rating__isnull=False)
         
-        self.stdout.write(f'Found {completed_jobs.count()} completed jobs')
+        num_samples = training_jobs.count()
+        self.stdout.write(f'Found {num_samples} completed jobs with reviews')
         
-        # Initialize feature lists
-        client_ids = []
-        cleaner_ids = []
-        property_types = []
-        continuous_features = []
-        labels = []
+        if num_samples == 0:
+            raise CommandError('No completed jobs with reviews to train on')
         
         # Build ID mappings
         model_manager = ModelManager()
         all_clients = list(User.objects.filter(role='client').values_list('id', flat=True))
         all_cleaners = list(User.objects.filter(role='cleaner').values_list('id', flat=True))
         model_manager.build_feature_maps(all_clients, all_cleaners)
+        self.model_manager = model_manager
         
         self.stdout.write(f'Total clients in DB: {len(all_clients)}')
         self.stdout.write(f'Total cleaners in DB: {len(all_cleaners)}')
         self.stdout.write(f'Client ID map size: {len(model_manager.client_id_map)}')
         self.stdout.write(f'Cleaner ID map size: {len(model_manager.cleaner_id_map)}')
-
         
-        # Calculate cleaner scores (needed for features)
-        scoring_service = ScoringService()
-        cleaner_scores = {}
-        for cleaner_id in all_cleaners:
-            cleaner = User.objects.get(id=cleaner_id)
-            score_obj = scoring_service.calculate_cleaner_score(cleaner)
-            # Convert CleanerScore model to dict for easy access
-            cleaner_scores[cleaner_id] = {
-                'quality_score': score_obj.quality_score or 50.0,
-                'communication_score': score_obj.communication_score or 50.0,
-                'professionalism_score': score_obj.professionalism_score or 50.0,
-                'timeliness_score': score_obj.timeliness_score or 50.0,
-                'overall_score': score_obj.overall_score or 50.0,
-                'completion_rate': score_obj.completion_rate or 0.5,
-                'on_time_rate': score_obj.on_time_rate or 0.5,
-                'total_jobs': score_obj.total_jobs or 0,
-                'avg_rating': score_obj.avg_rating or 5.0,
-            }
-        
-        # Process each job
-        for job in completed_jobs:
-            try:
-                # Get review rating (our target variable)
-                review = Review.objects.filter(job=job, reviewee=job.cleaner).first()
-                if not review:
-                    continue
-                
-                # Target: normalized rating (0-1 scale)
-                target = review.overall_rating / 10.0
-                
-                # Client and cleaner IDs (will be mapped to embedding indices)
-                client_id = model_manager.get_client_index(job.client.id)
-                cleaner_id = model_manager.get_cleaner_index(job.cleaner.id)
-                
-                # Property type
-                prop_type = model_manager.get_property_type_index(job.property.property_type)
-                
-                # Continuous features (normalized to similar scales)
-                features = self._extract_features(job, cleaner_scores)
-                
-                client_ids.append(client_id)
-                cleaner_ids.append(cleaner_id)
-                property_types.append(prop_type)
-                continuous_features.append(features)
-                labels.append(target)
-                
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'Error processing job {job.id}: {e}'))
-                continue
-        
-        # Convert to numpy arrays
-        client_ids = np.array(client_ids)
-        cleaner_ids = np.array(cleaner_ids)
-        property_types = np.array(property_types)
-        continuous_features = np.array(continuous_features)
-        labels = np.array(labels)
+        # Recalculate every cleaner score from full history (the feature store
+        # reads them), not whatever the last incremental run left behind
+        score_summary = ScoringService.update_all_cleaner_scores()
+        self.stdout.write(f'Updated {score_summary["updated"]}/{score_summary["total_cleaners"]} cleaner scores')
+        for error in score_summary['errors']:
+            self.stdout.write(self.style.ERROR(error))
+        
+        # Preallocate outputs
+        client_ids = np.empty(num_samples, dtype=np.int64)
+        cleaner_ids = np.empty(num_samples, dtype=np.int64)
+        property_types = np.empty(num_samples, dtype=np.int64)
+        continuous_features = np.empty((num_samples, NUM_FEATURES), dtype=np.float32)
+        labels = np.empty(num_samples, dtype=np.float32)
+        
+        rows = training_jobs.values_list(
+            'client_id',
+            'cleaner_id',
+            'property__property_type',
+            'review_rating',
+            *JOB_VALUE_FIELDS
+        ).iterator(chunk_size=chunk_size)
+        
+        filled = 0
+        while filled < num_samples:
+            # Rows added after the count are ignored
+            chunk = list(islice(rows, min(chunk_size, num_samples - filled)))
+            if not chunk:
+                break
+            
+            end = filled + len(chunk)
+            
+            # Client and cleaner IDs (mapped to embedding indices)
+            client_ids[filled:end] = [model_manager.get_client_index(row[0]) for row in chunk]
+            cleaner_ids[filled:end] = [model_manager.get_cleaner_index(row[1]) for row in chunk]
+            property_types[filled:end] = [model_manager.get_property_type_index(row[2]) for row in chunk]
+            
+            # Target: normalized rating (0-1 scale)
+            labels[filled:end] = np.array([row[3] for row in chunk], dtype=np.float32) / 10.0
+            
+            # Continuous features from the shared feature store (same as online scoring)
+            continuous_features[filled:end] = FeatureStore.features_for_job_values(
+                [row[1] for row in chunk],
+                [row[4:] for row in chunk]
+            )
+            
+            filled = end
+        
+        if filled < num_samples:
+            # Rows removed after the count
+            client_ids = client_ids[:filled]
+            cleaner_ids = cleaner_ids[:filled]
+            property_types = property_types[:filled]
+            continuous_features = continuous_features[:filled]
+            labels = labels[:filled]
         
         # Debug: Check index ranges
         self.stdout.write(f'Client indices - min: {client_ids.min()}, max: {client_ids.max()}')
@@ -200,122 +262,32 @@ class Command(BaseCommand):
         self.stdout.write(f'Expected max client index: {len(model_manager.client_id_map) - 1}')
         self.stdout.write(f'Expected max cleaner index: {len(model_manager.cleaner_id_map) - 1}')
         
-        # Shuffle data
-        indices = np.arange(len(labels))
-        np.random.shuffle(indices)
-        
-        client_ids = client_ids[indices]
-        cleaner_ids = cleaner_ids[indices]
-        property_types = property_types[indices]
-        continuous_features = continuous_features[indices]
-        labels = labels[indices]
-        
-        # Train/val split
+        # Shuffle and split (one permutation, no list round trip)
+        indices = np.random.permutation(len(labels))
         split_idx = int(len(labels) * (1 - val_split))
+        train_idx = indices[:split_idx]
+        val_idx = indices[split_idx:]
         
         train_data = {
-            'client_ids': client_ids[:split_idx].tolist(),
-            'cleaner_ids': cleaner_ids[:split_idx].tolist(),
-            'property_types': property_types[:split_idx].tolist(),
-            'features': continuous_features[:split_idx].tolist(),
-            'labels': labels[:split_idx].tolist(),
+            'client_ids': client_ids[train_idx],
+            'cleaner_ids': cleaner_ids[train_idx],
+            'property_types': property_types[train_idx],
+            'features': continuous_features[train_idx],
+            'labels': labels[train_idx],
             'num_clients': len(model_manager.client_id_map),  # Use full map size
             'num_cleaners': len(model_manager.cleaner_id_map),  # Use full map size
         }
         
         val_data = {
-            'client_ids': client_ids[split_idx:].tolist(),
-            'cleaner_ids': cleaner_ids[split_idx:].tolist(),
-            'property_types': property_types[split_idx:].tolist(),
-            'features': continuous_features[split_idx:].tolist(),
-            'labels': labels[split_idx:].tolist(),
+            'client_ids': client_ids[val_idx],
+            'cleaner_ids': cleaner_ids[val_idx],
+            'property_types': property_types[val_idx],
+            'features': continuous_features[val_idx],
+            'labels': labels[val_idx],
         }
         
         return train_data, val_data
 
-    def _extract_features(self, job: CleaningJob, cleaner_scores: Dict) -> List[float]:
-        """
-        Extract continuous features for a job-cleaner pair.
-        
-        Returns 18 normalized features:
-        1-2: Property location (lat, lng normalized)
-        3: Property size (normalized by 1000)
-        4: Estimated duration (hours)
-        5: Eco-friendly preference (0/1)
-        6: Bid amount (normalized by 1000)
-        7: Distance cleaner-to-job (km, normalized by 50)
-        8-12: Cleaner quality metrics (0-100 scale)
-        13: Cleaner completion rate (0-1)
-        14: Cleaner on-time rate (0-1)
-        15: Cleaner total jobs (log-normalized)
-        16: Cleaner avg rating (0-1)
-        17: Job posted hour (0-23, normalized by 24)
-        18: Day of week (0-6, normalized by 7)
-        """
-        cleaner_data = cleaner_scores.get(job.cleaner.id, {})
-        
-        features = [
-            # Location (normalize Athens coords ~38°N, 23°E)
-            (float(job.property.latitude) - 37.9838) * 10,  # Scale to ~[-2, 2]
-            (float(job.property.longitude) - 23.7275) * 10,
-            
-            # Property characteristics
-            float(job.property.size_sqft) / 1000.0,  # Normalize by 1000
-            float(job.accepted_bid.estimated_duration.total_seconds()) / 3600.0,  # Convert to hours
-            1.0 if len(job.checklist) > 3 else 0.0,  # Complex job indicator
-            
-            # Bid amount
-            float(job.accepted_bid.bid_amount) / 1000.0,  # Normalize by 1000
-            
-            # Distance (calculate or use 0 if no service area)
-            float(self._calculate_distance(job.property, job.cleaner)) / 50.0,  # Normalize by 50km
-            
-            # Cleaner quality (already 0-100, divide by 100 for 0-1)
-            float(cleaner_data.get('quality_score', 50.0)) / 100.0,
-            float(cleaner_data.get('communication_score', 50.0)) / 100.0,
-            float(cleaner_data.get('professionalism_score', 50.0)) / 100.0,
-            float(cleaner_data.get('timeliness_score', 50.0)) / 100.0,
-            float(cleaner_data.get('overall_score', 50.0)) / 100.0,
-            
-            # Cleaner reliability
-            float(cleaner_data.get('completion_rate', 0.5)),
-            float(cleaner_data.get('on_time_rate', 0.5)),
-            
-            # Cleaner experience (log transform)
-            np.log1p(float(cleaner_data.get('total_jobs', 0))) / 10.0,  # Normalize
-            float(cleaner_data.get('avg_rating', 5.0)) / 10.0,  # 0-1 scale
-            
-            # Temporal features
-            float(job.created_at.hour) / 24.0,
-            float(job.created_at.weekday()) / 7.0,
-        ]
-        
-        return features
-
-    def _calculate_distance(self, property_obj: Property, cleaner: User) -> float:
-        """Calculate distance between property and cleaner's service area center"""
-        try:
-            service_area = cleaner.service_area
-            if not service_area:
-                return 10.0  # Default distance
-            
-            # Simple Haversine distance
-            from math import radians, cos, sin, asin, sqrt
-            
-            lon1, lat1 = property_obj.longitude, property_obj.latitude
-            lon2, lat2 = service_area.longitude, service_area.latitude
-            
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * asin(sqrt(a))
-            km = 6371 * c
-            
-            return km
-        except:
-            return 10.0
-
     def _evaluate_model(self, model: HybridRecommendationModel, val_data: Dict):
         """Evaluate model on validation set"""
         self.stdout.write('Evaluating model...')
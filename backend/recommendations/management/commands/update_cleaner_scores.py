@@ -0,0 +1,64 @@
+"""
+Management command to update cleaner scores.
+
+By default processes the dirty-metric queue (metric groups marked by job,
+bid, review and payment signals) and refreshes rolling activity windows in
+bulk. Schedule it nightly (e.g., via cron).
+
+Usage:
+    python manage.py update_cleaner_scores
+    python manage.py update_cleaner_scores --full
+    python manage.py update_cleaner_scores --cleaner 42
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from recommendations.services.scoring_service import ScoringService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recalculate dirty cleaner score metrics and refresh activity windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recalculate every metric for every cleaner from full history'
+        )
+        parser.add_argument(
+            '--cleaner',
+            type=int,
+            help='Recalculate every metric for a single cleaner ID'
+        )
+
+    def handle(self, *args, **options):
+        if options['cleaner']:
+            try:
+                cleaner = User.objects.get(id=options['cleaner'], role='cleaner')
+            except User.DoesNotExist:
+                raise CommandError(f"Cleaner {options['cleaner']} not found")
+            
+            score = ScoringService.calculate_cleaner_score(cleaner)
+            self.stdout.write(self.style.SUCCESS(f"✓ {cleaner.username}: {score.overall_score:.2f}"))
+            return
+        
+        if options['full']:
+            self.stdout.write('Recalculating all cleaner scores...')
+            summary = ScoringService.update_all_cleaner_scores()
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Updated {summary['updated']}/{summary['total_cleaners']} cleaners"
+            ))
+        else:
+            self.stdout.write('Processing dirty score metrics...')
+            summary = ScoringService.update_dirty_cleaner_scores()
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Updated {summary['updated']} of {summary['dirty_cleaners']} dirty cleaners"
+            ))
+            
+            activity_updated = ScoringService.refresh_activity_metrics()
+            self.stdout.write(self.style.SUCCESS(f"✓ Refreshed activity for {activity_updated} cleaners"))
+        
+        for error in summary['errors']:
+            self.stdout.write(self.style.ERROR(f"✗ {error}"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-16 09:12
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketPriceIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('property_type', models.CharField(max_length=20)),
+                ('size_bucket', models.IntegerField(help_text='Lower bound of the property size bucket (sqft)')),
+                ('bid_count', models.IntegerField(default=0)),
+                ('avg_bid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('p25_bid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='25th percentile bid amount', max_digits=10)),
+                ('median_bid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('p75_bid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='75th percentile bid amount', max_digits=10)),
+                ('bid_amount_sum', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Running sum of bid amounts (average = sum / count)', max_digits=14)),
+                ('percentiles_stale', models.BooleanField(default=False, help_text='Bids changed since the percentiles were last computed')),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'market price index',
+                'unique_together': {('property_type', 'size_bucket')},
+            },
+        ),
+    ]
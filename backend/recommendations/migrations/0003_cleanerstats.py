@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-16 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0002_marketpriceindex'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleanerStats',
+            fields=[
+                ('cleaner', models.OneToOneField(limit_choices_to={'role': 'cleaner'}, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cleaner_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_jobs', models.IntegerField(default=0, help_text='All jobs assigned to the cleaner, any status')),
+                ('assigned_jobs', models.IntegerField(default=0, help_text='Confirmed, in progress or completed jobs')),
+                ('completed_jobs', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('avg_rating', models.FloatField(blank=True, null=True)),
+                ('visible_review_count', models.IntegerField(default=0)),
+                ('visible_avg_rating', models.FloatField(blank=True, null=True)),
+                ('avg_quality', models.FloatField(blank=True, null=True)),
+                ('avg_communication', models.FloatField(blank=True, null=True)),
+                ('avg_professionalism', models.FloatField(blank=True, null=True)),
+                ('avg_timeliness', models.FloatField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cleaner stats',
+            },
+        ),
+    ]
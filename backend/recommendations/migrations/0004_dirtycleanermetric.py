@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-16 13:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0003_cleanerstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyCleanerMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('quality', 'Quality'), ('reliability', 'Reliability'), ('bidding', 'Bidding'), ('experience', 'Experience'), ('specialization', 'Specialization'), ('activity', 'Activity')], max_length=20)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cleaner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_score_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('cleaner', 'metric')},
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated manually to seed the market price index from existing bids
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+# Same buckets as MarketPriceIndex.SIZE_BUCKETS (historical models have no class attributes)
+SIZE_BUCKETS = [0, 500, 1000, 1500, 2000, 3000, 5000]
+
+
+def bucket_for_size(size_sqft):
+    bucket = SIZE_BUCKETS[0]
+    for lower_bound in SIZE_BUCKETS:
+        if (size_sqft or 0) >= lower_bound:
+            bucket = lower_bound
+    return bucket
+
+
+def round_amount(value):
+    return Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def percentile(sorted_amounts, fraction):
+    position = (len(sorted_amounts) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_amounts) - 1)
+    return round_amount(sorted_amounts[lower] + (sorted_amounts[upper] - sorted_amounts[lower]) * (position - lower))
+
+
+def seed_market_price_index(apps, schema_editor):
+    """
+    Build every bucket from the bids inside the rolling window, so pricing
+    scores have market data right after deploy instead of only for bids
+    saved from now on.
+    """
+    JobBid = apps.get_model('cleaning_jobs', 'JobBid')
+    MarketPriceIndex = apps.get_model('recommendations', 'MarketPriceIndex')
+
+    window_days = getattr(settings, 'RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS', 180)
+    bids = JobBid.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=window_days)
+    ).values_list('job__property__property_type', 'job__property__size_sqft', 'bid_amount')
+
+    amounts = defaultdict(list)
+    for property_type, size_sqft, bid_amount in bids.iterator(chunk_size=2000):
+        amounts[(property_type, bucket_for_size(size_sqft))].append(bid_amount)
+
+    for (property_type, size_bucket), bucket_amounts in amounts.items():
+        bucket_amounts.sort()
+        total = sum(bucket_amounts, Decimal('0.00'))
+        MarketPriceIndex.objects.update_or_create(
+            property_type=property_type,
+            size_bucket=size_bucket,
+            defaults={
+                'bid_count': len(bucket_amounts),
+                'bid_amount_sum': round_amount(total),
+                'avg_bid_amount': round_amount(total / len(bucket_amounts)),
+                'p25_bid_amount': percentile(bucket_amounts, Decimal('0.25')),
+                'median_bid_amount': percentile(bucket_amounts, Decimal('0.50')),
+                'p75_bid_amount': percentile(bucket_amounts, Decimal('0.75')),
+                'percentiles_stale': False,
+            }
+        )
+
+
+def clear_market_price_index(apps, schema_editor):
+    """
+    Reverse operation - empty the index (it is rebuilt from bids).
+    """
+    apps.get_model('recommendations', 'MarketPriceIndex').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0004_dirtycleanermetric'),
+        ('cleaning_jobs', '0006_remove_legacy_jobphoto'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_market_price_index, clear_market_price_index),
+    ]
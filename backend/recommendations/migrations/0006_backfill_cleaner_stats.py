@@ -0,0 +1,89 @@
+# Generated manually to backfill CleanerStats for existing cleaners
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Avg, Count, Q
+
+# Same definitions as recommendations.services.cleaner_stats (migrations must
+# not depend on code that can change later)
+ASSIGNED_STATUSES = ['confirmed', 'in_progress', 'completed']
+
+RATING_CATEGORIES = ['quality', 'communication', 'professionalism', 'timeliness']
+
+
+def backfill_cleaner_stats(apps, schema_editor):
+    """
+    Build a statistics row for every cleaner with grouped queries, so
+    profile, bid and recommendation reads find materialized stats right
+    after deploy instead of computing them on each miss.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    CleaningJob = apps.get_model('cleaning_jobs', 'CleaningJob')
+    Review = apps.get_model('reviews', 'Review')
+    ReviewRating = apps.get_model('reviews', 'ReviewRating')
+    CleanerStats = apps.get_model('recommendations', 'CleanerStats')
+
+    values_by_cleaner = {
+        cleaner_id: {}
+        for cleaner_id in User.objects.filter(role='cleaner').values_list('id', flat=True)
+    }
+
+    grouped_queries = [
+        (
+            'cleaner_id',
+            CleaningJob.objects.filter(cleaner__isnull=False).values('cleaner_id').annotate(
+                total_jobs=Count('id'),
+                assigned_jobs=Count('id', filter=Q(status__in=ASSIGNED_STATUSES)),
+                completed_jobs=Count('id', filter=Q(status='completed')),
+            )
+        ),
+        (
+            'reviewee_id',
+            Review.objects.values('reviewee_id').annotate(
+                review_count=Count('id'),
+                avg_rating=Avg('overall_rating'),
+                visible_review_count=Count('id', filter=Q(is_visible=True)),
+                visible_avg_rating=Avg('overall_rating', filter=Q(is_visible=True)),
+            )
+        ),
+        (
+            'review__reviewee_id',
+            ReviewRating.objects.filter(review__is_visible=True).values('review__reviewee_id').annotate(**{
+                f'avg_{category}': Avg('rating', filter=Q(category=category))
+                for category in RATING_CATEGORIES
+            })
+        ),
+    ]
+
+    for key, rows in grouped_queries:
+        for row in rows:
+            cleaner_id = row.pop(key)
+            if cleaner_id in values_by_cleaner:
+                values_by_cleaner[cleaner_id].update(row)
+
+    # Rows created by signals since 0003 are replaced by the recomputed values
+    CleanerStats.objects.filter(cleaner_id__in=list(values_by_cleaner)).delete()
+    CleanerStats.objects.bulk_create(
+        [CleanerStats(cleaner_id=cleaner_id, **values) for cleaner_id, values in values_by_cleaner.items()],
+        batch_size=500
+    )
+
+
+def clear_cleaner_stats(apps, schema_editor):
+    """
+    Reverse operation - empty the table (it is rebuilt from jobs and reviews).
+    """
+    apps.get_model('recommendations', 'CleanerStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0005_seed_market_price_index'),
+        ('reviews', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_cleaner_stats, clear_cleaner_stats),
+    ]
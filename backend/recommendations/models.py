@@ -223,6 +223,165 @@ class CleanerScore(models.Model):
         return self.overall_score
 
 
+class DirtyCleanerMetric(models.Model):
+    """
+    Queue of CleanerScore metric groups that need recalculating.
+    Rows are marked by job, bid, review and payment signals and drained by
+    the update_cleaner_scores command, so only affected metrics of affected
+    cleaners are recomputed.
+    """
+    METRIC_CHOICES = [
+        ('quality', 'Quality'),
+        ('reliability', 'Reliability'),
+        ('bidding', 'Bidding'),
+        ('experience', 'Experience'),
+        ('specialization', 'Specialization'),
+        ('activity', 'Activity'),
+    ]
+    
+    cleaner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='dirty_score_metrics'
+    )
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    marked_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ['cleaner', 'metric']
+    
+    def __str__(self):
+        return f"{self.cleaner_id} - {self.metric} (marked {self.marked_at})"
+
+
+class MarketPriceIndex(models.Model):
+    """
+    Rolling bid price statistics per property type and size bucket.
+    Count, sum and average are updated incrementally as bids are saved or
+    deleted, so the recommendation engine can read market prices with a
+    single indexed lookup; percentiles (and the rolling window) are
+    recomputed by the rebuild_market_price_index command.
+    """
+    # Lower bounds (sqft) of the size buckets; the last bucket is open-ended
+    SIZE_BUCKETS = [0, 500, 1000, 1500, 2000, 3000, 5000]
+    
+    property_type = models.CharField(max_length=20)
+    size_bucket = models.IntegerField(
+        help_text="Lower bound of the property size bucket (sqft)"
+    )
+    
+    # Rolling statistics over recent bids in this bucket
+    bid_count = models.IntegerField(default=0)
+    avg_bid_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    p25_bid_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="25th percentile bid amount"
+    )
+    median_bid_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    p75_bid_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="75th percentile bid amount"
+    )
+    bid_amount_sum = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Running sum of bid amounts (average = sum / count)"
+    )
+    percentiles_stale = models.BooleanField(
+        default=False,
+        help_text="Bids changed since the percentiles were last computed"
+    )
+    
+    last_updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['property_type', 'size_bucket']
+        verbose_name_plural = 'market price index'
+    
+    def __str__(self):
+        return f"{self.property_type} {self.size_bucket}+ sqft - avg ${self.avg_bid_amount} ({self.bid_count} bids)"
+    
+    @classmethod
+    def bucket_for_size(cls, size_sqft):
+        """Return the size bucket (lower bound) containing size_sqft."""
+        bucket = cls.SIZE_BUCKETS[0]
+        for lower_bound in cls.SIZE_BUCKETS:
+            if size_sqft >= lower_bound:
+                bucket = lower_bound
+        return bucket
+    
+    @classmethod
+    def bucket_range(cls, size_bucket):
+        """Return (lower, upper) sqft bounds for a bucket; upper is None for the last one."""
+        index = cls.SIZE_BUCKETS.index(size_bucket)
+        upper = cls.SIZE_BUCKETS[index + 1] if index + 1 < len(cls.SIZE_BUCKETS) else None
+        return size_bucket, upper
+
+
+class CleanerStats(models.Model):
+    """
+    Denormalized per-cleaner job and review statistics.
+    Maintained from job and review signals so profile, bid and
+    recommendation reads are a single primary key lookup.
+    """
+    cleaner = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='cleaner_stats',
+        limit_choices_to={'role': 'cleaner'}
+    )
+    
+    # Job counts
+    total_jobs = models.IntegerField(
+        default=0,
+        help_text="All jobs assigned to the cleaner, any status"
+    )
+    assigned_jobs = models.IntegerField(
+        default=0,
+        help_text="Confirmed, in progress or completed jobs"
+    )
+    completed_jobs = models.IntegerField(default=0)
+    
+    # All reviews received
+    review_count = models.IntegerField(default=0)
+    avg_rating = models.FloatField(null=True, blank=True)
+    
+    # Visible reviews only (public profile and review stats)
+    visible_review_count = models.IntegerField(default=0)
+    visible_avg_rating = models.FloatField(null=True, blank=True)
+    avg_quality = models.FloatField(null=True, blank=True)
+    avg_communication = models.FloatField(null=True, blank=True)
+    avg_professionalism = models.FloatField(null=True, blank=True)
+    avg_timeliness = models.FloatField(null=True, blank=True)
+    
+    last_updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'cleaner stats'
+    
+    def __str__(self):
+        return f"{self.cleaner.username} - {self.completed_jobs} jobs, {self.review_count} reviews"
+    
+    @property
+    def completion_rate(self):
+        """Completed jobs / assigned jobs (0.0 when nothing assigned)."""
+        return self.completed_jobs / self.assigned_jobs if self.assigned_jobs > 0 else 0.0
+
+
 class JobRecommendation(models.Model):
     """
     Tracks job recommendations shown to cleaners.
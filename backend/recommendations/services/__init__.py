@@ -11,6 +11,15 @@ Docker-aware: Gracefully handles missing ML dependencies.
 
 # Core services (always available)
 from .scoring_service import ScoringService
+from .market_pricing import MarketPriceService
+from .cleaner_stats import CleanerStatsService
+from .feature_store import FeatureStore
+from .nn_dataset import NNDataset
+from .embedding_cache import EmbeddingCache
+from .embedding_index import CleanerEmbeddingIndex
+from .recommendation_tracker import RecommendationTracker, recommendation_tracker
+from .recommendation_cache import RecommendationCache
+from .open_job_index import OpenJobIndex, open_job_index
 
 # ML services (optional - requires PyTorch in Docker container)
 try:
@@ -22,6 +31,7 @@ try:
         ModelManager,
         train_hybrid_model
     )
+    from .model_registry import ModelRegistry, model_registry
     ML_MODELS_AVAILABLE = True
 except ImportError as e:
     # PyTorch not installed - will use rule-based mode only
@@ -39,6 +49,17 @@ from .recommendation_engine import RecommendationEngine
 
 __all__ = [
     'ScoringService',
+    'MarketPriceService',
+    'CleanerStatsService',
+    'FeatureStore',
+    'NNDataset',
+    'EmbeddingCache',
+    'CleanerEmbeddingIndex',
+    'RecommendationTracker',
+    'recommendation_tracker',
+    'RecommendationCache',
+    'OpenJobIndex',
+    'open_job_index',
     'RecommendationEngine',
 ]
 
@@ -51,5 +72,7 @@ if ML_MODELS_AVAILABLE:
         'BidPredictionModel',
         'ModelManager',
         'train_hybrid_model',
+        'ModelRegistry',
+        'model_registry',
     ])
 
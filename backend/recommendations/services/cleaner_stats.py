@@ -0,0 +1,218 @@
+"""
+Cleaner Stats Service
+
+Maintains the denormalized CleanerStats table (job counts, review averages
+and completion rate per cleaner) and is the single read accessor for those
+statistics. Rows are refreshed per cleaner from job and review signals and
+can be rebuilt in bulk with the rebuild_cleaner_stats command. Reads never
+write: a cleaner without a row gets statistics computed on the fly.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, Q
+
+from recommendations.models import CleanerStats
+from cleaning_jobs.models import CleaningJob
+from reviews.models import Review, ReviewRating
+
+User = get_user_model()
+
+# Statuses counted as "assigned" when computing completion rate
+ASSIGNED_STATUSES = ['confirmed', 'in_progress', 'completed']
+
+RATING_CATEGORIES = ['quality', 'communication', 'professionalism', 'timeliness']
+
+
+class CleanerStatsService:
+    """
+    Service for reading and maintaining per-cleaner statistics.
+    """
+    
+    @staticmethod
+    def get_stats(cleaner):
+        """
+        Get the statistics row for a cleaner.
+        
+        The row is cached on the cleaner instance (cleaner.cleaner_stats), so
+        repeated reads during one request cost a single query. A missing row
+        is computed but not saved (signals and the rebuild maintain the table).
+        
+        Args:
+            cleaner: User instance (role='cleaner')
+            
+        Returns:
+            CleanerStats instance
+        """
+        try:
+            return cleaner.cleaner_stats
+        except CleanerStats.DoesNotExist:
+            stats = CleanerStatsService.compute_cleaner(cleaner.id)
+            cleaner.cleaner_stats = stats
+            return stats
+    
+    @staticmethod
+    def get_stats_for_cleaners(cleaners):
+        """
+        Get statistics rows for many cleaners with one query.
+        
+        Returns:
+            dict: {cleaner_id: CleanerStats}
+        """
+        existing = CleanerStats.objects.in_bulk([cleaner.id for cleaner in cleaners])
+        
+        stats_by_cleaner = {}
+        for cleaner in cleaners:
+            stats = existing.get(cleaner.id)
+            if stats is None:
+                stats = CleanerStatsService.compute_cleaner(cleaner.id)
+            cleaner.cleaner_stats = stats
+            stats_by_cleaner[cleaner.id] = stats
+        
+        return stats_by_cleaner
+    
+    @staticmethod
+    def compute_cleaner(cleaner_id):
+        """
+        Calculate the statistics of a single cleaner without saving them.
+        
+        Returns:
+            CleanerStats instance (unsaved)
+        """
+        return CleanerStats(cleaner_id=cleaner_id, **CleanerStatsService._calculate_values(cleaner_id))
+    
+    @staticmethod
+    def refresh_cleaner(cleaner_id):
+        """
+        Recalculate the statistics row of a single cleaner.
+        
+        Returns:
+            CleanerStats instance
+        """
+        stats, created = CleanerStats.objects.update_or_create(
+            cleaner_id=cleaner_id,
+            defaults=CleanerStatsService._calculate_values(cleaner_id)
+        )
+        return stats
+    
+    @staticmethod
+    def refresh_cleaners(cleaner_ids):
+        """
+        Refresh statistics for the given users, skipping non-cleaners
+        (e.g. clients receiving reviews).
+        """
+        cleaner_ids = [cleaner_id for cleaner_id in set(cleaner_ids) if cleaner_id is not None]
+        if not cleaner_ids:
+            return
+        
+        for cleaner_id in User.objects.filter(
+            id__in=cleaner_ids,
+            role='cleaner'
+        ).values_list('id', flat=True):
+            CleanerStatsService.refresh_cleaner(cleaner_id)
+    
+    @staticmethod
+    def rebuild_all():
+        """
+        Rebuild statistics for every cleaner using grouped queries.
+        
+        Returns:
+            int: Number of cleaners rebuilt
+        """
+        values_by_cleaner = {
+            cleaner_id: {}
+            for cleaner_id in User.objects.filter(role='cleaner').values_list('id', flat=True)
+        }
+        
+        grouped_queries = [
+            (
+                'cleaner_id',
+                CleaningJob.objects.filter(cleaner__isnull=False).values('cleaner_id').annotate(
+                    **CleanerStatsService._job_aggregations()
+                )
+            ),
+            (
+                'reviewee_id',
+                Review.objects.values('reviewee_id').annotate(
+                    **CleanerStatsService._review_aggregations()
+                )
+            ),
+            (
+                'review__reviewee_id',
+                ReviewRating.objects.filter(review__is_visible=True).values('review__reviewee_id').annotate(
+                    **CleanerStatsService._rating_aggregations()
+                )
+            ),
+        ]
+        
+        for key, rows in grouped_queries:
+            for row in rows:
+                cleaner_id = row.pop(key)
+                if cleaner_id in values_by_cleaner:
+                    values_by_cleaner[cleaner_id].update(row)
+        
+        stats = [
+            CleanerStats(cleaner_id=cleaner_id, **values)
+            for cleaner_id, values in values_by_cleaner.items()
+        ]
+        CleanerStats.objects.bulk_create(
+            stats,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['cleaner'],
+            update_fields=CleanerStatsService._stat_fields() + ['last_updated']
+        )
+        
+        return len(stats)
+    
+    @staticmethod
+    def _calculate_values(cleaner_id):
+        values = {}
+        values.update(
+            CleaningJob.objects.filter(cleaner_id=cleaner_id).aggregate(
+                **CleanerStatsService._job_aggregations()
+            )
+        )
+        values.update(
+            Review.objects.filter(reviewee_id=cleaner_id).aggregate(
+                **CleanerStatsService._review_aggregations()
+            )
+        )
+        values.update(
+            ReviewRating.objects.filter(
+                review__reviewee_id=cleaner_id,
+                review__is_visible=True
+            ).aggregate(**CleanerStatsService._rating_aggregations())
+        )
+        return values
+    
+    @staticmethod
+    def _job_aggregations():
+        return {
+            'total_jobs': Count('id'),
+            'assigned_jobs': Count('id', filter=Q(status__in=ASSIGNED_STATUSES)),
+            'completed_jobs': Count('id', filter=Q(status='completed')),
+        }
+    
+    @staticmethod
+    def _review_aggregations():
+        return {
+            'review_count': Count('id'),
+            'avg_rating': Avg('overall_rating'),
+            'visible_review_count': Count('id', filter=Q(is_visible=True)),
+            'visible_avg_rating': Avg('overall_rating', filter=Q(is_visible=True)),
+        }
+    
+    @staticmethod
+    def _rating_aggregations():
+        return {
+            f'avg_{category}': Avg('rating', filter=Q(category=category))
+            for category in RATING_CATEGORIES
+        }
+    
+    @staticmethod
+    def _stat_fields():
+        return (
+            list(CleanerStatsService._job_aggregations()) +
+            list(CleanerStatsService._review_aggregations()) +
+            list(CleanerStatsService._rating_aggregations())
+        )
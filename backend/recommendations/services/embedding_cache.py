@@ -0,0 +1,149 @@
+"""
+Embedding Cache
+
+Persistent cache of text embeddings keyed by a hash of (model name, text),
+so re-running add_text_embeddings only encodes new or edited reviews.
+
+Layout (one directory per model):
+
+    segment_00000.npy         float32 [n, dim] vectors
+    segment_00000_keys.npy    [n] SHA-256 hex keys, row-aligned
+    segment_00001.npy ...     one segment appended per run with new texts
+
+A segment only counts once its keys file exists (written last), so an
+interrupted run never leaves half-written entries. compact() merges all
+segments into one.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of float32 embedding vectors.
+    """
+    
+    def __init__(self, directory, model_name):
+        self.model_name = model_name
+        self.directory = Path(directory) / re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self._segments = []
+        self._index = {}
+        self._load()
+    
+    def __len__(self):
+        return len(self._index)
+    
+    @property
+    def dim(self):
+        """Embedding dimension (None while the cache is empty)."""
+        return self._segments[0].shape[1] if self._segments else None
+    
+    def key(self, text):
+        """Cache key of a text under this cache's model."""
+        return hashlib.sha256(f'{self.model_name}\n{text}'.encode('utf-8')).hexdigest()
+    
+    def missing(self, texts):
+        """Unique texts (in first-seen order) that have no cached vector."""
+        missing = {}
+        for text in texts:
+            key = self.key(text)
+            if key not in self._index and key not in missing:
+                missing[key] = text
+        return list(missing.values())
+    
+    def add(self, texts, vectors):
+        """
+        Append vectors for texts as a new segment.
+        
+        Args:
+            texts: List of texts
+            vectors: float32-compatible array of shape [len(texts), dim]
+        """
+        if not len(texts):
+            return
+        
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f'Expected {self.dim}-dim vectors, got {vectors.shape[1]}')
+        
+        keys = np.array([self.key(text) for text in texts])
+        self._write_segment(len(self._segments), vectors, keys)
+    
+    def fill(self, texts, out):
+        """
+        Copy cached vectors for texts into out (rows aligned with texts).
+        
+        Args:
+            texts: List of texts, all present in the cache
+            out: Array (or writable memory map) of shape [len(texts), dim]
+            
+        Returns:
+            out
+        """
+        locations = np.array([self._index[self.key(text)] for text in texts], dtype=np.int64).reshape(-1, 2)
+        
+        # Gather per segment with fancy indexing instead of row by row
+        for segment_idx, segment in enumerate(self._segments):
+            positions = np.flatnonzero(locations[:, 0] == segment_idx)
+            if positions.size:
+                out[positions] = segment[locations[positions, 1]]
+        
+        return out
+    
+    def compact(self):
+        """Merge all segments into a single segment."""
+        if len(self._segments) <= 1:
+            return
+        
+        vectors = np.concatenate([np.asarray(segment) for segment in self._segments])
+        keys = np.concatenate([np.load(self._keys_path(i)) for i in range(len(self._segments))])
+        old_count = len(self._segments)
+        
+        self._segments = []
+        self._index = {}
+        self._write_segment(0, vectors, keys)
+        
+        # Remove the merged segments (keys first so a crash leaves no orphans counted)
+        for i in range(1, old_count):
+            self._keys_path(i).unlink(missing_ok=True)
+            self._vectors_path(i).unlink(missing_ok=True)
+        self._load()
+    
+    def _vectors_path(self, segment_idx):
+        return self.directory / f'segment_{segment_idx:05d}.npy'
+    
+    def _keys_path(self, segment_idx):
+        return self.directory / f'segment_{segment_idx:05d}_keys.npy'
+    
+    def _write_segment(self, segment_idx, vectors, keys):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        # Vectors first, keys last: the keys file marks the segment complete
+        for path, array in ((self._vectors_path(segment_idx), vectors), (self._keys_path(segment_idx), keys)):
+            temporary = path.with_name(path.stem + '.tmp.npy')
+            np.save(temporary, array)
+            temporary.replace(path)
+        
+        self._register_segment(segment_idx)
+    
+    def _register_segment(self, segment_idx):
+        vectors = np.load(self._vectors_path(segment_idx), mmap_mode='r')
+        keys = np.load(self._keys_path(segment_idx))
+        
+        if segment_idx < len(self._segments):
+            self._segments[segment_idx] = vectors
+        else:
+            self._segments.append(vectors)
+        
+        for row, key in enumerate(keys.tolist()):
+            self._index[key] = (segment_idx, row)
+    
+    def _load(self):
+        segment_idx = 0
+        while self._keys_path(segment_idx).exists() and self._vectors_path(segment_idx).exists():
+            self._register_segment(segment_idx)
+            segment_idx += 1
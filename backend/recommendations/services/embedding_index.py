@@ -0,0 +1,232 @@
+"""
+Cleaner embedding index for candidate retrieval.
+
+The hybrid model's collaborative tower learns one embedding per client and
+per cleaner. Exporting the cleaner embedding matrix lets the engine pick the
+top-K cleaners for a client with a single matrix-vector product, so the
+full ensemble scoring only runs on those candidates instead of on every
+eligible cleaner.
+
+Similarity is the cosine between the client and cleaner embeddings. It is a
+coarse retrieval signal - final ranking still comes from the ensemble.
+
+Backends are pluggable: RECOMMENDATION_ANN_CONFIG['backend'] is either a key
+of INDEX_BACKENDS or a dotted path to a class taking the (row-normalized)
+vector matrix and implementing search(query, k, mask=None) -> (rows, scores).
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class BruteForceIndex:
+    """
+    Exact inner-product top-K over an in-memory matrix.
+    
+    Scores every row with one BLAS call, then argpartition selects the top K
+    in linear time and only those K are sorted.
+    """
+    
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            query: Query vector [dim]
+            k: Number of rows to return
+            mask: Optional boolean array [num_rows]; False rows are never returned
+        
+        Returns:
+            (rows, scores) sorted by descending score
+        """
+        scores = self.vectors @ np.asarray(query, dtype=np.float32)
+        
+        candidates = len(scores)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            candidates = int(np.count_nonzero(mask))
+        
+        k = min(k, candidates)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        if k < len(scores):
+            rows = np.argpartition(-scores, k - 1)[:k]
+        else:
+            rows = np.arange(len(scores))
+        rows = rows[np.argsort(-scores[rows], kind='stable')][:k]
+        
+        return rows, scores[rows]
+
+
+INDEX_BACKENDS = {
+    'numpy': BruteForceIndex,
+}
+
+
+def _resolve_backend(backend: Optional[str]):
+    if backend is None:
+        backend = getattr(settings, 'RECOMMENDATION_ANN_CONFIG', {}).get('backend', 'numpy')
+    if backend in INDEX_BACKENDS:
+        return INDEX_BACKENDS[backend]
+    return import_string(backend)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CleanerEmbeddingIndex:
+    """
+    Top-K cleaner retrieval for a client from exported model embeddings.
+    
+    Usage:
+        index = CleanerEmbeddingIndex.from_model(model, manager, cleaner_rows, client_rows)
+        for cleaner_id, similarity in index.top_cleaners(client_id, 50, eligible_ids):
+            ...
+    """
+    
+    def __init__(
+        self,
+        cleaner_ids: np.ndarray,
+        cleaner_vectors: np.ndarray,
+        client_ids: np.ndarray,
+        client_vectors: np.ndarray,
+        backend: Optional[str] = None
+    ):
+        self.cleaner_ids = np.asarray(cleaner_ids, dtype=np.int64)
+        self.cleaner_vectors = _normalize(cleaner_vectors)
+        self.client_vectors = _normalize(client_vectors)
+        self._client_rows = {int(client_id): row for row, client_id in enumerate(client_ids)}
+        
+        # Sorted copy of the IDs for vectorized membership / eligibility masks
+        self._order = np.argsort(self.cleaner_ids, kind='stable')
+        self._sorted_ids = self.cleaner_ids[self._order]
+        
+        self.index = _resolve_backend(backend)(self.cleaner_vectors)
+    
+    def __len__(self):
+        return len(self.cleaner_ids)
+    
+    @classmethod
+    def from_model(
+        cls,
+        model,
+        manager,
+        cleaner_rows=None,
+        client_rows=None,
+        backend: Optional[str] = None
+    ) -> 'CleanerEmbeddingIndex':
+        """
+        Export the embedding matrices of a HybridRecommendationModel, keeping
+        only rows that belong to an ID in the manager's mappings.
+        
+        Args:
+            cleaner_rows: Optional embedding indices to keep (e.g. cleaners seen
+                in training); the rest are left to cold-start handling
+            client_rows: Optional client embedding indices to keep (e.g. clients
+                seen in training); jobs of other clients fall back to
+                CleanerScore ordering instead of untrained embeddings
+        """
+        collaborative = model.collaborative_model
+        cleaner_ids, cleaner_vectors = cls._export(
+            collaborative.cleaner_embedding, manager.cleaner_id_map, cleaner_rows
+        )
+        client_ids, client_vectors = cls._export(
+            collaborative.client_embedding, manager.client_id_map, client_rows
+        )
+        return cls(cleaner_ids, cleaner_vectors, client_ids, client_vectors, backend=backend)
+    
+    @staticmethod
+    def _export(embedding, id_map: Dict[int, int], keep_rows=None) -> Tuple[np.ndarray, np.ndarray]:
+        weights = embedding.weight.detach().cpu().numpy()
+        ids = np.fromiter(id_map.keys(), dtype=np.int64, count=len(id_map))
+        rows = np.fromiter(id_map.values(), dtype=np.int64, count=len(id_map))
+        
+        keep = rows < len(weights)
+        if keep_rows is not None:
+            keep &= np.isin(rows, np.asarray(keep_rows, dtype=np.int64))
+        return ids[keep], weights[rows[keep]]
+    
+    def save(self, path: Path):
+        """Write the exported matrices to a .npz next to the checkpoint"""
+        client_ids = np.fromiter(self._client_rows.keys(), dtype=np.int64, count=len(self._client_rows))
+        np.savez(
+            path,
+            cleaner_ids=self.cleaner_ids,
+            cleaner_vectors=self.cleaner_vectors,
+            client_ids=client_ids,
+            client_vectors=self.client_vectors,
+        )
+    
+    @classmethod
+    def load(cls, path: Path, backend: Optional[str] = None) -> 'CleanerEmbeddingIndex':
+        with np.load(path) as data:
+            return cls(
+                data['cleaner_ids'],
+                data['cleaner_vectors'],
+                data['client_ids'],
+                data['client_vectors'],
+                backend=backend
+            )
+    
+    @staticmethod
+    def export_path(checkpoint_path: Path) -> Path:
+        """Where the embedding export for a checkpoint lives"""
+        return checkpoint_path.with_name(f'{checkpoint_path.stem}_embeddings.npz')
+    
+    def has_client(self, client_id: int) -> bool:
+        return client_id in self._client_rows
+    
+    def contains(self, cleaner_ids) -> np.ndarray:
+        """Boolean array: which of cleaner_ids have an embedding"""
+        cleaner_ids = np.asarray(cleaner_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.zeros(len(cleaner_ids), dtype=bool)
+        
+        positions = np.searchsorted(self._sorted_ids, cleaner_ids)
+        positions = np.minimum(positions, len(self._sorted_ids) - 1)
+        return self._sorted_ids[positions] == cleaner_ids
+    
+    def top_cleaners(
+        self,
+        client_id: int,
+        k: int,
+        allowed_cleaner_ids=None
+    ) -> List[Tuple[int, float]]:
+        """
+        Retrieve the K cleaners most similar to a client.
+        
+        Args:
+            client_id: Raw client user ID (must satisfy has_client)
+            k: Number of cleaners to return
+            allowed_cleaner_ids: Optional iterable restricting the result
+                (e.g. cleaners covering the job's location)
+        
+        Returns:
+            List of (cleaner_id, cosine similarity), best first
+        """
+        query = self.client_vectors[self._client_rows[client_id]]
+        
+        mask = None
+        if allowed_cleaner_ids is not None:
+            allowed = np.unique(np.asarray(list(allowed_cleaner_ids), dtype=np.int64))
+            mask = np.zeros(len(self.cleaner_ids), dtype=bool)
+            mask[self._order[np.isin(self._sorted_ids, allowed, assume_unique=True)]] = True
+        
+        rows, scores = self.index.search(query, k, mask)
+        return list(zip(self.cleaner_ids[rows].tolist(), scores.tolist()))
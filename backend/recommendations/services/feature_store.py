@@ -0,0 +1,473 @@
+"""
+Feature Store
+
+Single definition of the 18 continuous features fed to the hybrid
+recommendation model. Training (train_recommendation_model) and online
+scoring (RecommendationEngine) both build their feature matrices here, so
+the vectors a model is trained on and scored with cannot drift apart.
+
+Features are assembled from three blocks:
+- job block (per job): location, size, duration, eco preference, budget
+  and posting time
+- distance (per job-cleaner pair): nearest active service-area center
+- cleaner block (per cleaner): CleanerScore metrics, cached per cleaner and
+  keyed by CleanerScore.last_calculated so a rescore invalidates it
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from recommendations.models import CleanerScore
+from users.models import ServiceArea
+from core.geo import haversine
+
+FEATURE_NAMES = [
+    'property_lat_offset',        # 0: (lat - reference) * 10
+    'property_lng_offset',        # 1: (lng - reference) * 10
+    'property_size',              # 2: size_sqft / 1000
+    'estimated_duration_hours',   # 3: scheduled end_time - start_time, 0 without end_time
+    'eco_friendly',               # 4: property prefers eco-friendly cleaning (0/1)
+    'client_budget',              # 5: client budget / 1000
+    'distance',                   # 6: km to nearest service-area center / max distance (50)
+    'quality_score',              # 7-11: CleanerScore quality metrics / 100
+    'communication_score',
+    'professionalism_score',
+    'timeliness_score',
+    'overall_score',
+    'completion_rate',            # 12-13: CleanerScore reliability rates
+    'on_time_rate',
+    'total_jobs',                 # 14: log1p(total_jobs) / 10
+    'avg_rating',                 # 15: avg_rating / 10
+    'posted_hour',                # 16: job created_at hour / 24
+    'posted_weekday',             # 17: job created_at weekday / 7
+]
+NUM_FEATURES = len(FEATURE_NAMES)
+
+# Column layout of the assembled matrix
+JOB_COLUMNS = [0, 1, 2, 3, 4, 5, 16, 17]
+DISTANCE_COLUMN = 6
+CLEANER_COLUMNS = slice(7, 16)
+
+# Reference point for location offsets and distance normalizer; overridable
+# via settings.RECOMMENDATION_FEATURE_CONFIG
+REFERENCE_LATITUDE = 37.9838
+REFERENCE_LONGITUDE = 23.7275
+MAX_DISTANCE_KM = 50.0
+
+# Distance used when the property or cleaner has no located service area
+DEFAULT_DISTANCE_KM = 15.0
+
+# CleanerScore fields of the cleaner block and their defaults for cleaners
+# without a score, in column order
+CLEANER_SCORE_FIELDS = [
+    ('quality_score', 50.0),
+    ('communication_score', 50.0),
+    ('professionalism_score', 50.0),
+    ('timeliness_score', 50.0),
+    ('overall_score', 50.0),
+    ('completion_rate', 0.5),
+    ('on_time_rate', 0.5),
+    ('total_jobs', 0.0),
+    ('avg_rating', 5.0),
+]
+
+# CleaningJob values needed for the job block (values() lookups)
+JOB_VALUE_FIELDS = [
+    'property__latitude',
+    'property__longitude',
+    'property__size_sqft',
+    'property__preferences',
+    'start_time',
+    'end_time',
+    'client_budget',
+    'created_at',
+]
+
+
+class FeatureStore:
+    """
+    Builds model feature matrices in batch.
+    """
+    
+    @staticmethod
+    def features_for_job(job, cleaners, cleaner_scores=None):
+        """
+        Features for one job paired with many candidate cleaners (online scoring).
+        
+        Args:
+            job: CleaningJob instance
+            cleaners: List of cleaner User instances (prefetched service_areas are used)
+            cleaner_scores: Optional list of CleanerScore (or None) aligned with cleaners
+            
+        Returns:
+            float32 array of shape [len(cleaners), NUM_FEATURES]
+        """
+        job_block = FeatureStore._job_block([FeatureStore._job_values(job)])
+        prop = job.property
+        
+        distances = FeatureStore.distances_km(prop, cleaners)
+        cleaner_block = FeatureStore.cleaner_blocks(
+            [cleaner.id for cleaner in cleaners],
+            cleaner_scores
+        )
+        
+        return FeatureStore._assemble(
+            np.repeat(job_block, len(cleaners), axis=0),
+            distances,
+            cleaner_block
+        )
+    
+    @staticmethod
+    def features_for_cleaner(jobs, cleaner, cleaner_score=None):
+        """
+        Features for many jobs paired with one cleaner (cleaner job feeds).
+        
+        Args:
+            jobs: List of CleaningJob instances (with their property loaded)
+            cleaner: Cleaner User instance (prefetched service_areas are used)
+            cleaner_score: The cleaner's CleanerScore, or None if it has none
+            
+        Returns:
+            float32 array of shape [len(jobs), NUM_FEATURES]
+        """
+        job_block = FeatureStore._job_block([FeatureStore._job_values(job) for job in jobs])
+        distances = FeatureStore.distances_km_for_cleaner([job.property for job in jobs], cleaner)
+        cleaner_block = FeatureStore.cleaner_blocks([cleaner.id], [cleaner_score])
+        
+        return FeatureStore._assemble(
+            job_block,
+            distances,
+            np.repeat(cleaner_block, len(jobs), axis=0)
+        )
+    
+    @staticmethod
+    def features_for_jobs(jobs):
+        """
+        Features for jobs paired with their assigned cleaner (training data).
+        
+        Args:
+            jobs: CleaningJob QuerySet (read with values(), no model
+                instances) or list of CleaningJob instances
+            
+        Returns:
+            float32 array of shape [len(jobs), NUM_FEATURES], in job order
+        """
+        if isinstance(jobs, QuerySet):
+            rows = list(jobs.values_list('cleaner_id', *JOB_VALUE_FIELDS))
+            cleaner_ids = [row[0] for row in rows]
+            job_rows = [row[1:] for row in rows]
+        else:
+            cleaner_ids = [job.cleaner_id for job in jobs]
+            job_rows = [FeatureStore._job_values(job) for job in jobs]
+        
+        return FeatureStore.features_for_job_values(cleaner_ids, job_rows)
+    
+    @staticmethod
+    def features_for_job_values(cleaner_ids, job_rows):
+        """
+        Features for raw job rows paired with cleaners, for callers that
+        stream values() rows themselves (e.g. chunked training-data prep).
+        
+        Args:
+            cleaner_ids: Cleaner ID per row
+            job_rows: Tuples of JOB_VALUE_FIELDS values, aligned with cleaner_ids
+            
+        Returns:
+            float32 array of shape [len(job_rows), NUM_FEATURES]
+        """
+        job_block = FeatureStore._job_block(job_rows)
+        
+        centers = FeatureStore.service_area_centers(set(cleaner_ids))
+        distances = FeatureStore._pair_distances_km(
+            [row[0] for row in job_rows],
+            [row[1] for row in job_rows],
+            cleaner_ids,
+            centers
+        )
+        
+        return FeatureStore._assemble(
+            job_block,
+            distances,
+            FeatureStore.cleaner_blocks(cleaner_ids)
+        )
+    
+    @staticmethod
+    def distances_km(property_obj, cleaners):
+        """
+        Distance in km from a property to each cleaner's nearest active
+        service-area center (DEFAULT_DISTANCE_KM when unknown).
+        """
+        centers = FeatureStore.service_area_centers(cleaners)
+        return FeatureStore._pair_distances_km(
+            [property_obj.latitude] * len(cleaners),
+            [property_obj.longitude] * len(cleaners),
+            [cleaner.id for cleaner in cleaners],
+            centers
+        )
+    
+    @staticmethod
+    def distances_km_for_cleaner(properties, cleaner):
+        """
+        Distance in km from each property to one cleaner's nearest active
+        service-area center (DEFAULT_DISTANCE_KM when unknown).
+        """
+        centers = FeatureStore.service_area_centers([cleaner])
+        return FeatureStore._pair_distances_km(
+            [prop.latitude for prop in properties],
+            [prop.longitude for prop in properties],
+            [cleaner.id] * len(properties),
+            centers
+        )
+    
+    @staticmethod
+    def service_area_centers(cleaners):
+        """
+        Active, located service-area centers per cleaner.
+        
+        Args:
+            cleaners: Cleaner User instances and/or cleaner IDs. Instances
+                with prefetched service_areas need no query; the rest are
+                loaded with a single query.
+            
+        Returns:
+            dict: {cleaner_id: [(latitude, longitude), ...]}
+        """
+        centers = {}
+        to_query = []
+        
+        for cleaner in cleaners:
+            if isinstance(cleaner, int):
+                to_query.append(cleaner)
+                continue
+            
+            prefetched = getattr(cleaner, '_prefetched_objects_cache', {}).get('service_areas')
+            if prefetched is None:
+                to_query.append(cleaner.id)
+                continue
+            
+            centers[cleaner.id] = [
+                (float(area.center_latitude), float(area.center_longitude))
+                for area in prefetched
+                if area.is_active and area.center_latitude is not None and area.center_longitude is not None
+            ]
+        
+        if to_query:
+            for cleaner_id, latitude, longitude in ServiceArea.objects.filter(
+                cleaner_id__in=to_query,
+                is_active=True,
+                center_latitude__isnull=False,
+                center_longitude__isnull=False
+            ).values_list('cleaner_id', 'center_latitude', 'center_longitude'):
+                centers.setdefault(cleaner_id, []).append((float(latitude), float(longitude)))
+        
+        return centers
+    
+    @staticmethod
+    def cleaner_blocks(cleaner_ids, cleaner_scores=None):
+        """
+        Cleaner feature blocks aligned with cleaner_ids (duplicates allowed).
+        
+        Blocks are cached per cleaner under a key that includes
+        CleanerScore.last_calculated, so they are recomputed only after the
+        cleaner is rescored.
+        
+        Args:
+            cleaner_ids: List of cleaner IDs
+            cleaner_scores: Optional already-loaded CleanerScores (any order,
+                None entries allowed); when omitted only score timestamps are
+                queried and full rows are loaded for cache misses.
+            
+        Returns:
+            float32 array of shape [len(cleaner_ids), 9]
+        """
+        unique_ids = list(dict.fromkeys(cleaner_ids))
+        
+        if cleaner_scores is None:
+            loaded = {}
+            stamps = dict(
+                CleanerScore.objects.filter(
+                    cleaner_id__in=unique_ids
+                ).values_list('cleaner_id', 'last_calculated')
+            )
+        else:
+            loaded = {score.cleaner_id: score for score in cleaner_scores if score is not None}
+            stamps = {cleaner_id: score.last_calculated for cleaner_id, score in loaded.items()}
+        
+        keys = {
+            cleaner_id: FeatureStore._cleaner_cache_key(cleaner_id, stamp)
+            for cleaner_id, stamp in stamps.items()
+        }
+        cached = cache.get_many(list(keys.values())) if keys else {}
+        
+        blocks = {}
+        missing = []
+        for cleaner_id, key in keys.items():
+            if key in cached:
+                blocks[cleaner_id] = cached[key]
+            else:
+                missing.append(cleaner_id)
+        
+        if missing:
+            fields = [field for field, default in CLEANER_SCORE_FIELDS]
+            raw = {
+                cleaner_id: [getattr(loaded[cleaner_id], field) for field in fields]
+                for cleaner_id in missing if cleaner_id in loaded
+            }
+            to_load = [cleaner_id for cleaner_id in missing if cleaner_id not in raw]
+            if to_load:
+                for row in CleanerScore.objects.filter(cleaner_id__in=to_load).values_list('cleaner_id', *fields):
+                    raw[row[0]] = list(row[1:])
+            
+            computed_ids = list(raw)
+            computed = FeatureStore._cleaner_block(
+                np.array([raw[cleaner_id] for cleaner_id in computed_ids], dtype=np.float64)
+            )
+            
+            timeout = getattr(settings, 'RECOMMENDATION_FEATURE_CACHE_TIMEOUT', 86400)
+            to_cache = {}
+            for cleaner_id, block in zip(computed_ids, computed):
+                blocks[cleaner_id] = block
+                to_cache[keys[cleaner_id]] = block
+            cache.set_many(to_cache, timeout)
+        
+        default_block = FeatureStore._cleaner_block(
+            np.array([[default for field, default in CLEANER_SCORE_FIELDS]], dtype=np.float64)
+        )[0]
+        
+        if not cleaner_ids:
+            return np.empty((0, len(CLEANER_SCORE_FIELDS)), dtype=np.float32)
+        
+        return np.stack([blocks.get(cleaner_id, default_block) for cleaner_id in cleaner_ids])
+    
+    @staticmethod
+    def _cleaner_cache_key(cleaner_id, last_calculated):
+        return f'recommendations:cleaner_features:{cleaner_id}:{last_calculated.timestamp()}'
+    
+    @staticmethod
+    def _cleaner_block(raw):
+        """Normalize raw CleanerScore values ([n, 9], CLEANER_SCORE_FIELDS order)."""
+        block = np.empty(raw.shape, dtype=np.float32)
+        
+        # Quality metrics (0-100 scale)
+        block[:, 0:5] = raw[:, 0:5] / 100.0
+        
+        # Reliability
+        block[:, 5:7] = raw[:, 5:7]
+        
+        # Experience
+        block[:, 7] = np.log1p(raw[:, 7]) / 10.0
+        block[:, 8] = raw[:, 8] / 10.0
+        
+        return block
+    
+    @staticmethod
+    def _job_values(job):
+        """JOB_VALUE_FIELDS of a CleaningJob instance, in the same order."""
+        prop = job.property
+        return (
+            prop.latitude,
+            prop.longitude,
+            prop.size_sqft,
+            prop.preferences,
+            job.start_time,
+            job.end_time,
+            job.client_budget,
+            job.created_at,
+        )
+    
+    @staticmethod
+    def _job_block(rows):
+        """
+        Job-level features for rows of JOB_VALUE_FIELDS values.
+        
+        Returns:
+            float32 array of shape [len(rows), len(JOB_COLUMNS)]
+        """
+        def column(index, convert, default=0.0):
+            return np.array(
+                [convert(row[index]) if row[index] is not None else default for row in rows],
+                dtype=np.float64
+            )
+        
+        config = getattr(settings, 'RECOMMENDATION_FEATURE_CONFIG', {})
+        reference_lat = config.get('athens_center_lat', REFERENCE_LATITUDE)
+        reference_lng = config.get('athens_center_lng', REFERENCE_LONGITUDE)
+        
+        latitudes = column(0, float, reference_lat)
+        longitudes = column(1, float, reference_lng)
+        
+        block = np.empty((len(rows), len(JOB_COLUMNS)), dtype=np.float32)
+        
+        # Location
+        block[:, 0] = (latitudes - reference_lat) * 10
+        block[:, 1] = (longitudes - reference_lng) * 10
+        
+        # Property and job
+        block[:, 2] = column(2, float) / 1000.0
+        block[:, 3] = [FeatureStore._scheduled_hours(row[4], row[5]) for row in rows]
+        block[:, 4] = column(3, lambda preferences: 1.0 if preferences.get('eco_friendly') else 0.0)
+        block[:, 5] = column(6, float) / 1000.0
+        
+        # Temporal
+        block[:, 6] = column(7, lambda created_at: created_at.hour) / 24.0
+        block[:, 7] = column(7, lambda created_at: created_at.weekday()) / 7.0
+        
+        return block
+    
+    @staticmethod
+    def _scheduled_hours(start_time, end_time):
+        """
+        Scheduled job length in hours from the job's own time window, so
+        training (completed jobs) and serving (open jobs) see the same value.
+        A window ending before it starts is taken to run past midnight.
+        """
+        if start_time is None or end_time is None:
+            return 0.0
+        start = start_time.hour * 60 + start_time.minute
+        end = end_time.hour * 60 + end_time.minute
+        return ((end - start) % (24 * 60)) / 60.0
+    
+    @staticmethod
+    def _pair_distances_km(latitudes, longitudes, cleaner_ids, centers):
+        """
+        Distance from each (latitude, longitude) to its paired cleaner's
+        nearest service-area center, with one vectorized haversine.
+        """
+        distances = np.full(len(cleaner_ids), DEFAULT_DISTANCE_KM)
+        
+        # Flatten (pair index, area center) combinations
+        owners, point_lats, point_lngs, area_lats, area_lngs = [], [], [], [], []
+        for i, (latitude, longitude, cleaner_id) in enumerate(zip(latitudes, longitudes, cleaner_ids)):
+            if latitude is None or longitude is None:
+                continue
+            for area_lat, area_lng in centers.get(cleaner_id, ()):
+                owners.append(i)
+                point_lats.append(float(latitude))
+                point_lngs.append(float(longitude))
+                area_lats.append(area_lat)
+                area_lngs.append(area_lng)
+        
+        if not owners:
+            return distances
+        
+        area_distances = haversine(point_lats, point_lngs, area_lats, area_lngs, unit='km')
+        
+        # Keep the nearest area per pair
+        nearest = np.full(len(cleaner_ids), np.inf)
+        np.minimum.at(nearest, np.array(owners), area_distances)
+        
+        return np.where(np.isfinite(nearest), nearest, distances)
+    
+    @staticmethod
+    def _assemble(job_block, distances, cleaner_block):
+        """Place the blocks into the FEATURE_NAMES column layout."""
+        config = getattr(settings, 'RECOMMENDATION_FEATURE_CONFIG', {})
+        max_distance_km = config.get('max_distance_km', MAX_DISTANCE_KM)
+        
+        features = np.empty((len(distances), NUM_FEATURES), dtype=np.float32)
+        features[:, JOB_COLUMNS] = job_block
+        features[:, DISTANCE_COLUMN] = distances / max_distance_km
+        features[:, CLEANER_COLUMNS] = cleaner_block
+        return features
@@ -0,0 +1,228 @@
+"""
+Market Pricing Service
+
+Maintains the market price index: rolling bid statistics per property type
+and size bucket, kept as running totals that each bid save adjusts in
+constant time instead of aggregated on every recommendation request.
+Percentiles and the rolling window are recomputed periodically by the
+rebuild_market_price_index command.
+"""
+
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from recommendations.models import MarketPriceIndex
+from cleaning_jobs.models import JobBid, CleaningJob
+
+
+class MarketPriceService:
+    """
+    Service for maintaining and querying the market price index.
+    """
+    
+    @staticmethod
+    def refresh_bucket(property_type, size_bucket):
+        """
+        Recalculate statistics for a single bucket from bids inside the
+        rolling window (RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS).
+        
+        Args:
+            property_type: Property type of the bucket
+            size_bucket: Lower bound of the size bucket (see MarketPriceIndex.SIZE_BUCKETS)
+            
+        Returns:
+            MarketPriceIndex instance
+        """
+        window_days = getattr(settings, 'RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS', 180)
+        lower, upper = MarketPriceIndex.bucket_range(size_bucket)
+        
+        bids = JobBid.objects.filter(
+            job__property__property_type=property_type,
+            job__property__size_sqft__gte=lower,
+            created_at__gte=timezone.now() - timedelta(days=window_days)
+        )
+        if upper is not None:
+            bids = bids.filter(job__property__size_sqft__lt=upper)
+        
+        amounts = sorted(bids.values_list('bid_amount', flat=True))
+        
+        entry, created = MarketPriceIndex.objects.get_or_create(
+            property_type=property_type,
+            size_bucket=size_bucket
+        )
+        entry.bid_count = len(amounts)
+        entry.bid_amount_sum = MarketPriceService._round(sum(amounts, Decimal('0.00')))
+        entry.percentiles_stale = False
+        
+        if amounts:
+            entry.avg_bid_amount = MarketPriceService._round(sum(amounts) / len(amounts))
+            entry.p25_bid_amount = MarketPriceService._percentile(amounts, Decimal('0.25'))
+            entry.median_bid_amount = MarketPriceService._percentile(amounts, Decimal('0.50'))
+            entry.p75_bid_amount = MarketPriceService._percentile(amounts, Decimal('0.75'))
+        else:
+            entry.avg_bid_amount = Decimal('0.00')
+            entry.p25_bid_amount = Decimal('0.00')
+            entry.median_bid_amount = Decimal('0.00')
+            entry.p75_bid_amount = Decimal('0.00')
+        
+        entry.save()
+        return entry
+    
+    @staticmethod
+    def bucket_for_job(job_id):
+        """
+        Get the (property_type, size_bucket) a job's bids are indexed under.
+        
+        Returns:
+            tuple, or None if the job no longer exists
+        """
+        row = CleaningJob.objects.filter(pk=job_id).values_list(
+            'property__property_type',
+            'property__size_sqft'
+        ).first()
+        if row is None:
+            return None
+        property_type, size_sqft = row
+        return property_type, MarketPriceIndex.bucket_for_size(size_sqft)
+    
+    @staticmethod
+    def apply_bid_delta(property_type, size_bucket, count_delta, amount_delta):
+        """
+        Adjust a bucket's running count, sum and average for a single bid
+        change without reloading the bucket's bids. Percentiles are only
+        flagged stale; refresh_stale_buckets() recomputes them.
+        
+        Args:
+            property_type: Property type of the bucket
+            size_bucket: Lower bound of the size bucket
+            count_delta: +1 for a new bid, -1 for a deleted one, 0 for an amount change
+            amount_delta: Change in the bucket's total bid amount
+            
+        Returns:
+            MarketPriceIndex instance
+        """
+        with transaction.atomic():
+            MarketPriceIndex.objects.get_or_create(
+                property_type=property_type,
+                size_bucket=size_bucket
+            )
+            entry = MarketPriceIndex.objects.select_for_update().get(
+                property_type=property_type,
+                size_bucket=size_bucket
+            )
+            
+            entry.bid_count += count_delta
+            entry.bid_amount_sum += Decimal(amount_delta)
+            if entry.bid_count > 0:
+                entry.avg_bid_amount = MarketPriceService._round(entry.bid_amount_sum / entry.bid_count)
+            else:
+                # Only reachable if the totals drifted from the bids table;
+                # the stale flag makes the next refresh recompute them
+                entry.bid_count = 0
+                entry.bid_amount_sum = Decimal('0.00')
+                entry.avg_bid_amount = Decimal('0.00')
+            entry.percentiles_stale = True
+            entry.save()
+        
+        return entry
+    
+    @staticmethod
+    def refresh_stale_buckets():
+        """
+        Recompute every bucket whose bids changed since its percentiles were
+        last calculated.
+        
+        Returns:
+            dict: Summary of updates
+        """
+        buckets = list(
+            MarketPriceIndex.objects.filter(percentiles_stale=True)
+            .values_list('property_type', 'size_bucket')
+        )
+        for property_type, size_bucket in buckets:
+            MarketPriceService.refresh_bucket(property_type, size_bucket)
+        
+        return {
+            'buckets': len(buckets),
+        }
+    
+    @staticmethod
+    def lookup(property_type, size_sqft):
+        """
+        Get market price statistics for a property type and size.
+        
+        Returns:
+            MarketPriceIndex instance, or None if no bids have been indexed
+        """
+        return MarketPriceIndex.objects.filter(
+            property_type=property_type,
+            size_bucket=MarketPriceIndex.bucket_for_size(size_sqft)
+        ).first()
+    
+    @staticmethod
+    def lookup_many(properties):
+        """
+        Get market price statistics for many properties with one query.
+        
+        Args:
+            properties: (property_type, size_sqft) pairs
+            
+        Returns:
+            list: MarketPriceIndex instance (or None) per pair, in order
+        """
+        buckets = [
+            (property_type, MarketPriceIndex.bucket_for_size(size_sqft))
+            for property_type, size_sqft in properties
+        ]
+        if not buckets:
+            return []
+        
+        entries = {
+            (entry.property_type, entry.size_bucket): entry
+            for entry in MarketPriceIndex.objects.filter(
+                property_type__in={property_type for property_type, _ in buckets},
+                size_bucket__in={size_bucket for _, size_bucket in buckets}
+            )
+        }
+        return [entries.get(bucket) for bucket in buckets]
+    
+    @staticmethod
+    def rebuild_index():
+        """
+        Refresh every bucket.
+        Should be run periodically so bids leaving the rolling window are dropped.
+        
+        Returns:
+            dict: Summary of updates
+        """
+        buckets = set(
+            MarketPriceIndex.objects.values_list('property_type', 'size_bucket')
+        )
+        for property_type, size_sqft in JobBid.objects.values_list(
+            'job__property__property_type',
+            'job__property__size_sqft'
+        ).distinct():
+            buckets.add((property_type, MarketPriceIndex.bucket_for_size(size_sqft)))
+        
+        for property_type, size_bucket in sorted(buckets):
+            MarketPriceService.refresh_bucket(property_type, size_bucket)
+        
+        return {
+            'buckets': len(buckets),
+        }
+    
+    @staticmethod
+    def _percentile(sorted_amounts, fraction):
+        """Linear-interpolated percentile of an already sorted list of Decimals."""
+        position = (len(sorted_amounts) - 1) * fraction
+        lower = int(position)
+        upper = min(lower + 1, len(sorted_amounts) - 1)
+        value = sorted_amounts[lower] + (sorted_amounts[upper] - sorted_amounts[lower]) * (position - lower)
+        return MarketPriceService._round(value)
+    
+    @staticmethod
+    def _round(value):
+        return Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -11,12 +11,21 @@ Uses PyTorch for flexibility and production deployment.
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.data import DataLoader, TensorDataset
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+import copy
 import json
+import logging
+import time
 from pathlib import Path
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+# The device notice is printed once per process, not per ModelManager
+_device_notice_shown = False
+
 
 class CollaborativeFilteringModel(nn.Module):
     """
@@ -315,11 +324,14 @@ class ModelManager:
         self.model_dir.mkdir(parents=True, exist_ok=True)
         
         # Device detection (CPU in Docker container by default)
+        global _device_notice_shown
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        if torch.cuda.is_available():
-            print(f"✅ GPU available in Docker container: {torch.cuda.get_device_name(0)}")
-        else:
-            print(f"ℹ️  Running on CPU in Docker container (expected for development)")
+        if not _device_notice_shown:
+            _device_notice_shown = True
+            if torch.cuda.is_available():
+                print(f"✅ GPU available in Docker container: {torch.cuda.get_device_name(0)}")
+            else:
+                print(f"ℹ️  Running on CPU in Docker container (expected for development)")
         
         # Feature mappings (populated during training)
         self.client_id_map = {}
@@ -336,15 +348,33 @@ class ModelManager:
         model: nn.Module,
         model_name: str,
         version: str,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        probe_inputs: Optional[Tuple[torch.Tensor, ...]] = None
     ):
-        """Save model checkpoint with metadata"""
+        """
+        Save model checkpoint with metadata.
+        
+        HybridRecommendationModel and BidPredictionModel checkpoints also get a
+        TorchScript, int8 dynamically quantized CPU variant (see
+        export_quantized), and its accuracy report is added to
+        metadata['quantized']. probe_inputs (a batch of forward() arguments,
+        e.g. from the validation set) are used for the accuracy check.
+        """
         checkpoint_path = self.model_dir / f'{model_name}_v{version}.pt'
+        metadata = metadata if metadata is not None else {}
+        
+        # Written before the checkpoint so a reloading registry never sees a
+        # new checkpoint without its quantized variant
+        if type(model) in QUANTIZABLE_MODELS and _quantization_config().get('export', True):
+            try:
+                metadata['quantized'] = self.export_quantized(model, checkpoint_path, probe_inputs)
+            except Exception as e:
+                logger.warning(f'Quantized export failed for {checkpoint_path.name}: {e}')
         
         checkpoint = {
             'model_state_dict': model.state_dict(),
             'model_class': model.__class__.__name__,
-            'metadata': metadata or {},
+            'metadata': metadata,
             'client_id_map': self.client_id_map,
             'cleaner_id_map': self.cleaner_id_map,
             'property_type_map': self.property_type_map,
@@ -359,6 +389,85 @@ class ModelManager:
         
         return checkpoint_path
     
+    @staticmethod
+    def quantized_path(checkpoint_path: Path) -> Path:
+        """Where the quantized TorchScript variant of a checkpoint lives"""
+        # Not *.pt, so get_checkpoint_path never picks it up as a checkpoint
+        return checkpoint_path.with_name(f'{checkpoint_path.stem}_int8.torchscript')
+    
+    def export_quantized(
+        self,
+        model: nn.Module,
+        checkpoint_path: Path,
+        probe_inputs: Optional[Tuple[torch.Tensor, ...]] = None
+    ) -> Dict:
+        """
+        Export a TorchScript-traced, dynamically int8-quantized CPU copy of a model.
+        
+        Linear layers are quantized (embeddings stay float32). The variant is
+        compared with the float model on probe_inputs (random inputs if not
+        given) and only written if the largest absolute output difference is
+        within RECOMMENDATION_QUANTIZATION_CONFIG['max_delta'].
+        
+        Returns:
+            Dict with 'path', 'max_abs_delta', 'mean_abs_delta' and 'accepted'
+        """
+        float_model = copy.deepcopy(model).cpu().eval()
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(float_model), {nn.Linear}, dtype=torch.qint8
+        )
+        
+        if probe_inputs is None:
+            probe_inputs = QUANTIZABLE_MODELS[type(model)](float_model)
+        probe_inputs = tuple(torch.as_tensor(tensor).cpu() for tensor in probe_inputs)
+        
+        with torch.no_grad():
+            # strict=False: the hybrid model returns a breakdown dict
+            traced = torch.jit.trace(quantized, probe_inputs, strict=False)
+            delta = (_primary_output(traced(*probe_inputs)) - _primary_output(float_model(*probe_inputs))).abs()
+        
+        report = {
+            'path': self.quantized_path(checkpoint_path).name,
+            'max_abs_delta': float(delta.max()),
+            'mean_abs_delta': float(delta.mean()),
+            'probe_size': int(probe_inputs[0].shape[0]),
+        }
+        report['accepted'] = report['max_abs_delta'] <= _quantization_config().get('max_delta', 0.02)
+        
+        quantized_path = self.quantized_path(checkpoint_path)
+        if report['accepted']:
+            torch.jit.save(traced, str(quantized_path))
+        else:
+            quantized_path.unlink(missing_ok=True)
+            logger.warning(
+                f'Quantized {checkpoint_path.stem} rejected: max delta {report["max_abs_delta"]:.4f}'
+            )
+        
+        return report
+    
+    def load_quantized(self, checkpoint_path: Path, metadata: Dict) -> Optional[torch.jit.ScriptModule]:
+        """
+        Load the quantized variant of a checkpoint for CPU inference.
+        
+        Returns None (use the float model) when running on GPU, when
+        prefer_quantized is off, or when the variant is missing or its
+        recorded accuracy delta exceeds the configured max_delta.
+        """
+        config = _quantization_config()
+        report = metadata.get('quantized') or {}
+        quantized_path = self.quantized_path(checkpoint_path)
+        
+        if (self.device.type != 'cpu'
+                or not config.get('prefer_quantized', True)
+                or not report.get('accepted')
+                or report.get('max_abs_delta', float('inf')) > config.get('max_delta', 0.02)
+                or not quantized_path.exists()):
+            return None
+        
+        scripted = torch.jit.load(str(quantized_path), map_location='cpu')
+        scripted.eval()
+        return scripted
+    
     def load_model(
         self,
         model: nn.Module,
@@ -366,26 +475,83 @@ class ModelManager:
         version: str = 'latest'
     ) -> nn.Module:
         """Load model checkpoint"""
+        checkpoint = self.load_checkpoint(self.get_checkpoint_path(model_name, version))
+        
+        model.load_state_dict(checkpoint['model_state_dict'])
+        model.to(self.device)
+        model.eval()
+        
+        return model
+    
+    def get_checkpoint_path(self, model_name: str, version: str = 'latest') -> Path:
+        """Resolve the checkpoint file for a model version ('latest' = newest file)"""
         if version == 'latest':
             # Find latest version
             checkpoints = list(self.model_dir.glob(f'{model_name}_v*.pt'))
             if not checkpoints:
                 raise ValueError(f'No checkpoints found for {model_name}')
-            checkpoint_path = max(checkpoints, key=lambda p: p.stat().st_mtime)
-        else:
-            checkpoint_path = self.model_dir / f'{model_name}_v{version}.pt'
+            return max(checkpoints, key=lambda p: p.stat().st_mtime)
         
+        return self.model_dir / f'{model_name}_v{version}.pt'
+    
+    def load_checkpoint(self, checkpoint_path: Path) -> Dict:
+        """Read a checkpoint file and restore the feature mappings stored in it"""
         checkpoint = torch.load(checkpoint_path, map_location=self.device)
         
-        model.load_state_dict(checkpoint['model_state_dict'])
         self.client_id_map = checkpoint['client_id_map']
         self.cleaner_id_map = checkpoint['cleaner_id_map']
         self.property_type_map = checkpoint['property_type_map']
         
-        model.to(self.device)
+        return checkpoint
+    
+    def predict_batch(
+        self,
+        model: nn.Module,
+        client_ids: List[int],
+        cleaner_ids: List[int],
+        property_types: List[str],
+        features: np.ndarray
+    ) -> np.ndarray:
+        """
+        Score a batch of client/cleaner/property pairs with one forward pass.
+        
+        Args:
+            model: Trained HybridRecommendationModel
+            client_ids: Raw client user IDs [batch_size]
+            cleaner_ids: Raw cleaner user IDs [batch_size]
+            property_types: Property type strings [batch_size]
+            features: Continuous features [batch_size, 18]
+        
+        Returns:
+            Model predictions (0-1 scale) as a NumPy array [batch_size]
+        """
+        # Quantized TorchScript variants run on CPU
+        device = next(model.parameters(), torch.empty(0)).device
+        
+        client_tensor = torch.tensor(
+            [self.get_client_index(client_id) for client_id in client_ids],
+            dtype=torch.long, device=device
+        )
+        cleaner_tensor = torch.tensor(
+            [self.get_cleaner_index(cleaner_id) for cleaner_id in cleaner_ids],
+            dtype=torch.long, device=device
+        )
+        property_tensor = torch.tensor(
+            [self.get_property_type_index(property_type) for property_type in property_types],
+            dtype=torch.long, device=device
+        )
+        features_tensor = torch.as_tensor(
+            np.asarray(features, dtype=np.float32), device=device
+        )
+        
         model.eval()
+        with torch.no_grad():
+            predictions, _ = model(
+                client_tensor, cleaner_tensor, property_tensor, features_tensor
+            )
         
-        return model
+        # squeeze() inside the model collapses a batch of one to a scalar
+        return predictions.reshape(-1).cpu().numpy()
     
     def build_feature_maps(self, clients: List[int], cleaners: List[int]):
         """Build ID mappings for embeddings"""
@@ -405,6 +571,61 @@ class ModelManager:
         return self.property_type_map.get(property_type, 0)
 
 
+def _quantization_config() -> Dict:
+    return getattr(settings, 'RECOMMENDATION_QUANTIZATION_CONFIG', {})
+
+
+def _primary_output(output) -> torch.Tensor:
+    """Scores of a hybrid model, or the stacked bids of a bid model"""
+    if isinstance(output, tuple) and isinstance(output[-1], dict):
+        return output[0].reshape(-1)
+    if isinstance(output, tuple):
+        return torch.stack(output)
+    return output
+
+
+def _hybrid_probe_inputs(model: HybridRecommendationModel, batch_size: int = 256) -> Tuple[torch.Tensor, ...]:
+    """Random in-range forward() arguments for a HybridRecommendationModel"""
+    collaborative = model.collaborative_model
+    return (
+        torch.randint(collaborative.client_embedding.num_embeddings, (batch_size,)),
+        torch.randint(collaborative.cleaner_embedding.num_embeddings, (batch_size,)),
+        torch.randint(model.content_model.property_type_embedding.num_embeddings, (batch_size,)),
+        torch.rand(batch_size, 18),
+    )
+
+
+def _bid_probe_inputs(model: BidPredictionModel, batch_size: int = 256) -> Tuple[torch.Tensor, ...]:
+    """Random in-range forward() arguments for a BidPredictionModel"""
+    return (
+        torch.randint(model.property_type_embedding.num_embeddings, (batch_size,)),
+        torch.rand(batch_size, 12),
+    )
+
+
+# Models with a quantized CPU export, and how to build probe inputs for them
+QUANTIZABLE_MODELS = {
+    HybridRecommendationModel: _hybrid_probe_inputs,
+    BidPredictionModel: _bid_probe_inputs,
+}
+
+
+def _to_tensor_dataset(data: Dict) -> TensorDataset:
+    """
+    Build a TensorDataset once from NumPy arrays or lists.
+    
+    NumPy inputs (including memory-mapped arrays) are wrapped without copying
+    when their dtype already matches.
+    """
+    return TensorDataset(
+        torch.as_tensor(np.asarray(data['client_ids']), dtype=torch.long),
+        torch.as_tensor(np.asarray(data['cleaner_ids']), dtype=torch.long),
+        torch.as_tensor(np.asarray(data['property_types']), dtype=torch.long),
+        torch.as_tensor(np.asarray(data['features']), dtype=torch.float32),
+        torch.as_tensor(np.asarray(data['labels']), dtype=torch.float32),
+    )
+
+
 # Example training function (to be called from management command)
 def train_hybrid_model(
     train_data: Dict,
@@ -412,11 +633,18 @@ def train_hybrid_model(
     num_epochs: int = 50,
     batch_size: int = 256,
     learning_rate: float = 0.001,
-    patience: int = 5
+    patience: int = 5,
+    num_workers: int = 0,
+    num_threads: Optional[int] = None
 ) -> HybridRecommendationModel:
     """
     Train hybrid recommendation model with early stopping.
     
+    Tensors are built once; a DataLoader reshuffles them every epoch and
+    yields every sample (the last batch may be smaller), except that a
+    remainder of a single sample is skipped: BatchNorm layers can't train
+    on a batch of one.
+    
     Args:
         train_data: Dict with 'client_ids', 'cleaner_ids', 'property_types', 'features', 'labels'
         val_data: Same structure as train_data
@@ -424,12 +652,17 @@ def train_hybrid_model(
         batch_size: Batch size for training
         learning_rate: Initial learning rate
         patience: Early stopping patience
+        num_workers: DataLoader worker processes (0 = load in the main process)
+        num_threads: Intra-op CPU threads for torch (None = torch default)
     
     Returns:
         Trained model
     """
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    
     # Build model - use map sizes from training data
     num_clients = train_data.get('num_clients', len(set(train_data['client_ids'])))
     num_cleaners = train_data.get('num_cleaners', len(set(train_data['cleaner_ids'])))
@@ -439,6 +672,30 @@ def train_hybrid_model(
         num_cleaners=num_cleaners
     ).to(device)
     
+    # Datasets are converted to tensors once, not per batch
+    train_dataset = _to_tensor_dataset(train_data)
+    if len(train_dataset) < 2:
+        raise ValueError('Training needs at least 2 samples (BatchNorm requires batches larger than 1)')
+    
+    # A trailing batch of one sample would make BatchNorm raise; drop it
+    # (a different sample each epoch, since batches are reshuffled)
+    drop_last = len(train_dataset) % batch_size == 1
+    train_loader = DataLoader(
+        train_dataset,
+        batch_size=batch_size,
+        shuffle=True,
+        drop_last=drop_last,
+        num_workers=num_workers,
+        pin_memory=device.type == 'cuda',
+        persistent_workers=num_workers > 0
+    )
+    num_train_samples = len(train_dataset) - (1 if drop_last else 0)
+    
+    # Validation set stays resident on the device
+    val_client_ids, val_cleaner_ids, val_property_types, val_features, val_labels = (
+        tensor.to(device) for tensor in _to_tensor_dataset(val_data).tensors
+    )
+    
     # Loss and optimizer
     criterion = nn.MSELoss()
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
@@ -453,20 +710,14 @@ def train_hybrid_model(
         # Training
         model.train()
         train_loss = 0.0
-        
-        # Create batches
-        num_batches = len(train_data['labels']) // batch_size
-        
-        for batch_idx in range(num_batches):
-            start_idx = batch_idx * batch_size
-            end_idx = start_idx + batch_size
-            
-            # Get batch
-            client_ids = torch.tensor(train_data['client_ids'][start_idx:end_idx]).to(device)
-            cleaner_ids = torch.tensor(train_data['cleaner_ids'][start_idx:end_idx]).to(device)
-            property_types = torch.tensor(train_data['property_types'][start_idx:end_idx]).to(device)
-            features = torch.tensor(train_data['features'][start_idx:end_idx], dtype=torch.float32).to(device)
-            labels = torch.tensor(train_data['labels'][start_idx:end_idx], dtype=torch.float32).to(device)
+        epoch_start = time.perf_counter()
+        
+        for client_ids, cleaner_ids, property_types, features, labels in train_loader:
+            client_ids = client_ids.to(device, non_blocking=True)
+            cleaner_ids = cleaner_ids.to(device, non_blocking=True)
+            property_types = property_types.to(device, non_blocking=True)
+            features = features.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
             
             # Forward
             optimizer.zero_grad()
@@ -477,25 +728,25 @@ def train_hybrid_model(
             loss.backward()
             optimizer.step()
             
-            train_loss += loss.item()
+            # Weight by batch size so a smaller last batch counts correctly
+            train_loss += loss.item() * labels.size(0)
         
-        train_loss /= num_batches
+        epoch_seconds = time.perf_counter() - epoch_start
+        train_loss /= max(num_train_samples, 1)
+        samples_per_second = num_train_samples / epoch_seconds if epoch_seconds > 0 else 0.0
         
         # Validation
         model.eval()
         with torch.no_grad():
-            val_client_ids = torch.tensor(val_data['client_ids']).to(device)
-            val_cleaner_ids = torch.tensor(val_data['cleaner_ids']).to(device)
-            val_property_types = torch.tensor(val_data['property_types']).to(device)
-            val_features = torch.tensor(val_data['features'], dtype=torch.float32).to(device)
-            val_labels = torch.tensor(val_data['labels'], dtype=torch.float32).to(device)
-            
             val_predictions, breakdown = model(
                 val_client_ids, val_cleaner_ids, val_property_types, val_features
             )
             val_loss = criterion(val_predictions, val_labels).item()
         
-        print(f'Epoch {epoch+1}/{num_epochs} - Train Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}, Alpha: {model.get_alpha_value():.4f}')
+        print(
+            f'Epoch {epoch+1}/{num_epochs} - Train Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}, '
+            f'Alpha: {model.get_alpha_value():.4f}, {samples_per_second:.0f} samples/s'
+        )
         
         # Learning rate scheduling
         scheduler.step(val_loss)
@@ -0,0 +1,196 @@
+"""
+Process-wide registry for trained recommendation models.
+
+Loads each model checkpoint once per process and shares it across requests
+and threads, instead of every RecommendationEngine reading it from disk.
+
+Hot reload: at most every RECOMMENDATION_MODEL_RELOAD_INTERVAL seconds the
+registry checks RECOMMENDATION_MODELS_DIR for a newer checkpoint. A newer
+one is loaded into a fresh LoadedModel and swapped in with a single
+reference assignment, so requests holding the previous model finish with it.
+
+On CPU the registry serves the checkpoint's TorchScript int8 variant when
+one was exported and passed its accuracy check (ModelManager.load_quantized).
+
+Each loaded hybrid model also carries a CleanerEmbeddingIndex for candidate
+retrieval, read from the checkpoint's exported embeddings; checkpoints
+without an export are served without retrieval.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from recommendations.services.ml_models import HybridRecommendationModel, ModelManager
+from recommendations.services.embedding_index import CleanerEmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedModel:
+    """
+    An immutable snapshot of a loaded model and the ModelManager holding its
+    ID mappings. Callers keep a reference for the duration of a request.
+    """
+    def __init__(
+        self,
+        model,
+        manager: ModelManager,
+        checkpoint_path: Path,
+        checkpoint_mtime: float,
+        cleaner_index: Optional[CleanerEmbeddingIndex] = None,
+        quantized: bool = False
+    ):
+        self.model = model
+        self.manager = manager
+        self.cleaner_index = cleaner_index
+        self.quantized = quantized
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_mtime = checkpoint_mtime
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """
+    Thread-safe, lazily populated registry of loaded models.
+    
+    Usage:
+        loaded = model_registry.get('hybrid_recommendation')
+        if loaded:
+            scores = loaded.manager.predict_batch(loaded.model, ...)
+    """
+    
+    # Builders for each registered model name. Embedding sizes are read from
+    # the checkpoint itself so no database counts are needed at load time.
+    MODEL_BUILDERS = {
+        'hybrid_recommendation': lambda state: HybridRecommendationModel(
+            num_clients=state['collaborative_model.client_embedding.weight'].shape[0],
+            num_cleaners=state['collaborative_model.cleaner_embedding.weight'].shape[0]
+        ),
+    }
+    
+    def __init__(self, model_dir: Optional[Path] = None):
+        self.model_dir = model_dir
+        self._entries: Dict[str, LoadedModel] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def reload_interval(self) -> float:
+        return getattr(settings, 'RECOMMENDATION_MODEL_RELOAD_INTERVAL', 60)
+    
+    def get(self, model_name: str = 'hybrid_recommendation') -> Optional[LoadedModel]:
+        """
+        Get the current model for `model_name`, loading or reloading it if due.
+        
+        A missing checkpoint is remembered like a loaded one: the directory
+        is checked again only after the reload interval (or invalidate()).
+        
+        Returns:
+            LoadedModel, or None if no checkpoint is available
+        """
+        entry = self._entries.get(model_name)
+        if not self._check_due(model_name):
+            return entry
+        
+        # Only one thread (re)loads; others keep serving the current model
+        if not self._lock.acquire(blocking=entry is None):
+            return entry
+        try:
+            entry = self._entries.get(model_name)
+            if not self._check_due(model_name):
+                return entry
+            
+            self._last_checked[model_name] = time.monotonic()
+            return self._refresh(model_name, entry)
+        finally:
+            self._lock.release()
+    
+    def invalidate(self, model_name: Optional[str] = None):
+        """Force a checkpoint check on next access (all models if name is None)"""
+        with self._lock:
+            if model_name is None:
+                self._last_checked.clear()
+            else:
+                self._last_checked.pop(model_name, None)
+    
+    def _check_due(self, model_name: str) -> bool:
+        last_checked = self._last_checked.get(model_name)
+        return last_checked is None or time.monotonic() - last_checked >= self.reload_interval
+    
+    def _refresh(self, model_name: str, current: Optional[LoadedModel]) -> Optional[LoadedModel]:
+        """Load the latest checkpoint if it differs from the current one"""
+        try:
+            manager = ModelManager(model_dir=self.model_dir)
+            checkpoint_path = manager.get_checkpoint_path(model_name)
+            checkpoint_mtime = checkpoint_path.stat().st_mtime
+        except ValueError as e:
+            if current is None:
+                logger.info(f'Model registry: {e}')
+            return current
+        
+        if (current is not None
+                and current.checkpoint_path == checkpoint_path
+                and current.checkpoint_mtime == checkpoint_mtime):
+            return current
+        
+        try:
+            checkpoint = manager.load_checkpoint(checkpoint_path)
+            state_dict = checkpoint['model_state_dict']
+            
+            model = self.MODEL_BUILDERS[model_name](state_dict)
+            model.load_state_dict(state_dict)
+            model.to(manager.device)
+            model.eval()
+        except Exception as e:
+            # Keep serving the previous model if the new checkpoint is unreadable
+            logger.error(f'Model registry: failed to load {checkpoint_path}: {e}')
+            return current
+        
+        cleaner_index = self._build_cleaner_index(model, manager, checkpoint_path)
+        
+        quantized = None
+        try:
+            quantized = manager.load_quantized(checkpoint_path, checkpoint.get('metadata', {}))
+        except Exception as e:
+            logger.warning(f'Model registry: ignoring quantized variant of {checkpoint_path.name}: {e}')
+        if quantized is not None:
+            model = quantized
+        
+        entry = LoadedModel(
+            model, manager, checkpoint_path, checkpoint_mtime,
+            cleaner_index=cleaner_index,
+            quantized=quantized is not None
+        )
+        self._entries[model_name] = entry  # Atomic swap
+        
+        logger.info(
+            f'Model registry: loaded {model_name} from {checkpoint_path.name}'
+            f'{" (int8 TorchScript)" if entry.quantized else ""}'
+        )
+        return entry
+
+    
+    def _build_cleaner_index(self, model, manager: ModelManager, checkpoint_path: Path) -> Optional[CleanerEmbeddingIndex]:
+        """Embedding index for candidate retrieval (None disables retrieval)"""
+        if not hasattr(model, 'collaborative_model'):
+            return None
+        
+        try:
+            export_path = CleanerEmbeddingIndex.export_path(checkpoint_path)
+            if export_path.exists():
+                return CleanerEmbeddingIndex.load(export_path)
+            # Without the export we can't tell trained rows from untrained
+            # ones, and random client embeddings would pick the candidates
+            logger.info(f'Model registry: no embedding export for {checkpoint_path.name}, retrieval disabled')
+            return None
+        except Exception as e:
+            logger.warning(f'Model registry: no cleaner embedding index for {checkpoint_path.name}: {e}')
+            return None
+
+
+# Global model registry instance
+model_registry = ModelRegistry()
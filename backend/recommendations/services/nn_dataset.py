@@ -0,0 +1,172 @@
+"""
+NN Dataset Storage
+
+On-disk format of the offline neural-network datasets (nn_data/):
+
+    {split}_features.npy       float32 [n_samples, n_features]
+    {split}_target.npy         float32 [n_samples]
+    feature_scaler.npz         StandardScaler parameters as plain arrays
+                               (mean, scale, feature_columns)
+    preprocessing_config.json  Column names and split metadata
+
+Every array opens with np.load(mmap_mode='r'), so training and evaluation
+page multi-GB datasets in on demand instead of parsing CSV or unpickling.
+Writers stream chunks into memory-mapped .npy files of known shape.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+SPLITS = ('train', 'val', 'test')
+
+SCALER_FILE = 'feature_scaler.npz'
+LEGACY_SCALER_FILE = 'feature_scaler.pkl'
+CONFIG_FILE = 'preprocessing_config.json'
+
+
+class NNDataset:
+    """
+    Reader/writer for an nn_data dataset directory.
+    """
+    
+    def __init__(self, directory=None):
+        self.directory = Path(
+            directory or getattr(settings, 'RECOMMENDATION_NN_DATA_DIR', settings.BASE_DIR / 'nn_data')
+        )
+    
+    def features_path(self, split):
+        return self.directory / f'{split}_features.npy'
+    
+    def target_path(self, split):
+        return self.directory / f'{split}_target.npy'
+    
+    def open_features_writer(self, split, n_samples, n_features):
+        """
+        Create {split}_features.npy as a writable float32 memory map.
+        
+        Fill it in row chunks (writer[start:end] = chunk) and flush() when
+        done; nothing larger than a chunk needs to be held in RAM.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(
+            self.features_path(split),
+            mode='w+',
+            dtype=np.float32,
+            shape=(n_samples, n_features)
+        )
+    
+    def save_target(self, split, target):
+        """Save the target vector of a split as float32."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        np.save(self.target_path(split), np.asarray(target, dtype=np.float32))
+    
+    def load_split(self, split, mmap=True):
+        """
+        Load a split's features and target.
+        
+        Args:
+            split: 'train', 'val' or 'test'
+            mmap: Open read-only memory maps instead of reading into RAM
+            
+        Returns:
+            (features, target) arrays
+        """
+        mmap_mode = 'r' if mmap else None
+        return (
+            np.load(self.features_path(split), mmap_mode=mmap_mode),
+            np.load(self.target_path(split), mmap_mode=mmap_mode),
+        )
+    
+    def load_config(self):
+        """Load preprocessing_config.json (empty dict if missing)."""
+        path = self.directory / CONFIG_FILE
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    
+    def save_scaler(self, mean, scale, feature_columns=None):
+        """Store standardization parameters as plain arrays (no pickle)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            self.directory / SCALER_FILE,
+            mean=np.asarray(mean, dtype=np.float64),
+            scale=np.asarray(scale, dtype=np.float64),
+            feature_columns=np.asarray(feature_columns or [], dtype=str)
+        )
+    
+    def load_scaler(self):
+        """
+        Load standardization parameters.
+        
+        Falls back to the legacy pickled scikit-learn StandardScaler when no
+        .npz exists yet (see convert_legacy_scaler).
+        
+        Returns:
+            dict with 'mean', 'scale' and 'feature_columns'
+        """
+        path = self.directory / SCALER_FILE
+        if path.exists():
+            with np.load(path) as data:
+                return {
+                    'mean': data['mean'],
+                    'scale': data['scale'],
+                    'feature_columns': data['feature_columns'].tolist(),
+                }
+        
+        scaler = self._load_legacy_scaler()
+        return {
+            'mean': np.asarray(scaler.mean_, dtype=np.float64),
+            'scale': np.asarray(scaler.scale_, dtype=np.float64),
+            'feature_columns': self.load_config().get('feature_columns', []),
+        }
+    
+    def convert_legacy_scaler(self):
+        """
+        Rewrite the pickled StandardScaler as feature_scaler.npz.
+        
+        Returns:
+            Path of the written file
+        """
+        scaler = self._load_legacy_scaler()
+        self.save_scaler(
+            scaler.mean_,
+            scaler.scale_,
+            self.load_config().get('feature_columns', [])
+        )
+        return self.directory / SCALER_FILE
+    
+    def ensure_float32(self, split, chunk_rows=65536):
+        """
+        Rewrite {split}_features.npy as float32 if stored with another dtype,
+        copying in row chunks through memory maps.
+        
+        Returns:
+            True if the file was rewritten
+        """
+        source = np.load(self.features_path(split), mmap_mode='r')
+        if source.dtype == np.float32:
+            return False
+        
+        temporary = self.features_path(split).with_suffix('.tmp.npy')
+        target = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.float32, shape=source.shape)
+        for start in range(0, source.shape[0], chunk_rows):
+            target[start:start + chunk_rows] = source[start:start + chunk_rows]
+        target.flush()
+        del source, target
+        
+        temporary.replace(self.features_path(split))
+        return True
+    
+    @staticmethod
+    def transform(features, scaler):
+        """Standardize raw features with loaded scaler parameters (float32)."""
+        return ((np.asarray(features, dtype=np.float64) - scaler['mean']) / scaler['scale']).astype(np.float32)
+    
+    def _load_legacy_scaler(self):
+        # joblib ships with scikit-learn, which produced the legacy file
+        import joblib
+        return joblib.load(self.directory / LEGACY_SCALER_FILE)
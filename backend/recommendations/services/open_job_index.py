@@ -0,0 +1,307 @@
+"""
+In-memory index of open jobs for cleaner job feeds.
+
+Open (open_for_bids) jobs with a located property are registered as points
+in a SpatialGrid (users/spatial_index.py), so a cleaner's feed only examines
+jobs in the grid cells its radius service areas overlap, then applies the
+exact distance check. Every open job is also bucketed by its property's city
+and postal code for city / postal-code service areas. Each entry carries the
+property type, so type filters never touch the database.
+
+Jobs whose property has no coordinates cannot be ruled out geographically;
+like _get_candidate_cleaners (which skips geography for them), every feed
+includes them.
+
+Same lazy build as the service area index, kept current by CleaningJob and
+Property signals (see recommendations/signals.py). Each change bumps a
+version counter in the Django cache and records the affected job ids under
+that version; other processes replay those ids from the database instead of
+rebuilding, and only rebuild when the change log has a gap (evicted entries,
+invalidate(), or more than CHANGE_LOG_MAX_REPLAY versions behind).
+As with the service area index, this needs the shared default cache
+(Redis, see CACHES in settings) to reach other processes.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.geo import distances_from_point
+from users.spatial_index import SpatialGrid
+
+OPEN_STATUS = 'open_for_bids'
+
+# Fields loaded per job (one values() row each)
+ENTRY_FIELDS = (
+    'id', 'status', 'property__latitude', 'property__longitude', 'property__property_type',
+    'property__city', 'property__state', 'property__postal_code',
+)
+
+# Change log entries live this long; a process further behind rebuilds
+CHANGE_LOG_TTL = 3600
+CHANGE_LOG_MAX_REPLAY = 500
+
+
+class OpenJobIndex:
+    """
+    Process-local index of open jobs.
+    
+    Usage:
+        distances = open_job_index.jobs_for_areas(
+            [(center_latitude, center_longitude, radius_km), ...],
+            property_types=['house'],
+            max_distance_km=20
+        )
+        # {job_id: km to the nearest covering area center, None if matched
+        #  by city / postal code or unlocated}
+    """
+    
+    VERSION_CACHE_KEY = 'recommendations:open_job_index:version'
+    CHANGE_CACHE_KEY = 'recommendations:open_job_index:change:{version}'
+    
+    def __init__(self, cell_size_degrees=None):
+        self.cell_size_degrees = cell_size_degrees
+        self._grid = None
+        self._jobs = {}                       # job_id -> entry dict
+        self._unlocated = set()               # Open jobs without property coordinates
+        self._by_city = defaultdict(set)      # lowercased city -> {job_id}
+        self._by_postal_code = defaultdict(set)  # postal code -> {job_id}
+        self._version = None                  # Cache version this process last synced with
+        self._lock = threading.RLock()
+    
+    def jobs_for_areas(self, areas, property_types=None, max_distance_km=None,
+                       cities=None, postal_codes=None):
+        """
+        Open jobs inside any of the given circles, cities or postal codes.
+        
+        Args:
+            areas: Iterable of (latitude, longitude, radius_km) circles
+            property_types: Optional iterable of allowed property types
+            max_distance_km: Optional cap on the distance to the area center
+                (only applies to circles)
+            cities: Optional iterable of (city, state) pairs; state may be
+                None to match the city in any state
+            postal_codes: Optional iterable of postal codes
+            
+        Returns:
+            dict: {job_id: distance in km to the nearest covering area
+            center, or None for jobs matched by city / postal code only
+            and jobs without coordinates}
+        """
+        allowed_types = set(property_types) if property_types else None
+        
+        def type_allowed(entry):
+            return allowed_types is None or entry['property_type'] in allowed_types
+        
+        with self._lock:
+            self._ensure_current()
+            
+            distances = {}
+            for latitude, longitude, radius_km in areas:
+                if max_distance_km is not None:
+                    radius_km = min(radius_km, float(max_distance_km))
+                
+                entries = [
+                    self._jobs[job_id]
+                    for job_id in self._grid.query_circle(latitude, longitude, radius_km)
+                    if type_allowed(self._jobs[job_id])
+                ]
+                if not entries:
+                    continue
+                
+                # One vectorized haversine per area over its candidate jobs
+                area_distances = distances_from_point(
+                    latitude, longitude,
+                    [entry['latitude'] for entry in entries],
+                    [entry['longitude'] for entry in entries],
+                    unit='km'
+                )
+                for entry, distance in zip(entries, area_distances):
+                    distance = float(distance)
+                    if distance <= radius_km and distance < distances.get(entry['job_id'], float('inf')):
+                        distances[entry['job_id']] = distance
+            
+            matched = set()
+            for city, state in cities or ():
+                for job_id in self._by_city.get(city.strip().lower(), ()):
+                    entry = self._jobs[job_id]
+                    if not state or (entry['state'] or '').lower() == state.strip().lower():
+                        matched.add(job_id)
+            for postal_code in postal_codes or ():
+                matched.update(self._by_postal_code.get(postal_code.strip(), ()))
+            matched.update(self._unlocated)
+            
+            for job_id in matched:
+                if job_id not in distances and type_allowed(self._jobs[job_id]):
+                    distances[job_id] = None
+        
+        return distances
+    
+    def all_jobs(self, property_types=None):
+        """
+        Every open job, for cleaners without any active service area.
+        
+        Returns:
+            dict: {job_id: None}
+        """
+        allowed_types = set(property_types) if property_types else None
+        with self._lock:
+            self._ensure_current()
+            return {
+                job_id: None
+                for job_id, entry in self._jobs.items()
+                if allowed_types is None or entry['property_type'] in allowed_types
+            }
+    
+    def update_job(self, job_id):
+        """
+        Insert, move or drop a job after it entered, left or moved within
+        the open set.
+        """
+        self.update_jobs([job_id])
+    
+    def update_jobs(self, job_ids):
+        """Re-read a set of jobs and record them in the change log."""
+        job_ids = [job_id for job_id in job_ids if job_id is not None]
+        if not job_ids:
+            return
+        
+        with self._lock:
+            if self._grid is not None:
+                self._reload(job_ids)
+            self._bump_version(job_ids)
+    
+    def update_property_jobs(self, property_id):
+        """
+        Re-index the open jobs of a property whose location or type changed.
+        
+        Returns:
+            list: IDs of the open jobs re-indexed
+        """
+        from cleaning_jobs.models import CleaningJob
+        
+        job_ids = list(
+            CleaningJob.objects.filter(property_id=property_id, status=OPEN_STATUS).values_list('id', flat=True)
+        )
+        self.update_jobs(job_ids)
+        return job_ids
+    
+    def remove_job(self, job_id):
+        """Drop an open job after it was deleted."""
+        self.update_jobs([job_id])
+    
+    def invalidate(self):
+        """
+        Force every process to rebuild on next lookup.
+        Use after bulk changes that bypass model signals (bulk_create, update()).
+        """
+        with self._lock:
+            self._grid = None
+            # No change log entry for this version, so every process rebuilds
+            self._bump_version(None)
+    
+    def rebuild(self):
+        """Load all open jobs into a fresh grid."""
+        from cleaning_jobs.models import CleaningJob
+        
+        with self._lock:
+            # Read the version first so changes made during the load trigger another rebuild
+            version = cache.get(self.VERSION_CACHE_KEY, 0)
+            
+            cell_size = self.cell_size_degrees or getattr(settings, 'SERVICE_AREA_INDEX_CELL_DEGREES', 0.1)
+            self._grid = SpatialGrid(cell_size)
+            self._jobs = {}
+            self._unlocated = set()
+            self._by_city = defaultdict(set)
+            self._by_postal_code = defaultdict(set)
+            
+            for row in CleaningJob.objects.filter(status=OPEN_STATUS).values(*ENTRY_FIELDS).iterator(chunk_size=2000):
+                self._add(row)
+            
+            self._version = version
+    
+    def _ensure_current(self):
+        if self._grid is None:
+            self.rebuild()
+            return
+        
+        version = cache.get(self.VERSION_CACHE_KEY, 0)
+        if version == self._version:
+            return
+        if version < self._version or version - self._version > CHANGE_LOG_MAX_REPLAY:
+            self.rebuild()
+            return
+        
+        # Replay the jobs changed by other processes since our last sync
+        keys = [
+            self.CHANGE_CACHE_KEY.format(version=missed)
+            for missed in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self.rebuild()
+            return
+        
+        self._reload({job_id for job_ids in changes.values() for job_id in job_ids})
+        self._version = version
+    
+    def _reload(self, job_ids):
+        from cleaning_jobs.models import CleaningJob
+        
+        rows = CleaningJob.objects.filter(pk__in=job_ids, status=OPEN_STATUS).values(*ENTRY_FIELDS)
+        for job_id in job_ids:
+            self._remove(job_id)
+        for row in rows:
+            self._add(row)
+    
+    def _bump_version(self, job_ids):
+        cache.add(self.VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            new_version = cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            # Key evicted between add() and incr()
+            cache.set(self.VERSION_CACHE_KEY, 1, timeout=None)
+            new_version = 1
+        
+        if job_ids is not None:
+            cache.set(self.CHANGE_CACHE_KEY.format(version=new_version), list(job_ids), CHANGE_LOG_TTL)
+        
+        # Our own change is already applied; versions from other processes
+        # in between are replayed by the next _ensure_current
+        if self._grid is not None and self._version is not None and new_version == self._version + 1:
+            self._version = new_version
+    
+    def _add(self, row):
+        latitude, longitude = row['property__latitude'], row['property__longitude']
+        entry = {
+            'job_id': row['id'],
+            'property_type': row['property__property_type'],
+            'latitude': float(latitude) if latitude is not None else None,
+            'longitude': float(longitude) if longitude is not None else None,
+            'city': (row['property__city'] or '').strip().lower(),
+            'state': row['property__state'],
+            'postal_code': (row['property__postal_code'] or '').strip(),
+        }
+        self._jobs[entry['job_id']] = entry
+        if entry['city']:
+            self._by_city[entry['city']].add(entry['job_id'])
+        if entry['postal_code']:
+            self._by_postal_code[entry['postal_code']].add(entry['job_id'])
+        
+        if entry['latitude'] is None or entry['longitude'] is None:
+            self._unlocated.add(entry['job_id'])
+        else:
+            self._grid.insert(entry['job_id'], entry['latitude'], entry['longitude'], 0)
+    
+    def _remove(self, job_id):
+        entry = self._jobs.pop(job_id, None)
+        if entry is not None:
+            self._by_city.get(entry['city'], set()).discard(job_id)
+            self._by_postal_code.get(entry['postal_code'], set()).discard(job_id)
+        self._unlocated.discard(job_id)
+        self._grid.remove(job_id)
+
+
+# Global open job index instance
+open_job_index = OpenJobIndex()
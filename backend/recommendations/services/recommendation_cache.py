@@ -0,0 +1,98 @@
+"""
+Recommendation Cache
+
+Caches the full ranked list once per job (cleaners for a job) and per
+cleaner (jobs for a cleaner); any limit is served by slicing it.
+
+Entries are invalidated through versioned keys instead of deletes. Each
+list key embeds two counters read before the list was computed:
+
+    cleaners for job J:  job:J version      + cleaner pool version
+    jobs for cleaner C:  cleaner:C version  + job pool version
+
+Signals bump the counters (see recommendations/signals.py), so stale lists
+simply stop being looked up and expire with RECOMMENDATION_CACHE_TTL. A
+bump while a list is being computed leaves that list unreachable too.
+
+Counters and lists live in the default cache, which is shared by all
+processes (Redis, see CACHES), so bumps made by Celery workers and
+management commands reach the web processes too.
+"""
+from django.core.cache import cache
+
+KEY_PREFIX = 'recommendations'
+
+JOB_POOL = 'jobs'
+CLEANER_POOL = 'cleaners'
+
+
+class RecommendationCache:
+    """
+    Usage:
+        key = RecommendationCache.cleaners_for_job_key(job.id, mode)
+        ranked = cache.get(key)
+        if ranked is None:
+            ranked = ...  # full ranked list
+            cache.set(key, ranked, ttl)
+        return ranked[:limit]
+    """
+    
+    @staticmethod
+    def cleaners_for_job_key(job_id, mode):
+        """Cache key of the ranked cleaner list for a job"""
+        job_version, pool_version = RecommendationCache._versions(f'job:{job_id}', CLEANER_POOL)
+        return f'{KEY_PREFIX}:cleaners_for_job:{job_id}:{mode}:{job_version}.{pool_version}'
+    
+    @staticmethod
+    def jobs_for_cleaner_key(cleaner_id, mode):
+        """Cache key of the ranked job list for a cleaner"""
+        cleaner_version, pool_version = RecommendationCache._versions(f'cleaner:{cleaner_id}', JOB_POOL)
+        return f'{KEY_PREFIX}:jobs_for_cleaner:{cleaner_id}:{mode}:{cleaner_version}.{pool_version}'
+    
+    @staticmethod
+    def invalidate_job(job_id, pool=False):
+        """
+        Invalidate the cleaner list of a job.
+        
+        Args:
+            pool: Also invalidate every cleaner's job list (the job's
+                attributes or open status may have changed)
+        """
+        if job_id is not None:
+            RecommendationCache._bump(f'job:{job_id}')
+        if pool:
+            RecommendationCache._bump(JOB_POOL)
+    
+    @staticmethod
+    def invalidate_cleaner(cleaner_id, pool=False):
+        """
+        Invalidate the job list of a cleaner.
+        
+        Args:
+            pool: Also invalidate every job's cleaner list (the cleaner's
+                score or service area may have changed)
+        """
+        if cleaner_id is not None:
+            RecommendationCache._bump(f'cleaner:{cleaner_id}')
+        if pool:
+            RecommendationCache._bump(CLEANER_POOL)
+    
+    @staticmethod
+    def _version_key(scope):
+        return f'{KEY_PREFIX}:version:{scope}'
+    
+    @staticmethod
+    def _versions(*scopes):
+        keys = [RecommendationCache._version_key(scope) for scope in scopes]
+        versions = cache.get_many(keys)
+        return [versions.get(key, 0) for key in keys]
+    
+    @staticmethod
+    def _bump(scope):
+        key = RecommendationCache._version_key(scope)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Key evicted between add() and incr()
+            cache.set(key, 1, timeout=None)
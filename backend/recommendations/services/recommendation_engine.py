@@ -9,23 +9,30 @@ Dual-Mode System:
 Automatically falls back to rule-based if NN model unavailable.
 """
 from typing import List, Dict, Optional, Tuple
-from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.conf import settings
 from django.db import models
+from django.db.models import prefetch_related_objects
+import numpy as np
 import logging
 
 from cleaning_jobs.models import CleaningJob, JobBid
 from properties.models import Property
-from recommendations.models import CleanerScore, JobRecommendation, CleanerRecommendation
+from users.location_utils import get_cleaner_distances, get_cleaner_ids_by_address
+from users.spatial_index import KM_PER_MILE
+from recommendations.models import CleanerScore, CleanerRecommendation
+from recommendations.services.recommendation_tracker import recommendation_tracker
+from recommendations.services.recommendation_cache import RecommendationCache
+from recommendations.services.open_job_index import open_job_index
 from recommendations.services.scoring_service import ScoringService
+from recommendations.services.market_pricing import MarketPriceService
+from recommendations.services.feature_store import FeatureStore
 
 # ML imports (handle gracefully if not available)
 try:
     import torch
-    import numpy as np
-    from recommendations.services.ml_models import HybridRecommendationModel, ModelManager
+    from recommendations.services.model_registry import model_registry
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
@@ -47,7 +54,8 @@ class RecommendationEngine:
     Configuration via Django settings:
     - RECOMMENDATION_MODE: 'rule_based' | 'neural' | 'ensemble'
     - RECOMMENDATION_ENSEMBLE_WEIGHTS: {'rule_based': 0.5, 'neural': 0.5}
-    - RECOMMENDATION_CACHE_TTL: Cache duration in seconds
+    - RECOMMENDATION_CACHE_TTL: Cache duration in seconds (lists are also
+      invalidated by signals, see RecommendationCache)
     """
     
     def __init__(self, mode: Optional[str] = None):
@@ -74,6 +82,7 @@ class RecommendationEngine:
         # Load neural model if needed
         self.nn_model = None
         self.model_manager = None
+        self.cleaner_index = None
         if self.mode in ['neural', 'ensemble'] and ML_AVAILABLE:
             try:
                 self._load_neural_model()
@@ -88,21 +97,15 @@ class RecommendationEngine:
         self.cache_ttl = getattr(settings, 'RECOMMENDATION_CACHE_TTL', 3600)
 
     def _load_neural_model(self):
-        """Load trained neural network model"""
-        self.model_manager = ModelManager()
+        """Get the trained neural network model from the process-wide registry"""
+        loaded = model_registry.get('hybrid_recommendation')
+        if loaded is None:
+            raise ValueError('No checkpoints found for hybrid_recommendation')
         
-        # Initialize model structure
-        self.nn_model = HybridRecommendationModel(
-            num_clients=User.objects.filter(role='client').count(),
-            num_cleaners=User.objects.filter(role='cleaner').count()
-        )
-        
-        # Load weights
-        self.nn_model = self.model_manager.load_model(
-            model=self.nn_model,
-            model_name='hybrid_recommendation',
-            version='latest'
-        )
+        # Keep the pair together: ID mappings belong to this checkpoint
+        self.nn_model = loaded.model
+        self.model_manager = loaded.manager
+        self.cleaner_index = loaded.cleaner_index
         
         logger.info('Neural network model loaded successfully')
 
@@ -129,33 +132,30 @@ class RecommendationEngine:
             - breakdown: Dict with detailed scoring
             - reasoning: List of reasons for recommendation
         """
-        cache_key = f'job_recommendations_{job.id}_{self.mode}_{limit}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-        
-        # Get candidate cleaners
-        candidates = self._get_candidate_cleaners(job, filters)
-        
-        # Score each candidate
-        scored_candidates = []
-        for cleaner in candidates:
-            scores = self._score_cleaner_for_job(job, cleaner)
-            if scores:
-                scored_candidates.append(scores)
-        
-        # Sort by overall score
-        scored_candidates.sort(key=lambda x: x['score'], reverse=True)
+        # The full ranked list is cached once per job and sliced per limit;
+        # filtered requests change the candidate set, so they bypass the cache
+        cache_key = None if filters else RecommendationCache.cleaners_for_job_key(job.id, self.mode)
+        ranked = cache.get(cache_key) if cache_key else None
+        
+        if ranked is None:
+            # Get candidate cleaners
+            candidates = self._get_candidate_cleaners(job, filters)
+            
+            # Score all candidates in one batch
+            ranked = self._score_cleaners_for_job_batch(job, candidates)
+            
+            # Sort by overall score
+            ranked.sort(key=lambda x: x['score'], reverse=True)
+            
+            if cache_key:
+                cache.set(cache_key, ranked, self.cache_ttl)
         
         # Limit results
-        recommendations = scored_candidates[:limit]
+        recommendations = ranked[:limit]
         
         # Track recommendations (for analytics and ML training)
         self._track_job_recommendations(job, recommendations)
         
-        # Cache results
-        cache.set(cache_key, recommendations, self.cache_ttl)
-        
         return recommendations
 
     def recommend_jobs_for_cleaner(
@@ -170,46 +170,78 @@ class RecommendationEngine:
         Args:
             cleaner: User instance (must be cleaner role)
             limit: Maximum number of recommendations
-            filters: Optional filters (e.g., max_distance, property_types)
+            filters: Optional filters:
+                - max_distance: Max km from the job to the cleaner's nearest area center
+                - property_types: Allowed property types
+        
+        Only open jobs covered by the cleaner's active service areas (radius,
+        city or postal code, plus jobs without coordinates) are scored; a
+        cleaner without any active area sees every open job. See OpenJobIndex.
         
         Returns:
-            List of dicts with job recommendations
+            List of dicts with job recommendations (same format as
+            recommend_cleaners_for_job, plus 'job')
         """
-        cache_key = f'cleaner_recommendations_{cleaner.id}_{self.mode}_{limit}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+        cache_key = None if filters else RecommendationCache.jobs_for_cleaner_key(cleaner.id, self.mode)
+        ranked = cache.get(cache_key) if cache_key else None
+        if ranked is not None:
+            return ranked[:limit]
+        
+        filters = filters or {}
+        
+        # Open jobs covered by the cleaner's service areas, from the in-memory index
+        prefetch_related_objects([cleaner], 'service_areas')
+        active_areas = [area for area in cleaner.service_areas.all() if area.is_active]
+        
+        if active_areas:
+            areas = [
+                (float(area.center_latitude), float(area.center_longitude), float(area.radius_miles) * KM_PER_MILE)
+                for area in active_areas
+                if area.area_type == 'radius'
+                and area.center_latitude is not None
+                and area.center_longitude is not None
+                and area.radius_miles is not None
+            ]
+            cities = [
+                (area.city, area.state)
+                for area in active_areas
+                if area.area_type == 'city' and area.city
+            ]
+            postal_codes = [
+                postal_code
+                for area in active_areas
+                if area.area_type == 'postal_codes'
+                for postal_code in (area.postal_codes or [])
+            ]
+            job_distances = open_job_index.jobs_for_areas(
+                areas,
+                property_types=filters.get('property_types'),
+                max_distance_km=filters.get('max_distance'),
+                cities=cities,
+                postal_codes=postal_codes
+            )
+        else:
+            job_distances = open_job_index.all_jobs(property_types=filters.get('property_types'))
         
-        # Get open jobs
-        jobs = CleaningJob.objects.filter(
+        jobs = list(CleaningJob.objects.filter(
+            id__in=list(job_distances),
             status='open_for_bids'
-        ).select_related('client', 'property')
-        
-        # Apply filters
-        if filters:
-            if 'max_distance' in filters and hasattr(cleaner, 'service_area'):
-                # Filter by distance (would need spatial query)
-                pass
-            if 'property_types' in filters:
-                jobs = jobs.filter(property__property_type__in=filters['property_types'])
-        
-        # Score each job
-        scored_jobs = []
-        for job in jobs:
-            scores = self._score_job_for_cleaner(job, cleaner)
-            if scores:
-                scored_jobs.append(scores)
+        ).select_related('client', 'property'))
         
-        # Sort by score
-        scored_jobs.sort(key=lambda x: x['score'], reverse=True)
+        # The cleaner's score is loaded once for the whole feed
+        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
         
-        # Limit results
-        recommendations = scored_jobs[:limit]
+        # Score all jobs in one batch
+        ranked = self._score_jobs_for_cleaner_batch(jobs, cleaner, cleaner_score)
         
-        # Cache
-        cache.set(cache_key, recommendations, self.cache_ttl)
+        # Sort by score
+        ranked.sort(key=lambda x: x['score'], reverse=True)
         
-        return recommendations
+        # Cache the full list; any limit is a slice of it
+        if cache_key:
+            cache.set(cache_key, ranked, self.cache_ttl)
+        
+        return ranked[:limit]
 
     def _score_cleaner_for_job(self, job: CleaningJob, cleaner: User) -> Optional[Dict]:
         """
@@ -217,47 +249,118 @@ class RecommendationEngine:
         
         Returns dict with scores and reasoning, or None if not suitable.
         """
-        # Get rule-based score
-        rule_score, rule_breakdown = self._get_rule_based_cleaner_score(job, cleaner)
-        
-        # Get neural score if available
-        neural_score = None
-        if self.mode in ['neural', 'ensemble'] and self.nn_model:
-            neural_score = self._get_neural_cleaner_score(job, cleaner)
-        
-        # Combine scores based on mode
-        if self.mode == 'rule_based':
-            final_score = rule_score
-        elif self.mode == 'neural' and neural_score is not None:
-            final_score = neural_score
-        elif self.mode == 'ensemble' and neural_score is not None:
-            # Weighted ensemble
-            final_score = (
-                self.ensemble_weights['rule_based'] * rule_score +
-                self.ensemble_weights['neural'] * neural_score
-            )
-        else:
-            final_score = rule_score
+        return self._score_cleaners_for_job_batch(job, [cleaner])[0]
+
+    def _score_cleaners_for_job_batch(
+        self,
+        job: CleaningJob,
+        cleaners: List[User],
+        cleaner_scores: Optional[List[Optional[CleanerScore]]] = None
+    ) -> List[Dict]:
+        """
+        Score many cleaners for one job in a single vectorized pass.
+        
+        Loads every candidate's CleanerScore with one query (unless the
+        caller passes them, aligned with `cleaners`) and computes the
+        rule-based factors as NumPy arrays over the whole candidate set.
+        
+        Returns one dict per cleaner (same order as `cleaners`), in the
+        format documented on _score_cleaner_for_job.
+        """
+        if not cleaners:
+            return []
+        
+        if cleaner_scores is None:
+            # One query for all candidate scores
+            score_map = {
+                score.cleaner_id: score
+                for score in CleanerScore.objects.filter(cleaner__in=cleaners)
+            }
+            cleaner_scores = [score_map.get(cleaner.id) for cleaner in cleaners]
+        
+        # Rule-based scores for the whole candidate set
+        rule_scores, breakdowns = self._get_rule_based_cleaner_scores(job, cleaners, cleaner_scores)
+        
+        # Neural scores if available
+        neural_scores = None
+        if self.mode in ['neural', 'ensemble'] and self.nn_model is not None:
+            neural_scores = self._get_neural_cleaner_scores(job, cleaners, cleaner_scores)
+        
+        final_scores = self._combine_scores(rule_scores, neural_scores)
+        
+        return [
+            self._score_entry(i, cleaner, final_scores, rule_scores, neural_scores, breakdowns)
+            for i, cleaner in enumerate(cleaners)
+        ]
+
+    def _score_jobs_for_cleaner_batch(
+        self,
+        jobs: List[CleaningJob],
+        cleaner: User,
+        cleaner_score: Optional[CleanerScore]
+    ) -> List[Dict]:
+        """
+        Score many jobs for one cleaner in a single vectorized pass (the
+        inverse of _score_cleaners_for_job_batch, for cleaner job feeds).
+        
+        Market prices are looked up with one query for the whole feed and
+        the neural model scores every job in one forward pass.
+        
+        Returns one dict per job (same order as `jobs`), in the format
+        documented on _score_cleaner_for_job plus 'job'.
+        """
+        if not jobs:
+            return []
+        
+        rule_scores, breakdowns = self._get_rule_based_job_scores(jobs, cleaner, cleaner_score)
+        
+        neural_scores = None
+        if self.mode in ['neural', 'ensemble'] and self.nn_model is not None:
+            neural_scores = self._get_neural_job_scores(jobs, cleaner, cleaner_score)
         
-        # Generate reasoning
-        reasoning = self._generate_cleaner_reasoning(rule_breakdown, cleaner)
+        final_scores = self._combine_scores(rule_scores, neural_scores)
+        
+        results = []
+        for i, job in enumerate(jobs):
+            entry = self._score_entry(i, cleaner, final_scores, rule_scores, neural_scores, breakdowns)
+            entry['job'] = job
+            results.append(entry)
+        return results
+
+    def _score_entry(self, i, cleaner, final_scores, rule_scores, neural_scores, breakdowns) -> Dict:
+        """Result dict for row i of a scored batch"""
+        breakdown = {factor: float(values[i]) for factor, values in breakdowns.items()}
+        neural_score = float(neural_scores[i]) if neural_scores is not None else None
         
         return {
             'cleaner': cleaner,
-            'score': round(final_score, 2),
-            'rule_based_score': round(rule_score, 2),
+            'score': round(float(final_scores[i]), 2),
+            'rule_based_score': round(float(rule_scores[i]), 2),
             'neural_score': round(neural_score, 2) if neural_score else None,
-            'breakdown': rule_breakdown,
-            'reasoning': reasoning,
+            'breakdown': breakdown,
+            'reasoning': self._generate_cleaner_reasoning(breakdown, cleaner),
         }
 
-    def _get_rule_based_cleaner_score(
+    def _combine_scores(self, rule_scores, neural_scores):
+        """Combine rule-based and neural scores (scalars or arrays) based on mode"""
+        if self.mode == 'neural' and neural_scores is not None:
+            return neural_scores
+        if self.mode == 'ensemble' and neural_scores is not None:
+            # Weighted ensemble
+            return (
+                self.ensemble_weights['rule_based'] * rule_scores +
+                self.ensemble_weights['neural'] * neural_scores
+            )
+        return rule_scores
+
+    def _get_rule_based_cleaner_scores(
         self,
         job: CleaningJob,
-        cleaner: User
-    ) -> Tuple[float, Dict]:
+        cleaners: List[User],
+        cleaner_scores: List[Optional[CleanerScore]]
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
         """
-        Calculate rule-based recommendation score for cleaner-job pair.
+        Calculate rule-based recommendation scores for a set of cleaners.
         
         Factors:
         - Base cleaner quality (30%)
@@ -265,237 +368,291 @@ class RecommendationEngine:
         - Specialization match (20%)
         - Pricing competitiveness (15%)
         - Availability (10%)
+        
+        Cleaners without a CleanerScore get a neutral 50 for quality,
+        specialization, pricing and availability.
+        
+        Returns:
+            (total_scores, breakdown) where breakdown maps each factor to an
+            array aligned with `cleaners`.
         """
-        # Get cleaner's overall score
-        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
-        if not cleaner_score:
-            # Calculate on-the-fly
-            score_data = self.scoring_service.calculate_cleaner_score(cleaner.id)
-            quality_score = score_data.get('overall_score', 50.0)
-        else:
-            quality_score = float(cleaner_score.overall_score)
-        
-        # Quality component (30%)
-        quality_component = quality_score * 0.30
-        
-        # Location component (25%)
-        location_score = self._calculate_location_match(job, cleaner)
-        location_component = location_score * 0.25
-        
-        # Specialization component (20%)
-        specialization_score = self._calculate_specialization_match(job, cleaner)
-        specialization_component = specialization_score * 0.20
-        
-        # Pricing component (15%)
-        pricing_score = self._calculate_pricing_competitiveness(job, cleaner)
-        pricing_component = pricing_score * 0.15
-        
-        # Availability component (10%)
-        availability_score = self._calculate_availability(job, cleaner)
-        availability_component = availability_score * 0.10
-        
-        # Total score
-        total_score = (
-            quality_component +
-            location_component +
-            specialization_component +
-            pricing_component +
-            availability_component
+        return self._get_rule_based_scores(
+            distances=self._calculate_distances_km(job.property, cleaners),
+            property_types=job.property.property_type,
+            prefers_eco=self._job_prefers_eco(job),
+            market_avgs=self._get_market_average_bid(job) or 0.0,
+            cleaner_scores=cleaner_scores
+        )
+
+    def _get_rule_based_job_scores(
+        self,
+        jobs: List[CleaningJob],
+        cleaner: User,
+        cleaner_score: Optional[CleanerScore]
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Calculate rule-based scores of many jobs for one cleaner (same factors
+        as _get_rule_based_cleaner_scores), aligned with `jobs`.
+        """
+        return self._get_rule_based_scores(
+            distances=self._calculate_job_distances_km(jobs, cleaner),
+            property_types=np.array([job.property.property_type for job in jobs]),
+            prefers_eco=np.array([self._job_prefers_eco(job) for job in jobs], dtype=bool),
+            market_avgs=self._get_market_average_bids(jobs),
+            cleaner_scores=[cleaner_score] * len(jobs)
+        )
+
+    def _get_rule_based_scores(
+        self,
+        distances: np.ndarray,
+        property_types,
+        prefers_eco,
+        market_avgs,
+        cleaner_scores: List[Optional[CleanerScore]]
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Rule-based scores of job-cleaner pairs aligned with `cleaner_scores`.
+        
+        Job-side values (property_types, prefers_eco, market_avgs; 0 = no
+        market data) are arrays aligned with the pairs, or scalars shared by
+        all of them.
+        """
+        has_score = np.array([score is not None for score in cleaner_scores], dtype=bool)
+        
+        def score_column(field: str, default: float) -> np.ndarray:
+            return np.array(
+                [float(getattr(score, field)) if score else default for score in cleaner_scores],
+                dtype=np.float64
+            )
+        
+        quality_scores = score_column('overall_score', 50.0)
+        location_scores = self._calculate_location_scores(distances)
+        specialization_scores = self._calculate_specialization_scores(
+            property_types,
+            prefers_eco,
+            has_score,
+            np.array([score.primary_property_type if score else '' for score in cleaner_scores]),
+            score_column('eco_friendly_jobs_percentage', 0.0)
+        )
+        pricing_scores = self._calculate_pricing_scores(
+            market_avgs,
+            score_column('avg_bid_amount', 0.0)
+        )
+        availability_scores = self._calculate_availability_scores(
+            has_score,
+            np.array([bool(score and score.is_active) for score in cleaner_scores], dtype=bool),
+            score_column('jobs_last_90_days', 0.0)
+        )
+        
+        total_scores = (
+            quality_scores * 0.30 +
+            location_scores * 0.25 +
+            specialization_scores * 0.20 +
+            pricing_scores * 0.15 +
+            availability_scores * 0.10
         )
         
         breakdown = {
-            'quality': quality_score,
-            'location': location_score,
-            'specialization': specialization_score,
-            'pricing': pricing_score,
-            'availability': availability_score,
+            'quality': quality_scores,
+            'location': location_scores,
+            'specialization': specialization_scores,
+            'pricing': pricing_scores,
+            'availability': availability_scores,
         }
         
-        return total_score, breakdown
+        return total_scores, breakdown
 
-    def _get_neural_cleaner_score(self, job: CleaningJob, cleaner: User) -> float:
-        """Get neural network prediction for cleaner-job pair"""
-        if not self.nn_model or not self.model_manager:
-            return 50.0
+    def _get_neural_cleaner_scores(
+        self,
+        job: CleaningJob,
+        cleaners: List[User],
+        cleaner_scores: List[Optional[CleanerScore]]
+    ) -> np.ndarray:
+        """
+        Get neural network predictions for many cleaners with one forward pass.
+        
+        Returns scores on a 0-100 scale aligned with `cleaners`. Falls back to
+        a neutral 50 for every cleaner if the model is unavailable or fails.
+        """
+        if self.nn_model is None or self.model_manager is None:
+            return np.full(len(cleaners), 50.0)
         
         try:
-            # Prepare input features
-            client_id = self.model_manager.get_client_index(job.client.id)
-            cleaner_id = self.model_manager.get_cleaner_index(cleaner.id)
-            property_type = self.model_manager.get_property_type_index(job.property.property_type)
-            
-            # Extract continuous features (same as training)
-            features = self._extract_job_cleaner_features(job, cleaner)
-            
-            # Convert to tensors
-            device = next(self.nn_model.parameters()).device
-            client_tensor = torch.tensor([client_id]).to(device)
-            cleaner_tensor = torch.tensor([cleaner_id]).to(device)
-            property_tensor = torch.tensor([property_type]).to(device)
-            features_tensor = torch.tensor([features], dtype=torch.float32).to(device)
+            # Extract continuous features (same as training) as one matrix
+            features = self._extract_job_cleaner_features_batch(job, cleaners, cleaner_scores)
             
-            # Get prediction
-            self.nn_model.eval()
-            with torch.no_grad():
-                prediction, _ = self.nn_model(
-                    client_tensor, cleaner_tensor, property_tensor, features_tensor
-                )
-            
-            # Convert to 0-100 scale (model outputs 0-1)
-            score = prediction.item() * 100.0
-            
-            return max(0.0, min(100.0, score))
+            return self._predict_neural_scores(
+                client_ids=[job.client_id] * len(cleaners),
+                cleaner_ids=[cleaner.id for cleaner in cleaners],
+                property_types=[job.property.property_type] * len(cleaners),
+                features=features
+            )
             
         except Exception as e:
             logger.error(f'Neural scoring error: {e}')
-            return 50.0
+            return np.full(len(cleaners), 50.0)
 
-    def _extract_job_cleaner_features(self, job: CleaningJob, cleaner: User) -> List[float]:
-        """Extract features for neural network (same as training)"""
-        # Get cleaner score
-        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
+    def _get_neural_job_scores(
+        self,
+        jobs: List[CleaningJob],
+        cleaner: User,
+        cleaner_score: Optional[CleanerScore]
+    ) -> np.ndarray:
+        """
+        Get neural network predictions of many jobs for one cleaner with one
+        forward pass, aligned with `jobs` (neutral 50 on failure).
+        """
+        if self.nn_model is None or self.model_manager is None:
+            return np.full(len(jobs), 50.0)
         
-        features = [
-            # Location
-            (job.property.latitude - 37.9838) * 10,
-            (job.property.longitude - 23.7275) * 10,
-            
-            # Property
-            job.property.square_meters / 1000.0,
-            job.estimated_duration.total_seconds() / 3600.0,
-            1.0 if job.eco_friendly_preference else 0.0,
-            
-            # Bid (use average or 0 if no bid yet)
-            0.0,  # Placeholder for bid amount
-            
-            # Distance
-            self._calculate_distance_km(job.property, cleaner) / 50.0,
-            
-            # Cleaner quality
-            float(cleaner_score.quality_score if cleaner_score else 50.0) / 100.0,
-            float(cleaner_score.communication_score if cleaner_score else 50.0) / 100.0,
-            float(cleaner_score.professionalism_score if cleaner_score else 50.0) / 100.0,
-            float(cleaner_score.timeliness_score if cleaner_score else 50.0) / 100.0,
-            float(cleaner_score.overall_score if cleaner_score else 50.0) / 100.0,
-            
-            # Cleaner reliability
-            float(cleaner_score.completion_rate if cleaner_score else 0.5),
-            float(cleaner_score.on_time_rate if cleaner_score else 0.5),
+        try:
+            features = FeatureStore.features_for_cleaner(jobs, cleaner, cleaner_score)
             
-            # Cleaner experience
-            np.log1p(cleaner_score.total_jobs if cleaner_score else 0) / 10.0,
-            float(cleaner_score.avg_rating if cleaner_score else 5.0) / 10.0,
+            return self._predict_neural_scores(
+                client_ids=[job.client_id for job in jobs],
+                cleaner_ids=[cleaner.id] * len(jobs),
+                property_types=[job.property.property_type for job in jobs],
+                features=features
+            )
             
-            # Temporal
-            job.created_at.hour / 24.0,
-            job.created_at.weekday() / 7.0,
-        ]
+        except Exception as e:
+            logger.error(f'Neural scoring error: {e}')
+            return np.full(len(jobs), 50.0)
+
+    def _predict_neural_scores(self, client_ids, cleaner_ids, property_types, features) -> np.ndarray:
+        """One forward pass over aligned pairs, on a 0-100 scale"""
+        predictions = self.model_manager.predict_batch(
+            model=self.nn_model,
+            client_ids=client_ids,
+            cleaner_ids=cleaner_ids,
+            property_types=property_types,
+            features=features
+        )
         
-        return features
+        # Convert to 0-100 scale (model outputs 0-1)
+        return np.clip(predictions * 100.0, 0.0, 100.0)
+
+    def _extract_job_cleaner_features_batch(
+        self,
+        job: CleaningJob,
+        cleaners: List[User],
+        cleaner_scores: List[Optional[CleanerScore]]
+    ) -> np.ndarray:
+        """
+        Extract the neural network features for every cleaner at once.
+        
+        Built by the shared feature store, so vectors match training exactly.
+        
+        Returns:
+            float32 array of shape [len(cleaners), NUM_FEATURES]
+        """
+        return FeatureStore.features_for_job(job, cleaners, cleaner_scores)
 
     # Helper methods (location, specialization, pricing, etc.)
+    # All operate on arrays aligned with the candidate cleaner list.
     
-    def _calculate_location_match(self, job: CleaningJob, cleaner: User) -> float:
-        """Score location match (0-100)"""
-        distance = self._calculate_distance_km(job.property, cleaner)
-        
-        # Score decays with distance
-        if distance <= 5:
-            return 100.0
-        elif distance <= 10:
-            return 80.0
-        elif distance <= 20:
-            return 60.0
-        elif distance <= 30:
-            return 40.0
-        else:
-            return 20.0
+    def _calculate_location_scores(self, distances: np.ndarray) -> np.ndarray:
+        """Score location match (0-100), decaying with distance"""
+        return np.select(
+            [distances <= 5, distances <= 10, distances <= 20, distances <= 30],
+            [100.0, 80.0, 60.0, 40.0],
+            default=20.0
+        )
 
-    def _calculate_distance_km(self, property_obj: Property, cleaner: User) -> float:
-        """Calculate distance in km"""
-        try:
-            from math import radians, cos, sin, asin, sqrt
-            
-            service_area = cleaner.service_area
-            if not service_area:
-                return 15.0
-            
-            lon1, lat1 = property_obj.longitude, property_obj.latitude
-            lon2, lat2 = service_area.longitude, service_area.latitude
-            
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * asin(sqrt(a))
-            
-            return 6371 * c
-        except:
-            return 15.0
+    def _calculate_distances_km(self, property_obj: Property, cleaners: List[User]) -> np.ndarray:
+        """
+        Calculate distance in km from the property to each cleaner's nearest
+        active service-area center (see FeatureStore.distances_km).
+        """
+        return FeatureStore.distances_km(property_obj, cleaners)
 
-    def _calculate_specialization_match(self, job: CleaningJob, cleaner: User) -> float:
-        """Score specialization match"""
-        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
-        if not cleaner_score:
-            return 50.0
-        
+    def _calculate_job_distances_km(self, jobs: List[CleaningJob], cleaner: User) -> np.ndarray:
+        """Calculate distance in km from each job's property to the cleaner's nearest area center"""
+        return FeatureStore.distances_km_for_cleaner([job.property for job in jobs], cleaner)
+
+    def _job_prefers_eco(self, job: CleaningJob) -> bool:
+        """Whether the job's property asks for eco-friendly cleaning"""
+        preferences = job.property.preferences or {}
+        return bool(preferences.get('eco_friendly'))
+
+    def _calculate_specialization_scores(
+        self,
+        property_types,
+        prefers_eco,
+        has_score: np.ndarray,
+        primary_property_types: np.ndarray,
+        eco_percentages: np.ndarray
+    ) -> np.ndarray:
+        """Score specialization match (job-side values may be scalars or arrays)"""
         # Check if cleaner specializes in this property type
-        if cleaner_score.primary_property_type == job.property.property_type:
-            score = 100.0
-        else:
-            score = 60.0
+        scores = np.where(primary_property_types == property_types, 100.0, 60.0)
         
         # Bonus for eco-friendly if job prefers it
-        if job.eco_friendly_preference and cleaner_score.eco_friendly_jobs_percentage > 50:
-            score = min(100.0, score + 20.0)
+        scores = np.where(prefers_eco & (eco_percentages > 50), np.minimum(100.0, scores + 20.0), scores)
         
-        return score
+        return np.where(has_score, scores, 50.0)
 
-    def _calculate_pricing_competitiveness(self, job: CleaningJob, cleaner: User) -> float:
-        """Score pricing competitiveness"""
-        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
-        if not cleaner_score or not cleaner_score.avg_bid_amount:
-            return 50.0
-        
-        # Get market average for similar jobs
-        similar_jobs = JobBid.objects.filter(
-            job__property__property_type=job.property.property_type,
-            job__property__square_meters__range=(
-                job.property.square_meters * 0.8,
-                job.property.square_meters * 1.2
-            )
+    def _get_market_average_bid(self, job: CleaningJob) -> Optional[float]:
+        """Average bid amount for similar jobs (same property type and size bucket)"""
+        market_prices = MarketPriceService.lookup(
+            job.property.property_type,
+            job.property.size_sqft
         )
+        if not market_prices or not market_prices.bid_count:
+            return None
         
-        market_avg = similar_jobs.aggregate(avg=models.Avg('bid_amount'))['avg']
-        if not market_avg:
-            return 50.0
-        
-        cleaner_avg = float(cleaner_score.avg_bid_amount)
-        ratio = cleaner_avg / float(market_avg)
+        return float(market_prices.avg_bid_amount)
+
+    def _get_market_average_bids(self, jobs: List[CleaningJob]) -> np.ndarray:
+        """Market average bid per job with one query (0 where there is no market data)"""
+        market_prices = MarketPriceService.lookup_many(
+            [(job.property.property_type, job.property.size_sqft) for job in jobs]
+        )
+        return np.array(
+            [float(entry.avg_bid_amount) if entry and entry.bid_count else 0.0 for entry in market_prices],
+            dtype=np.float64
+        )
+
+    def _calculate_pricing_scores(self, market_avgs, avg_bid_amounts: np.ndarray) -> np.ndarray:
+        """Score pricing competitiveness (market_avgs: scalar or array, 0 = no market data)"""
+        market_avgs, avg_bid_amounts = np.broadcast_arrays(
+            np.asarray(market_avgs, dtype=np.float64),
+            np.asarray(avg_bid_amounts, dtype=np.float64)
+        )
+        ratios = np.divide(
+            avg_bid_amounts, market_avgs,
+            out=np.zeros(avg_bid_amounts.shape),
+            where=market_avgs > 0
+        )
         
         # Score based on how competitive (lower is better, but not too low)
-        if ratio < 0.8:
-            return 60.0  # Too cheap might signal quality issues
-        elif ratio <= 1.0:
-            return 100.0  # Competitive
-        elif ratio <= 1.2:
-            return 70.0  # Slightly expensive
-        else:
-            return 40.0  # Too expensive
+        scores = np.select(
+            [ratios < 0.8, ratios <= 1.0, ratios <= 1.2],
+            [
+                60.0,   # Too cheap might signal quality issues
+                100.0,  # Competitive
+                70.0,   # Slightly expensive
+            ],
+            default=40.0  # Too expensive
+        )
+        
+        # Jobs without market data and cleaners with no bidding history stay neutral
+        return np.where((market_avgs > 0) & (avg_bid_amounts > 0), scores, 50.0)
 
-    def _calculate_availability(self, job: CleaningJob, cleaner: User) -> float:
+    def _calculate_availability_scores(
+        self,
+        has_score: np.ndarray,
+        is_active: np.ndarray,
+        jobs_last_90_days: np.ndarray
+    ) -> np.ndarray:
         """Score availability"""
-        cleaner_score = CleanerScore.objects.filter(cleaner=cleaner).first()
-        if not cleaner_score:
-            return 50.0
-        
         # Active cleaners score higher
-        if cleaner_score.is_active:
-            return 100.0
-        elif cleaner_score.jobs_last_90_days > 0:
-            return 70.0
-        else:
-            return 30.0
+        scores = np.select(
+            [is_active, jobs_last_90_days > 0],
+            [100.0, 70.0],
+            default=30.0
+        )
+        return np.where(has_score, scores, 50.0)
 
     def _generate_cleaner_reasoning(self, breakdown: Dict, cleaner: User) -> List[str]:
         """Generate human-readable reasons for recommendation"""
@@ -513,32 +670,115 @@ class RecommendationEngine:
         return reasons
 
     def _get_candidate_cleaners(self, job: CleaningJob, filters: Optional[Dict]) -> List[User]:
-        """Get candidate cleaners for a job"""
+        """
+        Get candidate cleaners for a job.
+        
+        Narrows the cleaner population before scoring:
+        - Geography: only cleaners whose service area covers the job's property,
+          either by radius or by a city / postal-code area matching its address
+        - Filters pushed into SQL (see below)
+        - Capped at RECOMMENDATION_MAX_CANDIDATES: the cleaners closest to the
+          client in embedding space when a trained model is loaded (see
+          _retrieve_embedding_candidates), otherwise best CleanerScore first
+        
+        Supported filters:
+        - max_distance: Max km from the property to the cleaner's nearest radius
+          area center (cleaners matched by city / postal code are kept)
+        - min_rating: Minimum average review rating (1-10 scale)
+        - specialization: If true, only cleaners specialized in the job's property type
+        - max_candidates: Override the candidate cap
+        """
+        filters = filters or {}
+        property_obj = job.property
+        
         cleaners = User.objects.filter(role='cleaner', is_active=True)
         
-        if filters:
-            # Apply filters
-            pass
+        # Service-area coverage (skipped if the property has no coordinates)
+        if property_obj.latitude is not None and property_obj.longitude is not None:
+            distances = get_cleaner_distances(
+                property_obj.latitude,
+                property_obj.longitude,
+                unit='km'
+            )
+            
+            if filters.get('max_distance') is not None:
+                max_distance = float(filters['max_distance'])
+                distances = {
+                    cleaner_id: distance
+                    for cleaner_id, distance in distances.items()
+                    if distance <= max_distance
+                }
+            
+            covered_ids = set(distances) | get_cleaner_ids_by_address(
+                property_obj.city,
+                property_obj.postal_code,
+                state=property_obj.state,
+                country=property_obj.country
+            )
+            cleaners = cleaners.filter(id__in=covered_ids)
+        
+        if filters.get('min_rating') is not None:
+            cleaners = cleaners.filter(score__avg_rating__gte=filters['min_rating'])
+        
+        if filters.get('specialization'):
+            cleaners = cleaners.filter(score__primary_property_type=property_obj.property_type)
+        
+        max_candidates = filters.get(
+            'max_candidates',
+            getattr(settings, 'RECOMMENDATION_MAX_CANDIDATES', 50)
+        )
+        
+        retrieved = self._retrieve_embedding_candidates(job, cleaners, max_candidates)
+        if retrieved is not None:
+            return retrieved
+        
+        cleaners = cleaners.order_by(
+            models.F('score__overall_score').desc(nulls_last=True),
+            'id'
+        ).prefetch_related('service_areas')
         
-        return list(cleaners)
+        return list(cleaners[:max_candidates])
 
-    def _track_job_recommendations(self, job: CleaningJob, recommendations: List[Dict]):
-        """Track recommendations for analytics"""
-        for rank, rec in enumerate(recommendations, start=1):
-            JobRecommendation.objects.get_or_create(
-                job=job,
-                cleaner=rec['cleaner'],
-                defaults={
-                    'recommendation_score': Decimal(str(rec['score'])),
-                    'rank': rank,
-                    'location_score': Decimal(str(rec['breakdown']['location'])),
-                    'pricing_score': Decimal(str(rec['breakdown']['pricing'])),
-                    'specialization_score': Decimal(str(rec['breakdown']['specialization'])),
-                    'availability_score': Decimal(str(rec['breakdown']['availability'])),
-                }
+    def _retrieve_embedding_candidates(
+        self,
+        job: CleaningJob,
+        cleaners: models.QuerySet,
+        max_candidates: int
+    ) -> Optional[List[User]]:
+        """
+        Pick candidates by embedding similarity to the job's client.
+        
+        Eligible cleaners (the filtered queryset) are ranked with the cleaner
+        embedding index; up to cold_start_candidates slots go to eligible
+        cleaners the model has no embedding for, best CleanerScore first.
+        
+        Returns:
+            Candidate cleaners in retrieval order, or None when retrieval is
+            unavailable (disabled, no index, or a client unknown to the model)
+        """
+        ann_config = getattr(settings, 'RECOMMENDATION_ANN_CONFIG', {})
+        index = self.cleaner_index
+        if not ann_config.get('enabled', True) or index is None or not index.has_client(job.client_id):
+            return None
+        
+        eligible_ids = np.fromiter(cleaners.values_list('id', flat=True), dtype=np.int64)
+        cold_ids = eligible_ids[~index.contains(eligible_ids)]
+        
+        cold_slots = min(ann_config.get('cold_start_candidates', 10), len(cold_ids), max_candidates)
+        cold_start = []
+        if cold_slots:
+            cold_start = list(
+                cleaners.filter(id__in=cold_ids.tolist())
+                .order_by(models.F('score__overall_score').desc(nulls_last=True), 'id')
+                .values_list('id', flat=True)[:cold_slots]
             )
+        
+        ranked = index.top_cleaners(job.client_id, max_candidates - len(cold_start), eligible_ids)
+        candidate_ids = [cleaner_id for cleaner_id, _ in ranked] + cold_start
+        
+        by_id = User.objects.filter(id__in=candidate_ids).prefetch_related('service_areas').in_bulk()
+        return [by_id[cleaner_id] for cleaner_id in candidate_ids if cleaner_id in by_id]
 
-    def _score_job_for_cleaner(self, job: CleaningJob, cleaner: User) -> Optional[Dict]:
-        """Score a job for a cleaner (inverse of _score_cleaner_for_job)"""
-        # Similar logic but from cleaner's perspective
-        return self._score_cleaner_for_job(job, cleaner)
+    def _track_job_recommendations(self, job: CleaningJob, recommendations: List[Dict]):
+        """Track recommendations for analytics (buffered, written off the request path)"""
+        recommendation_tracker.track_job_recommendations(job, recommendations)
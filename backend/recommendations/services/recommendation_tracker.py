@@ -0,0 +1,128 @@
+"""
+Buffered recommendation tracking.
+
+Serving recommendations used to write one JobRecommendation per cleaner with
+get_or_create inside the request. The tracker instead buffers the rows in
+memory and a background thread writes them with a single bulk_create
+(ignore_conflicts=True keeps the first impression of a job/cleaner pair,
+like get_or_create did).
+
+The flusher wakes every flush_interval seconds, or early once flush_size
+rows are pending; remaining rows are flushed at interpreter exit.
+Tracking is analytics only: a failed flush is logged and dropped, never
+raised into a request.
+"""
+import atexit
+import logging
+import threading
+from decimal import Decimal
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from recommendations.models import JobRecommendation
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationTracker:
+    """
+    Process-wide buffer of recommendation impressions.
+    
+    Usage:
+        recommendation_tracker.track_job_recommendations(job, recommendations)
+        recommendation_tracker.flush()  # Write pending rows now (e.g. in commands)
+    """
+    
+    def __init__(self):
+        self._buffer: List[JobRecommendation] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    @property
+    def config(self) -> Dict:
+        return getattr(settings, 'RECOMMENDATION_TRACKING_CONFIG', {})
+    
+    def track_job_recommendations(self, job, recommendations: List[Dict]):
+        """Queue one JobRecommendation per recommended cleaner (rank = list position)"""
+        rows = [
+            JobRecommendation(
+                job_id=job.id,
+                cleaner_id=rec['cleaner'].id,
+                recommendation_score=Decimal(str(rec['score'])),
+                recommendation_rank=rank,
+                location_score=Decimal(str(rec['breakdown']['location'])),
+                pricing_score=Decimal(str(rec['breakdown']['pricing'])),
+                specialization_score=Decimal(str(rec['breakdown']['specialization'])),
+                availability_score=Decimal(str(rec['breakdown']['availability'])),
+            )
+            for rank, rec in enumerate(recommendations, start=1)
+        ]
+        if not rows:
+            return
+        
+        with self._lock:
+            self._buffer.extend(rows)
+            pending = len(self._buffer)
+            self._ensure_flusher()
+        
+        if pending >= self.config.get('flush_size', 500):
+            self._wakeup.set()
+    
+    def flush(self) -> int:
+        """
+        Write all pending rows.
+        
+        Returns:
+            Number of distinct job/cleaner pairs submitted
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        
+        # First impression wins within the batch too
+        unique = {}
+        for row in rows:
+            unique.setdefault((row.job_id, row.cleaner_id), row)
+        
+        try:
+            JobRecommendation.objects.bulk_create(
+                list(unique.values()),
+                ignore_conflicts=True,
+                batch_size=self.config.get('flush_size', 500)
+            )
+        except Exception as e:
+            logger.error(f'Recommendation tracking flush failed ({len(unique)} rows dropped): {e}')
+            return 0
+        
+        return len(unique)
+    
+    def _ensure_flusher(self):
+        """Start the background flusher (called with the lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        # Started lazily so it runs in the worker process, not a pre-fork parent
+        if self._thread is None:
+            atexit.register(self.flush)
+        self._thread = threading.Thread(
+            target=self._run,
+            name='recommendation-tracker',
+            daemon=True
+        )
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.config.get('flush_interval', 5))
+            self._wakeup.clear()
+            self.flush()
+            # The flusher thread owns its own DB connection; honour CONN_MAX_AGE
+            close_old_connections()
+
+
+# Global recommendation tracker instance
+recommendation_tracker = RecommendationTracker()
@@ -2,22 +2,51 @@
 Scoring Service
 
 Calculates and updates cleaner scores based on historical performance data.
+
+Scores are split into metric groups (quality, reliability, bidding,
+experience, specialization, activity). Events mark only the groups they
+affect as dirty for the affected cleaner; the nightly batch recomputes the
+dirty groups and refreshes activity windows in bulk instead of rescoring
+every cleaner from full history.
 """
 
+import logging
 from decimal import Decimal
+from django.db import IntegrityError, transaction
 from django.db.models import Avg, Count, Q, F
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 
-from recommendations.models import CleanerScore
+from recommendations.models import CleanerScore, DirtyCleanerMetric
+from recommendations.services.recommendation_cache import RecommendationCache
 from reviews.models import Review, ReviewRating
 from cleaning_jobs.models import CleaningJob, JobBid
 from job_lifecycle.models import JobPhoto
 from payments.models import Payment
 
+logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Metric groups of a CleanerScore, each recalculated by one _calculate_* method
+METRIC_GROUPS = [
+    'quality',
+    'reliability',
+    'bidding',
+    'experience',
+    'specialization',
+    'activity',
+]
+
+# Metric groups affected by each kind of event
+EVENT_METRICS = {
+    'review': ['quality'],
+    'job_status': ['reliability', 'experience', 'specialization', 'activity'],
+    'bid': ['bidding'],
+    'payment': ['experience'],
+    'photo': ['reliability'],
+}
+
 
 class ScoringService:
     """
@@ -32,18 +61,34 @@ class ScoringService:
         Args:
             cleaner: User instance with role='cleaner'
             
+        Returns:
+            CleanerScore instance
+        """
+        return ScoringService.update_cleaner_metrics(cleaner, METRIC_GROUPS)
+    
+    @staticmethod
+    def update_cleaner_metrics(cleaner, metrics):
+        """
+        Recalculate only the given metric groups of a cleaner's score.
+        
+        A newly created score gets every group calculated, since its other
+        metrics would otherwise stay at their defaults.
+        
+        Args:
+            cleaner: User instance with role='cleaner'
+            metrics: Iterable of METRIC_GROUPS names
+            
         Returns:
             CleanerScore instance
         """
         score, created = CleanerScore.objects.get_or_create(cleaner=cleaner)
         
-        # Calculate all individual metrics
-        ScoringService._calculate_quality_metrics(score)
-        ScoringService._calculate_reliability_metrics(score)
-        ScoringService._calculate_bidding_metrics(score)
-        ScoringService._calculate_experience_metrics(score)
-        ScoringService._calculate_specialization(score)
-        ScoringService._calculate_activity_metrics(score)
+        metrics = set(METRIC_GROUPS if created else metrics)
+        calculators = ScoringService._metric_calculators()
+        
+        for metric in METRIC_GROUPS:
+            if metric in metrics:
+                calculators[metric](score)
         
         # Calculate overall composite score
         score.calculate_overall_score()
@@ -51,6 +96,61 @@ class ScoringService:
         
         return score
     
+    @staticmethod
+    def _metric_calculators():
+        return {
+            'quality': ScoringService._calculate_quality_metrics,
+            'reliability': ScoringService._calculate_reliability_metrics,
+            'bidding': ScoringService._calculate_bidding_metrics,
+            'experience': ScoringService._calculate_experience_metrics,
+            'specialization': ScoringService._calculate_specialization,
+            'activity': ScoringService._calculate_activity_metrics,
+        }
+    
+    @staticmethod
+    def mark_dirty(cleaner_id, event):
+        """
+        Queue the metric groups affected by an event for a cleaner.
+        
+        Re-marking an already queued group only bumps its marked_at, so a
+        cleaner appears at most once per group in the queue.
+        
+        The write happens after the caller's transaction commits, so it stays
+        out of the request's transaction, and is skipped if the cleaner no
+        longer exists (e.g. bids and reviews deleted by cascade with the
+        cleaner's account).
+        
+        Args:
+            cleaner_id: ID of the affected cleaner
+            event: Key of EVENT_METRICS ('review', 'job_status', 'bid', ...)
+        """
+        if cleaner_id is None:
+            return
+        
+        metrics = EVENT_METRICS[event]
+        marked_at = timezone.now()
+        transaction.on_commit(lambda: ScoringService._write_dirty_metrics(cleaner_id, metrics, marked_at))
+    
+    @staticmethod
+    def _write_dirty_metrics(cleaner_id, metrics, marked_at):
+        """Upsert queued metric groups of a cleaner that still exists."""
+        if not User.objects.filter(pk=cleaner_id).exists():
+            return
+        
+        try:
+            DirtyCleanerMetric.objects.bulk_create(
+                [
+                    DirtyCleanerMetric(cleaner_id=cleaner_id, metric=metric, marked_at=marked_at)
+                    for metric in metrics
+                ],
+                update_conflicts=True,
+                unique_fields=['cleaner', 'metric'],
+                update_fields=['marked_at']
+            )
+        except IntegrityError:
+            # Cleaner deleted between the check and the insert
+            logger.info(f"Skipped dirty score metrics of deleted cleaner {cleaner_id}")
+    
     @staticmethod
     def _calculate_quality_metrics(score):
         """Calculate quality metrics from reviews."""
@@ -300,5 +400,106 @@ class ScoringService:
         }
 
 
+    @staticmethod
+    def update_dirty_cleaner_scores():
+        """
+        Recalculate the queued (dirty) metric groups of affected cleaners.
+        
+        Each cleaner is rescored once with the union of its dirty groups.
+        Queue rows marked again while the cleaner was being processed are
+        kept for the next run.
+        
+        Returns:
+            dict: Summary of updates
+        """
+        pending = {}
+        for cleaner_id, metric, marked_at in DirtyCleanerMetric.objects.values_list(
+            'cleaner_id', 'metric', 'marked_at'
+        ):
+            entry = pending.setdefault(cleaner_id, {'metrics': set(), 'marked_at': marked_at})
+            entry['metrics'].add(metric)
+            entry['marked_at'] = max(entry['marked_at'], marked_at)
+        
+        cleaners = User.objects.in_bulk(list(pending))
+        updated_count = 0
+        errors = []
+        
+        for cleaner_id, entry in pending.items():
+            cleaner = cleaners.get(cleaner_id)
+            try:
+                if cleaner is not None and cleaner.role == 'cleaner':
+                    ScoringService.update_cleaner_metrics(cleaner, entry['metrics'])
+                    updated_count += 1
+                DirtyCleanerMetric.objects.filter(
+                    cleaner_id=cleaner_id,
+                    marked_at__lte=entry['marked_at']
+                ).delete()
+            except Exception as e:
+                errors.append(f"Error updating cleaner {cleaner_id}: {str(e)}")
+        
+        return {
+            'dirty_cleaners': len(pending),
+            'updated': updated_count,
+            'errors': errors
+        }
+    
+    @staticmethod
+    def refresh_activity_metrics():
+        """
+        Refresh the rolling 30/90-day activity metrics of all scores in bulk.
+        
+        Activity windows move every day even without new events, so the
+        nightly batch recounts them with one grouped query over the last 90
+        days and only rewrites scores whose counts changed.
+        
+        Returns:
+            int: Number of scores updated
+        """
+        now = timezone.now()
+        thirty_days_ago = now - timedelta(days=30)
+        ninety_days_ago = now - timedelta(days=90)
+        
+        recent_counts = {
+            row['cleaner_id']: row
+            for row in CleaningJob.objects.filter(
+                cleaner__isnull=False,
+                status='completed',
+                actual_end_time__gte=ninety_days_ago
+            ).values('cleaner_id').annotate(
+                last_30=Count('id', filter=Q(actual_end_time__gte=thirty_days_ago)),
+                last_90=Count('id')
+            )
+        }
+        
+        changed = []
+        for score in CleanerScore.objects.iterator():
+            counts = recent_counts.get(score.cleaner_id, {})
+            jobs_last_30_days = counts.get('last_30', 0)
+            jobs_last_90_days = counts.get('last_90', 0)
+            
+            if (score.jobs_last_30_days, score.jobs_last_90_days) == (jobs_last_30_days, jobs_last_90_days):
+                continue
+            
+            score.jobs_last_30_days = jobs_last_30_days
+            score.jobs_last_90_days = jobs_last_90_days
+            score.is_active = jobs_last_90_days > 0
+            score.calculate_overall_score()
+            # bulk_update does not apply auto_now
+            score.last_calculated = now
+            changed.append(score)
+        
+        CleanerScore.objects.bulk_update(
+            changed,
+            ['jobs_last_30_days', 'jobs_last_90_days', 'is_active', 'overall_score', 'last_calculated'],
+            batch_size=500
+        )
+        
+        # bulk_update sends no signals
+        if changed:
+            RecommendationCache.invalidate_cleaner(None, pool=True)
+        
+        return len(changed)
+
+
 # Import Django models at module level (after class definition to avoid circular imports)
 from django.db import models
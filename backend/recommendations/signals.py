@@ -0,0 +1,359 @@
+"""
+Signals for the recommendation system
+
+Keeps denormalized recommendation data in sync with jobs, bids and reviews,
+queues the CleanerScore metrics affected by each change, and invalidates
+the cached recommendation lists and the open job index that depend on it.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.db import transaction
+from django.utils import timezone
+from cleaning_jobs.models import CleaningJob, JobBid
+from reviews.models import Review, ReviewRating
+from payments.models import Payment
+from job_lifecycle.models import JobPhoto
+from users.models import ServiceArea
+from properties.models import Property
+from .models import CleanerScore
+from .services.market_pricing import MarketPriceService
+from .services.cleaner_stats import CleanerStatsService
+from .services.scoring_service import ScoringService
+from .services.recommendation_cache import RecommendationCache
+from .services.open_job_index import open_job_index, OPEN_STATUS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# CleaningJob fields that feed recommendation scoring (client embedding,
+# property location/type/size, budget and the scheduled duration feature)
+JOB_SCORING_FIELDS = ('client_id', 'property_id', 'client_budget', 'start_time', 'end_time')
+
+
+@receiver(pre_save, sender=JobBid)
+def job_bid_remember_previous_amount(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember a bid's amount before this save so the market price bucket
+    can be adjusted by the difference.
+    """
+    instance._market_previous_amount = None
+    if instance.pk and (update_fields is None or 'bid_amount' in update_fields):
+        instance._market_previous_amount = JobBid.objects.filter(
+            pk=instance.pk
+        ).values_list('bid_amount', flat=True).first()
+
+
+@receiver(post_save, sender=JobBid)
+def job_bid_market_price_update(sender, instance, created, **kwargs):
+    """
+    Add a new bid to its market price bucket, or apply an amount change.
+    """
+    if created:
+        _queue_market_price_delta(instance, 1, instance.bid_amount)
+        return
+    
+    previous_amount = getattr(instance, '_market_previous_amount', None)
+    if previous_amount is not None and previous_amount != instance.bid_amount:
+        _queue_market_price_delta(instance, 0, instance.bid_amount - previous_amount)
+
+
+@receiver(post_delete, sender=JobBid)
+def job_bid_market_price_delete(sender, instance, origin=None, **kwargs):
+    """
+    Remove a deleted bid from its market price bucket.
+    
+    Skipped when the bid goes with its job or property (cascade delete);
+    the scheduled rebuild_market_price_index run drops those bids, instead
+    of a bucket lookup per cascaded bid.
+    """
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model in (CleaningJob, Property):
+        return
+    _queue_market_price_delta(instance, -1, -instance.bid_amount)
+
+
+def _queue_market_price_delta(bid, count_delta, amount_delta):
+    """
+    Resolve the bid's bucket now, while its job still exists, and adjust
+    the bucket's running totals after the transaction commits.
+    """
+    window_days = getattr(settings, 'RECOMMENDATION_MARKET_PRICE_WINDOW_DAYS', 180)
+    if bid.created_at and bid.created_at < timezone.now() - timedelta(days=window_days):
+        # Already outside the rolling window, so not part of the totals
+        return
+    
+    bucket = MarketPriceService.bucket_for_job(bid.job_id)
+    if bucket is None:
+        return
+    
+    transaction.on_commit(lambda: _apply_market_price_delta(bid.id, bucket, count_delta, amount_delta))
+
+
+def _apply_market_price_delta(bid_id, bucket, count_delta, amount_delta):
+    """Apply a market price delta after transaction commit."""
+    try:
+        MarketPriceService.apply_bid_delta(*bucket, count_delta, amount_delta)
+    except Exception as e:
+        logger.error(f"Error updating market price index for bid {bid_id}: {e}", exc_info=True)
+
+
+@receiver(pre_save, sender=CleaningJob)
+def job_remember_previous_cleaner(sender, instance, **kwargs):
+    """
+    Remember the cleaner, status and scoring fields a job had before this
+    save, so a reassignment refreshes both cleaners' stats, and scores, the
+    open job index and cached job feeds are only touched when something
+    relevant changed.
+    """
+    previous = None
+    if instance.pk:
+        previous = CleaningJob.objects.filter(
+            pk=instance.pk
+        ).values('cleaner_id', 'status', *JOB_SCORING_FIELDS).first()
+    
+    instance._stats_previous = previous
+    instance._stats_previous_cleaner_id = previous['cleaner_id'] if previous else None
+    instance._stats_previous_status = previous['status'] if previous else None
+    instance._stats_previous_property_id = previous['property_id'] if previous else None
+
+
+@receiver(post_save, sender=CleaningJob)
+@receiver(post_delete, sender=CleaningJob)
+def job_cleaner_stats_update(sender, instance, **kwargs):
+    """
+    Refresh the stats of the cleaner(s) a saved or deleted job belongs to.
+    """
+    cleaner_ids = [instance.cleaner_id, getattr(instance, '_stats_previous_cleaner_id', None)]
+    transaction.on_commit(lambda: _refresh_cleaner_stats(cleaner_ids))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_cleaner_stats_update(sender, instance, **kwargs):
+    """
+    Refresh the stats of the reviewed cleaner.
+    """
+    cleaner_ids = [instance.reviewee_id]
+    transaction.on_commit(lambda: _refresh_cleaner_stats(cleaner_ids))
+
+
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def review_rating_cleaner_stats_update(sender, instance, **kwargs):
+    """
+    Refresh sub-rating averages of the reviewed cleaner.
+    """
+    cleaner_ids = list(
+        Review.objects.filter(pk=instance.review_id).values_list('reviewee_id', flat=True)
+    )
+    transaction.on_commit(lambda: _refresh_cleaner_stats(cleaner_ids))
+
+
+def _refresh_cleaner_stats(cleaner_ids):
+    """Refresh cleaner stats after transaction commit."""
+    try:
+        CleanerStatsService.refresh_cleaners(cleaner_ids)
+    except Exception as e:
+        logger.error(f"Error refreshing cleaner stats for {cleaner_ids}: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=CleaningJob)
+def job_mark_score_dirty(sender, instance, created, **kwargs):
+    """
+    Queue job-dependent score metrics when a job's status or cleaner changes.
+    """
+    previous_cleaner_id = getattr(instance, '_stats_previous_cleaner_id', None)
+    previous_status = getattr(instance, '_stats_previous_status', None)
+    
+    if created or instance.status != previous_status or instance.cleaner_id != previous_cleaner_id:
+        ScoringService.mark_dirty(instance.cleaner_id, 'job_status')
+    if previous_cleaner_id != instance.cleaner_id:
+        ScoringService.mark_dirty(previous_cleaner_id, 'job_status')
+
+
+@receiver(post_delete, sender=CleaningJob)
+def job_delete_mark_score_dirty(sender, instance, **kwargs):
+    """Queue job-dependent score metrics of a deleted job's cleaner."""
+    ScoringService.mark_dirty(instance.cleaner_id, 'job_status')
+
+
+@receiver(post_save, sender=JobBid)
+@receiver(post_delete, sender=JobBid)
+def bid_mark_score_dirty(sender, instance, **kwargs):
+    """Queue bidding metrics of the bidding cleaner."""
+    ScoringService.mark_dirty(instance.cleaner_id, 'bid')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_mark_score_dirty(sender, instance, **kwargs):
+    """Queue quality metrics of the reviewed user."""
+    ScoringService.mark_dirty(instance.reviewee_id, 'review')
+
+
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def review_rating_mark_score_dirty(sender, instance, **kwargs):
+    """Queue quality metrics when category ratings change."""
+    reviewee_id = Review.objects.filter(
+        pk=instance.review_id
+    ).values_list('reviewee_id', flat=True).first()
+    ScoringService.mark_dirty(reviewee_id, 'review')
+
+
+@receiver(post_save, sender=Payment)
+def payment_mark_score_dirty(sender, instance, **kwargs):
+    """Queue experience metrics (earnings) of the paid cleaner."""
+    ScoringService.mark_dirty(instance.cleaner_id, 'payment')
+
+
+@receiver(post_save, sender=JobPhoto)
+@receiver(post_delete, sender=JobPhoto)
+def photo_mark_score_dirty(sender, instance, **kwargs):
+    """Queue reliability metrics (photo documentation) of the job's cleaner."""
+    cleaner_id = CleaningJob.objects.filter(
+        pk=instance.job_id
+    ).values_list('cleaner_id', flat=True).first()
+    ScoringService.mark_dirty(cleaner_id, 'photo')
+
+
+def _job_feeds_changed(instance, created):
+    """
+    Whether a save can change cleaners' job feeds: the job entered or left
+    the open set, or an open job's scoring fields changed.
+    """
+    is_open = instance.status == OPEN_STATUS
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        return is_open
+    if is_open != (previous['status'] == OPEN_STATUS):
+        return True
+    return is_open and any(
+        getattr(instance, field) != previous[field] for field in JOB_SCORING_FIELDS
+    )
+
+
+@receiver(post_save, sender=CleaningJob)
+def job_invalidate_recommendations(sender, instance, created, **kwargs):
+    """
+    Invalidate the job's cleaner list, and every cleaner's job list only
+    when the job feeds may have changed (see _job_feeds_changed).
+    """
+    job_id = instance.pk
+    pool = _job_feeds_changed(instance, created)
+    transaction.on_commit(lambda: RecommendationCache.invalidate_job(job_id, pool=pool))
+
+
+@receiver(post_delete, sender=CleaningJob)
+def job_delete_invalidate_recommendations(sender, instance, **kwargs):
+    """Invalidate the job's cleaner list, and every cleaner's job list if it was open."""
+    job_id = instance.pk
+    pool = instance.status == OPEN_STATUS
+    transaction.on_commit(lambda: RecommendationCache.invalidate_job(job_id, pool=pool))
+
+
+@receiver(post_save, sender=JobBid)
+@receiver(post_delete, sender=JobBid)
+def bid_invalidate_recommendations(sender, instance, **kwargs):
+    """Invalidate the lists of the bid's job and bidding cleaner."""
+    job_id, cleaner_id = instance.job_id, instance.cleaner_id
+    transaction.on_commit(lambda: _invalidate_pair(job_id, cleaner_id))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_invalidate_recommendations(sender, instance, **kwargs):
+    """Invalidate the lists of the reviewed job and reviewee."""
+    job_id, cleaner_id = instance.job_id, instance.reviewee_id
+    transaction.on_commit(lambda: _invalidate_pair(job_id, cleaner_id))
+
+
+@receiver(post_save, sender=CleanerScore)
+@receiver(post_delete, sender=CleanerScore)
+def cleaner_score_invalidate_recommendations(sender, instance, **kwargs):
+    """
+    Invalidate the cleaner's job list and every job's cleaner list
+    (rankings of all jobs depend on cleaner scores).
+    """
+    cleaner_id = instance.cleaner_id
+    transaction.on_commit(lambda: RecommendationCache.invalidate_cleaner(cleaner_id, pool=True))
+
+
+@receiver(post_save, sender=ServiceArea)
+@receiver(post_delete, sender=ServiceArea)
+def service_area_invalidate_recommendations(sender, instance, **kwargs):
+    """Invalidate lists affected by a cleaner's coverage change."""
+    cleaner_id = instance.cleaner_id
+    transaction.on_commit(lambda: RecommendationCache.invalidate_cleaner(cleaner_id, pool=True))
+
+
+def _invalidate_pair(job_id, cleaner_id):
+    RecommendationCache.invalidate_job(job_id)
+    RecommendationCache.invalidate_cleaner(cleaner_id)
+
+
+def _open_set_changed(instance, created):
+    """Whether a save added, dropped or moved a job in the open job set."""
+    is_open = instance.status == OPEN_STATUS
+    if created:
+        return is_open
+    was_open = getattr(instance, '_stats_previous_status', None) == OPEN_STATUS
+    if is_open != was_open:
+        return True
+    return is_open and instance.property_id != getattr(instance, '_stats_previous_property_id', None)
+
+
+@receiver(post_save, sender=CleaningJob)
+def job_update_open_job_index(sender, instance, created, **kwargs):
+    """Add, move or drop a job in the open job index when it entered, left or moved within the open set."""
+    if not _open_set_changed(instance, created):
+        return
+    job_id = instance.pk
+    transaction.on_commit(lambda: _update_open_job_index(job_id))
+
+
+@receiver(post_delete, sender=CleaningJob)
+def job_remove_from_open_job_index(sender, instance, **kwargs):
+    """Drop a deleted open job from the open job index."""
+    if instance.status != OPEN_STATUS:
+        return
+    job_id = instance.pk
+    transaction.on_commit(lambda: _remove_from_open_job_index(job_id))
+
+
+@receiver(post_save, sender=Property)
+def property_update_open_job_index(sender, instance, created, **kwargs):
+    """Re-index a property's open jobs and invalidate their recommendations (its location or type may have changed)."""
+    if created:
+        return
+    property_id = instance.pk
+    transaction.on_commit(lambda: _update_property_jobs(property_id))
+
+
+def _update_open_job_index(job_id):
+    try:
+        open_job_index.update_job(job_id)
+    except Exception as e:
+        logger.error(f"Error updating open job index for job {job_id}: {e}", exc_info=True)
+
+
+def _remove_from_open_job_index(job_id):
+    try:
+        open_job_index.remove_job(job_id)
+    except Exception as e:
+        logger.error(f"Error removing job {job_id} from open job index: {e}", exc_info=True)
+
+
+def _update_property_jobs(property_id):
+    try:
+        job_ids = open_job_index.update_property_jobs(property_id)
+        # The property feeds each job's features, so its cleaner list is stale too
+        for job_id in job_ids:
+            RecommendationCache.invalidate_job(job_id)
+        if job_ids:
+            RecommendationCache.invalidate_job(None, pool=True)
+    except Exception as e:
+        logger.error(f"Error re-indexing open jobs of property {property_id}: {e}", exc_info=True)
@@ -1,3 +1,917 @@
-from django.test import TestCase
+import importlib.util
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date, time, timedelta
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from cleaning_jobs.models import CleaningJob, JobBid
+from properties.models import Property
+from recommendations.models import CleanerScore, CleanerStats, DirtyCleanerMetric, JobRecommendation, MarketPriceIndex
+from recommendations.services.open_job_index import open_job_index
+from recommendations.services.recommendation_engine import RecommendationEngine
+from recommendations.services.recommendation_tracker import RecommendationTracker
+from recommendations.services.cleaner_stats import CleanerStatsService
+from recommendations.services.embedding_cache import EmbeddingCache
+from recommendations.services.embedding_index import CleanerEmbeddingIndex
+from recommendations.services.feature_store import FeatureStore, NUM_FEATURES
+from recommendations.services.market_pricing import MarketPriceService
+from recommendations.services.nn_dataset import NNDataset
+from recommendations.services.scoring_service import ScoringService
+from reviews.models import Review, ReviewRating
+from recommendations.signals import _job_feeds_changed, _open_set_changed, job_remember_previous_cleaner
+from users.models import User, ServiceArea
+from users.spatial_index import service_area_index
+
+TORCH_AVAILABLE = importlib.util.find_spec('torch') is not None
+
+
+def create_user(email, role):
+    return User.objects.create_user(email=email, password='testpass123', role=role)
+
+
+def create_property(owner, city='Athens', postal_code='10558', latitude=None, longitude=None):
+    return Property.objects.create(
+        owner=owner,
+        address_line1='1 Test Street',
+        city=city,
+        state='Attica',
+        postal_code=postal_code,
+        country='US',
+        latitude=latitude,
+        longitude=longitude,
+        property_type='apartment',
+    )
+
+
+def create_job(client, property_obj, status='open_for_bids'):
+    return CleaningJob.objects.create(
+        client=client,
+        property=property_obj,
+        status=status,
+        scheduled_date=date(2030, 1, 15),
+        start_time=time(9, 0),
+        end_time=time(12, 0),
+        client_budget=Decimal('80.00'),
+    )
+
+
+class CandidateCleanerTests(TestCase):
+    """Geographic pre-filtering in RecommendationEngine._get_candidate_cleaners"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.property = create_property(
+            self.client_user,
+            latitude=Decimal('37.97550000'),
+            longitude=Decimal('23.73480000'),
+        )
+        self.job = create_job(self.client_user, self.property)
+        self.engine = RecommendationEngine(mode='rule_based')
+
+    def tearDown(self):
+        service_area_index.invalidate()
+
+    def candidate_ids(self, filters=None):
+        service_area_index.rebuild()
+        return {cleaner.id for cleaner in self.engine._get_candidate_cleaners(self.job, filters)}
+
+    def test_radius_area_covering_property_is_candidate(self):
+        cleaner = create_user('radius@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=cleaner, area_type='radius', area_name='Center',
+            center_latitude=Decimal('37.98000000'), center_longitude=Decimal('23.73000000'),
+            radius_miles=Decimal('5.00'),
+        )
+        far_cleaner = create_user('far@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=far_cleaner, area_type='radius', area_name='Thessaloniki',
+            center_latitude=Decimal('40.64000000'), center_longitude=Decimal('22.94000000'),
+            radius_miles=Decimal('5.00'),
+        )
+
+        self.assertEqual(self.candidate_ids(), {cleaner.id})
+
+    def test_city_only_cleaner_is_candidate_for_located_job(self):
+        cleaner = create_user('city@example.com', 'cleaner')
+        ServiceArea.objects.create(cleaner=cleaner, area_type='city', area_name='Athens', city='athens')
+        other_city = create_user('patras@example.com', 'cleaner')
+        ServiceArea.objects.create(cleaner=other_city, area_type='city', area_name='Patras', city='Patras')
+
+        self.assertEqual(self.candidate_ids(), {cleaner.id})
+
+    def test_postal_code_cleaner_is_candidate_for_located_job(self):
+        cleaner = create_user('postal@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=cleaner, area_type='postal_codes', area_name='Plaka', postal_codes=['10558', '10556'],
+        )
+
+        self.assertEqual(self.candidate_ids(), {cleaner.id})
+
+    def test_max_distance_keeps_city_matches(self):
+        city_cleaner = create_user('city@example.com', 'cleaner')
+        ServiceArea.objects.create(cleaner=city_cleaner, area_type='city', area_name='Athens', city='Athens')
+        radius_cleaner = create_user('radius@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=radius_cleaner, area_type='radius', area_name='Wide',
+            center_latitude=Decimal('38.05000000'), center_longitude=Decimal('23.80000000'),
+            radius_miles=Decimal('20.00'),
+        )
+
+        self.assertEqual(self.candidate_ids({'max_distance': 1}), {city_cleaner.id})
+
+    def test_inactive_area_is_ignored(self):
+        cleaner = create_user('city@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=cleaner, area_type='city', area_name='Athens', city='Athens', is_active=False,
+        )
+
+        self.assertEqual(self.candidate_ids(), set())
+
+
+class BatchScoringTests(TestCase):
+    """The batched scoring pass matches scoring each cleaner on its own"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.property = create_property(
+            self.client_user,
+            latitude=Decimal('37.97550000'),
+            longitude=Decimal('23.73480000'),
+        )
+        self.job = create_job(self.client_user, self.property)
+        MarketPriceIndex.objects.create(
+            property_type='apartment', size_bucket=0, bid_count=3, avg_bid_amount=Decimal('75.00'),
+        )
+
+        self.cleaners = []
+        for number, (radius_miles, overall_score, avg_bid) in enumerate([
+            ('2.00', '92.00', '60.00'),
+            ('15.00', '70.00', '90.00'),
+            ('40.00', None, None),
+        ]):
+            cleaner = create_user(f'cleaner{number}@example.com', 'cleaner')
+            ServiceArea.objects.create(
+                cleaner=cleaner, area_type='radius', area_name=f'Area {number}',
+                center_latitude=Decimal('37.98000000') + number, center_longitude=Decimal('23.73000000'),
+                radius_miles=Decimal(radius_miles),
+            )
+            if overall_score is not None:
+                CleanerScore.objects.create(
+                    cleaner=cleaner, overall_score=Decimal(overall_score), avg_bid_amount=Decimal(avg_bid),
+                    primary_property_type='apartment', jobs_last_90_days=number + 1,
+                )
+            self.cleaners.append(cleaner)
+
+    def assert_batch_matches_single(self, engine):
+        batch = engine._score_cleaners_for_job_batch(self.job, self.cleaners)
+
+        self.assertEqual([entry['cleaner'] for entry in batch], self.cleaners)
+        for entry, cleaner in zip(batch, self.cleaners):
+            single = engine._score_cleaner_for_job(self.job, cleaner)
+            self.assertAlmostEqual(entry['score'], single['score'], places=2)
+            self.assertEqual(entry['rule_based_score'], single['rule_based_score'])
+            self.assertEqual(entry['breakdown'], single['breakdown'])
+            self.assertEqual(entry['reasoning'], single['reasoning'])
+        return batch
+
+    def test_rule_based_batch_matches_single_cleaner_scoring(self):
+        batch = self.assert_batch_matches_single(RecommendationEngine(mode='rule_based'))
+
+        # Rows are not mixed up: the nearest, best-rated cleaner ranks first
+        self.assertEqual(max(batch, key=lambda entry: entry['score'])['cleaner'], self.cleaners[0])
+
+    def test_batch_loads_scores_with_one_query(self):
+        engine = RecommendationEngine(mode='rule_based')
+
+        with mock.patch.object(CleanerScore.objects, 'filter', wraps=CleanerScore.objects.filter) as score_filter:
+            engine._score_cleaners_for_job_batch(self.job, self.cleaners)
+
+        self.assertEqual(score_filter.call_count, 1)
+
+    @unittest.skipUnless(TORCH_AVAILABLE, 'PyTorch not installed')
+    def test_neural_batch_matches_single_cleaner_scoring(self):
+        import torch
+        from recommendations.services.ml_models import HybridRecommendationModel, ModelManager
+
+        torch.manual_seed(0)
+        engine = RecommendationEngine(mode='rule_based')
+        engine.mode = 'ensemble'
+        engine.model_manager = ModelManager(model_dir=Path(tempfile.mkdtemp()))
+        engine.model_manager.build_feature_maps([self.client_user.id], [cleaner.id for cleaner in self.cleaners])
+        engine.nn_model = HybridRecommendationModel(num_clients=1, num_cleaners=len(self.cleaners)).eval()
+
+        with mock.patch.object(
+            engine.model_manager, 'predict_batch', wraps=engine.model_manager.predict_batch
+        ) as predict_batch:
+            batch = engine._score_cleaners_for_job_batch(self.job, self.cleaners)
+        self.assertEqual(predict_batch.call_count, 1)
+
+        for entry, cleaner in zip(batch, self.cleaners):
+            single = engine._score_cleaner_for_job(self.job, cleaner)
+            self.assertAlmostEqual(entry['neural_score'], single['neural_score'], places=2)
+        self.assert_batch_matches_single(engine)
+
+
+class CleanerJobFeedTests(TestCase):
+    """Open job selection in RecommendationEngine.recommend_jobs_for_cleaner"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.athens_job = create_job(self.client_user, create_property(
+            self.client_user, city='Athens', postal_code='10558',
+            latitude=Decimal('37.97550000'), longitude=Decimal('23.73480000'),
+        ))
+        self.patras_job = create_job(self.client_user, create_property(
+            self.client_user, city='Patras', postal_code='26221',
+            latitude=Decimal('38.24660000'), longitude=Decimal('21.73460000'),
+        ))
+        self.unlocated_job = create_job(self.client_user, create_property(self.client_user, city='Volos'))
+        create_job(self.client_user, create_property(self.client_user, city='Athens'), status='completed')
+        self.engine = RecommendationEngine(mode='rule_based')
+        open_job_index.invalidate()
+        cache.clear()
+
+    def tearDown(self):
+        open_job_index.invalidate()
+
+    def feed_job_ids(self, cleaner, filters=None):
+        return {entry['job'].id for entry in self.engine.recommend_jobs_for_cleaner(cleaner, limit=50, filters=filters)}
+
+    def test_city_only_cleaner_sees_located_jobs_in_their_city(self):
+        cleaner = create_user('city@example.com', 'cleaner')
+        ServiceArea.objects.create(cleaner=cleaner, area_type='city', area_name='Athens', city='Athens')
+
+        self.assertEqual(self.feed_job_ids(cleaner), {self.athens_job.id, self.unlocated_job.id})
+
+    def test_postal_code_cleaner_sees_matching_jobs(self):
+        cleaner = create_user('postal@example.com', 'cleaner')
+        ServiceArea.objects.create(cleaner=cleaner, area_type='postal_codes', area_name='Patras', postal_codes=['26221'])
+
+        self.assertEqual(self.feed_job_ids(cleaner), {self.patras_job.id, self.unlocated_job.id})
+
+    def test_radius_cleaner_sees_jobs_inside_radius(self):
+        cleaner = create_user('radius@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=cleaner, area_type='radius', area_name='Center',
+            center_latitude=Decimal('37.98000000'), center_longitude=Decimal('23.73000000'),
+            radius_miles=Decimal('5.00'),
+        )
+
+        self.assertEqual(self.feed_job_ids(cleaner), {self.athens_job.id, self.unlocated_job.id})
+
+    def test_cleaner_without_areas_sees_every_open_job(self):
+        cleaner = create_user('nowhere@example.com', 'cleaner')
+
+        self.assertEqual(
+            self.feed_job_ids(cleaner),
+            {self.athens_job.id, self.patras_job.id, self.unlocated_job.id}
+        )
+
+    def test_job_leaving_open_set_is_dropped(self):
+        cleaner = create_user('nowhere@example.com', 'cleaner')
+        self.assertEqual(len(open_job_index.all_jobs()), 3)
+
+        self.patras_job.status = 'cancelled'
+        self.patras_job.save()
+        open_job_index.update_job(self.patras_job.id)
+
+        self.assertEqual(self.feed_job_ids(cleaner), {self.athens_job.id, self.unlocated_job.id})
+
+    def test_only_open_set_changes_touch_the_index(self):
+        completed = CleaningJob.objects.get(status='completed')
+
+        completed.notes = 'Left keys with the doorman'
+        job_remember_previous_cleaner(CleaningJob, completed)
+        self.assertFalse(_open_set_changed(completed, created=False))
+
+        completed.status = 'open_for_bids'
+        self.assertTrue(_open_set_changed(completed, created=False))
+
+        job_remember_previous_cleaner(CleaningJob, self.athens_job)
+        self.athens_job.client_budget = Decimal('95.00')
+        self.assertFalse(_open_set_changed(self.athens_job, created=False))
+
+        self.athens_job.property = create_property(self.client_user, city='Patras')
+        self.assertTrue(_open_set_changed(self.athens_job, created=False))
+
+    def test_batched_feed_matches_per_job_scoring(self):
+        cleaner = create_user('radius@example.com', 'cleaner')
+        ServiceArea.objects.create(
+            cleaner=cleaner, area_type='radius', area_name='Wide',
+            center_latitude=Decimal('37.98000000'), center_longitude=Decimal('23.73000000'),
+            radius_miles=Decimal('200.00'),
+        )
+        cleaner_score = CleanerScore.objects.create(
+            cleaner=cleaner, overall_score=Decimal('85.00'), avg_bid_amount=Decimal('70.00'),
+            primary_property_type='apartment', jobs_last_90_days=4,
+        )
+        MarketPriceIndex.objects.create(
+            property_type='apartment', size_bucket=0, bid_count=3, avg_bid_amount=Decimal('75.00'),
+        )
+
+        feed = self.engine.recommend_jobs_for_cleaner(cleaner, limit=50)
+
+        self.assertEqual(len(feed), 3)
+        for entry in feed:
+            expected = self.engine._score_cleaners_for_job_batch(entry['job'], [cleaner], [cleaner_score])[0]
+            self.assertEqual(entry['score'], expected['score'])
+            self.assertEqual(entry['breakdown'], expected['breakdown'])
+
+
+class JobFeedInvalidationTests(TestCase):
+    """Which job saves invalidate every cleaner's cached job feed"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.property = create_property(self.client_user)
+
+    def reload(self, job):
+        job = CleaningJob.objects.get(pk=job.pk)
+        job_remember_previous_cleaner(CleaningJob, job)
+        return job
+
+    def test_new_open_job_changes_feeds(self):
+        job = create_job(self.client_user, self.property)
+        self.assertTrue(_job_feeds_changed(job, created=True))
+
+    def test_closed_job_status_change_keeps_feeds(self):
+        job = self.reload(create_job(self.client_user, self.property, status='in_progress'))
+        job.status = 'completed'
+        self.assertFalse(_job_feeds_changed(job, created=False))
+
+    def test_leaving_open_set_changes_feeds(self):
+        job = self.reload(create_job(self.client_user, self.property))
+        job.status = 'bid_accepted'
+        self.assertTrue(_job_feeds_changed(job, created=False))
+
+    def test_open_job_scoring_field_changes_feeds(self):
+        job = self.reload(create_job(self.client_user, self.property))
+        job.notes = 'Ring twice'
+        self.assertFalse(_job_feeds_changed(job, created=False))
+
+        job.client_budget = Decimal('120.00')
+        self.assertTrue(_job_feeds_changed(job, created=False))
+
+    def test_property_save_invalidates_its_open_jobs(self):
+        open_job = create_job(self.client_user, self.property)
+        closed_job = create_job(self.client_user, self.property, status='completed')
+
+        with mock.patch('recommendations.signals.RecommendationCache') as recommendation_cache:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.property.city = 'Patras'
+                self.property.save()
+
+        invalidated = recommendation_cache.invalidate_job.call_args_list
+        self.assertIn(mock.call(open_job.id), invalidated)
+        self.assertIn(mock.call(None, pool=True), invalidated)
+        self.assertNotIn(mock.call(closed_job.id), invalidated)
+
+
+class ClientHistoryTests(TestCase):
+    """Grouped client-history aggregate of recommend_cleaners_for_location"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.home = create_property(self.client_user)
+        self.office = create_property(self.client_user, city='Piraeus')
+        self.other_property = create_property(create_user('other@example.com', 'client'))
+        self.cleaners = [create_user(f'cleaner{number}@example.com', 'cleaner') for number in range(4)]
+
+    def history_job(self, cleaner, property_obj, scheduled_date, rating=None, review='', status='completed'):
+        job = create_job(property_obj.owner, property_obj, status=status)
+        CleaningJob.objects.filter(pk=job.pk).update(
+            cleaner=cleaner, scheduled_date=scheduled_date, client_rating=rating, client_review=review,
+        )
+        return job
+
+    def test_history_is_grouped_per_cleaner(self):
+        from recommendations.views import _get_client_history_bulk
+
+        regular, newcomer, stranger, same_day = self.cleaners
+        self.history_job(regular, self.home, date(2030, 1, 10), rating=3)
+        last_visit = self.history_job(regular, self.office, date(2030, 2, 1), rating=5, review='Spotless')
+        self.history_job(regular, self.home, date(2030, 3, 1), status='in_progress')
+        self.history_job(stranger, self.other_property, date(2030, 1, 10), rating=5)
+        self.history_job(same_day, self.home, date(2030, 1, 20))
+        newest_same_day = self.history_job(same_day, self.office, date(2030, 1, 20))
+
+        with self.assertNumQueries(2):
+            history = _get_client_history_bulk(self.client_user, self.cleaners)
+
+        self.assertEqual(set(history), {regular.id, same_day.id})
+        self.assertEqual(history[regular.id]['previous_jobs'], 2)
+        self.assertEqual(history[regular.id]['avg_rating'], 4)
+        self.assertEqual(history[regular.id]['last_job'], last_visit)
+        self.assertEqual(history[regular.id]['last_job'].property.city, 'Piraeus')
+        self.assertEqual(history[same_day.id]['previous_jobs'], 2)
+        self.assertIsNone(history[same_day.id]['avg_rating'])
+        self.assertEqual(history[same_day.id]['last_job'], newest_same_day)
+
+    def test_client_without_history_costs_one_query(self):
+        from recommendations.views import _get_client_history_bulk
+
+        with self.assertNumQueries(1):
+            self.assertEqual(_get_client_history_bulk(self.client_user, self.cleaners), {})
+
+
+class CleanerStatsSignalTests(TestCase):
+    """CleanerStats rows follow job and review changes through signals"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.cleaner = create_user('cleaner@example.com', 'cleaner')
+        self.property = create_property(self.client_user)
+
+    def stats(self, cleaner):
+        return CleanerStats.objects.get(cleaner=cleaner)
+
+    def assign_job(self, cleaner, status='completed'):
+        job = create_job(self.client_user, self.property)
+        job.cleaner = cleaner
+        job.status = status
+        job.save()
+        return job
+
+    def test_job_save_refreshes_stats_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assign_job(self.cleaner)
+            self.assign_job(self.cleaner, status='confirmed')
+            self.assertFalse(CleanerStats.objects.exists())
+
+        stats = self.stats(self.cleaner)
+        self.assertEqual((stats.total_jobs, stats.assigned_jobs, stats.completed_jobs), (2, 2, 1))
+        self.assertEqual(stats.completion_rate, 0.5)
+
+    def test_reassigned_job_refreshes_previous_cleaner(self):
+        other_cleaner = create_user('other@example.com', 'cleaner')
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self.assign_job(self.cleaner)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.cleaner = other_cleaner
+            job.save()
+
+        self.assertEqual(self.stats(self.cleaner).completed_jobs, 0)
+        self.assertEqual(self.stats(other_cleaner).completed_jobs, 1)
+
+    def test_reviews_and_ratings_refresh_averages(self):
+        job = self.assign_job(self.cleaner)
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(
+                job=job, reviewer=self.client_user, reviewee=self.cleaner, overall_rating=8, comment='Great',
+            )
+            ReviewRating.objects.create(review=review, category='quality', rating=6)
+
+        stats = self.stats(self.cleaner)
+        self.assertEqual((stats.review_count, stats.avg_rating, stats.avg_quality), (1, 8.0, 6.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.is_visible = False
+            review.save()
+
+        stats = self.stats(self.cleaner)
+        self.assertEqual((stats.review_count, stats.visible_review_count), (1, 0))
+        self.assertIsNone(stats.avg_quality)
+
+    def test_client_reviews_do_not_create_rows(self):
+        job = self.assign_job(self.cleaner)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                job=job, reviewer=self.cleaner, reviewee=self.client_user, overall_rating=9, comment='Kind',
+            )
+
+        self.assertFalse(CleanerStats.objects.filter(cleaner=self.client_user).exists())
+
+    def test_missing_row_is_computed_without_saving(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assign_job(self.cleaner)
+        CleanerStats.objects.all().delete()
+
+        cleaner = User.objects.get(pk=self.cleaner.pk)
+        self.assertEqual(CleanerStatsService.get_stats(cleaner).completed_jobs, 1)
+        self.assertEqual(CleanerStatsService.get_stats_for_cleaners([cleaner])[cleaner.id].completed_jobs, 1)
+        self.assertFalse(CleanerStats.objects.exists())
+
+
+class RecommendationTrackerTests(TestCase):
+    """Buffering, dedupe and bulk flushing of RecommendationTracker"""
+
+    def setUp(self):
+        self.tracker = RecommendationTracker()
+        # No flusher thread: rows stay buffered until the test flushes
+        flusher_patcher = mock.patch.object(self.tracker, '_ensure_flusher')
+        flusher_patcher.start()
+        self.addCleanup(flusher_patcher.stop)
+
+        client_user = create_user('client@example.com', 'client')
+        self.job = create_job(client_user, create_property(client_user))
+        self.cleaners = [create_user(f'cleaner{number}@example.com', 'cleaner') for number in range(3)]
+
+    def recommendation(self, cleaner, score):
+        breakdown = {'location': 80.0, 'pricing': 70.0, 'specialization': 60.0, 'availability': 50.0}
+        return {'cleaner': cleaner, 'score': score, 'breakdown': breakdown}
+
+    def test_flush_writes_first_impression_of_each_pair(self):
+        first, second, third = self.cleaners
+        self.tracker.track_job_recommendations(self.job, [
+            self.recommendation(first, 90.5), self.recommendation(second, 80),
+        ])
+        self.tracker.track_job_recommendations(self.job, [
+            self.recommendation(third, 70), self.recommendation(first, 60),
+        ])
+        self.assertFalse(JobRecommendation.objects.exists())
+
+        with mock.patch.object(
+            JobRecommendation.objects, 'bulk_create', wraps=JobRecommendation.objects.bulk_create
+        ) as bulk_create:
+            self.assertEqual(self.tracker.flush(), 3)
+
+        self.assertEqual(bulk_create.call_count, 1)
+        rows = {row.cleaner_id: row for row in JobRecommendation.objects.filter(job=self.job)}
+        self.assertEqual(set(rows), {cleaner.id for cleaner in self.cleaners})
+        self.assertEqual(rows[first.id].recommendation_score, Decimal('90.50'))
+        self.assertEqual(rows[first.id].recommendation_rank, 1)
+        self.assertEqual(rows[third.id].recommendation_rank, 1)
+        self.assertEqual(self.tracker.flush(), 0)
+
+    def test_existing_rows_are_kept(self):
+        self.tracker.track_job_recommendations(self.job, [self.recommendation(self.cleaners[0], 90)])
+        self.tracker.flush()
+
+        self.tracker.track_job_recommendations(self.job, [self.recommendation(self.cleaners[0], 40)])
+        self.tracker.flush()
+
+        self.assertEqual(JobRecommendation.objects.get().recommendation_score, Decimal('90.00'))
+
+    @override_settings(RECOMMENDATION_TRACKING_CONFIG={'flush_size': 2})
+    def test_flush_size_wakes_the_flusher(self):
+        self.tracker.track_job_recommendations(self.job, [self.recommendation(self.cleaners[0], 90)])
+        self.assertFalse(self.tracker._wakeup.is_set())
+
+        self.tracker.track_job_recommendations(self.job, [self.recommendation(self.cleaners[1], 80)])
+        self.assertTrue(self.tracker._wakeup.is_set())
+
+    def test_failed_flush_is_logged_and_dropped(self):
+        self.tracker.track_job_recommendations(self.job, [self.recommendation(self.cleaners[0], 90)])
+
+        with mock.patch.object(JobRecommendation.objects, 'bulk_create', side_effect=RuntimeError('database down')):
+            with self.assertLogs('recommendations.services.recommendation_tracker', level='ERROR'):
+                self.assertEqual(self.tracker.flush(), 0)
+
+        self.assertEqual(self.tracker.flush(), 0)
+        self.assertFalse(JobRecommendation.objects.exists())
+
+
+class MarkDirtyTests(TestCase):
+    """Deferred DirtyCleanerMetric writes in ScoringService.mark_dirty"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.cleaner = create_user('cleaner@example.com', 'cleaner')
+
+    def dirty_metrics(self, cleaner_id):
+        return set(DirtyCleanerMetric.objects.filter(cleaner_id=cleaner_id).values_list('metric', flat=True))
+
+    def test_metrics_are_written_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringService.mark_dirty(self.cleaner.id, 'bid')
+            self.assertEqual(self.dirty_metrics(self.cleaner.id), set())
+
+        self.assertEqual(self.dirty_metrics(self.cleaner.id), {'bidding'})
+
+    def test_missing_cleaner_is_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringService.mark_dirty(self.cleaner.id + 1000, 'review')
+
+        self.assertFalse(DirtyCleanerMetric.objects.exists())
+
+    def test_cleaner_can_be_deleted_with_bids_and_reviews(self):
+        job = create_job(self.client_user, create_property(self.client_user), status='completed')
+        JobBid.objects.create(
+            job=job, cleaner=self.cleaner, bid_amount=Decimal('75.00'), estimated_duration=timedelta(hours=3),
+        )
+        Review.objects.create(job=job, reviewer=self.client_user, reviewee=self.cleaner, overall_rating=9)
+        cleaner_id = self.cleaner.id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cleaner.delete()
+
+        self.assertFalse(User.objects.filter(pk=cleaner_id).exists())
+        self.assertEqual(self.dirty_metrics(cleaner_id), set())
+
+
+class MarketPriceDeltaTests(TestCase):
+    """Running market price totals maintained by the JobBid signals"""
+
+    def setUp(self):
+        self.client_user = create_user('client@example.com', 'client')
+        self.job = create_job(self.client_user, create_property(self.client_user))
+        # Keep bid notifications off the event outbox worker
+        outbox_patcher = mock.patch('cleaning_jobs.signals.event_outbox')
+        outbox_patcher.start()
+        self.addCleanup(outbox_patcher.stop)
+
+    def create_bid(self, email, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return JobBid.objects.create(
+                job=self.job, cleaner=create_user(email, 'cleaner'),
+                bid_amount=Decimal(amount), estimated_duration=timedelta(hours=3),
+            )
+
+    def bucket(self):
+        return MarketPriceService.lookup('apartment', 0)
+
+    def test_bids_adjust_count_and_average(self):
+        self.create_bid('a@example.com', '60.00')
+        bid = self.create_bid('b@example.com', '100.00')
+        self.assertEqual((self.bucket().bid_count, self.bucket().avg_bid_amount), (2, Decimal('80.00')))
+
+        bid.bid_amount = Decimal('140.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            bid.save()
+        self.assertEqual(self.bucket().avg_bid_amount, Decimal('100.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bid.delete()
+        self.assertEqual((self.bucket().bid_count, self.bucket().avg_bid_amount), (1, Decimal('60.00')))
+        self.assertTrue(self.bucket().percentiles_stale)
+
+    def test_stale_buckets_get_percentiles(self):
+        self.create_bid('a@example.com', '60.00')
+        self.create_bid('b@example.com', '100.00')
+
+        self.assertEqual(MarketPriceService.refresh_stale_buckets(), {'buckets': 1})
+
+        entry = self.bucket()
+        self.assertFalse(entry.percentiles_stale)
+        self.assertEqual(entry.median_bid_amount, Decimal('80.00'))
+        self.assertEqual(entry.bid_amount_sum, Decimal('160.00'))
+
+    def test_job_cascade_delete_skips_per_bid_updates(self):
+        self.create_bid('a@example.com', '60.00')
+
+        with mock.patch.object(MarketPriceService, 'bucket_for_job') as bucket_for_job:
+            self.job.delete()
+
+        bucket_for_job.assert_not_called()
+        self.assertEqual(self.bucket().bid_count, 1)
+        MarketPriceService.rebuild_index()
+        self.assertEqual(self.bucket().bid_count, 0)
+
+
+class ScheduledDurationFeatureTests(SimpleTestCase):
+    """estimated_duration_hours comes from the job's own time window"""
+
+    def test_duration_from_start_and_end_time(self):
+        self.assertEqual(FeatureStore._scheduled_hours(time(9, 0), time(12, 30)), 3.5)
+
+    def test_window_past_midnight(self):
+        self.assertEqual(FeatureStore._scheduled_hours(time(22, 0), time(1, 0)), 3.0)
+
+    def test_missing_end_time_is_zero(self):
+        self.assertEqual(FeatureStore._scheduled_hours(time(9, 0), None), 0.0)
+
+
+class NNDatasetTests(SimpleTestCase):
+    """On-disk nn_data format of recommendations.services.nn_dataset"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dataset = NNDataset(Path(directory.name))
+        self.features = np.arange(15, dtype=np.float64).reshape(5, 3) / 7
+
+    def test_split_round_trip_through_memory_maps(self):
+        writer = self.dataset.open_features_writer('train', *self.features.shape)
+        for start in range(0, 5, 2):
+            writer[start:start + 2] = self.features[start:start + 2]
+        writer.flush()
+        del writer
+        self.dataset.save_target('train', [0.1, 0.2, 0.3, 0.4, 0.5])
+
+        features, target = self.dataset.load_split('train')
+
+        self.assertIsInstance(features, np.memmap)
+        self.assertEqual((features.dtype, target.dtype), (np.float32, np.float32))
+        np.testing.assert_array_equal(features, self.features.astype(np.float32))
+        np.testing.assert_allclose(target, [0.1, 0.2, 0.3, 0.4, 0.5], rtol=1e-6)
+        self.assertNotIsInstance(self.dataset.load_split('train', mmap=False)[0], np.memmap)
+
+    def test_scaler_round_trip_and_transform(self):
+        self.dataset.save_scaler([1.0, 2.0, 3.0], [2.0, 4.0, 0.5], ['a', 'b', 'c'])
+
+        scaler = self.dataset.load_scaler()
+
+        self.assertEqual(scaler['feature_columns'], ['a', 'b', 'c'])
+        transformed = NNDataset.transform([[3.0, 6.0, 3.5]], scaler)
+        self.assertEqual(transformed.dtype, np.float32)
+        np.testing.assert_array_equal(transformed, [[1.0, 1.0, 1.0]])
+
+    def test_ensure_float32_rewrites_other_dtypes_once(self):
+        self.dataset.directory.mkdir(parents=True, exist_ok=True)
+        np.save(self.dataset.features_path('val'), self.features)
+
+        self.assertTrue(self.dataset.ensure_float32('val', chunk_rows=2))
+        self.assertFalse(self.dataset.ensure_float32('val', chunk_rows=2))
+
+        features = np.load(self.dataset.features_path('val'))
+        self.assertEqual(features.dtype, np.float32)
+        np.testing.assert_array_equal(features, self.features.astype(np.float32))
+        self.assertEqual([path.name for path in self.dataset.directory.iterdir()], ['val_features.npy'])
+
+    def test_missing_config_is_empty(self):
+        self.assertEqual(self.dataset.load_config(), {})
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    """Segment storage and lookups of recommendations.services.embedding_cache"""
+
+    MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def vectors(self, texts):
+        return np.array([[len(text), text.count('a'), 1.0] for text in texts], dtype=np.float32)
+
+    def test_missing_add_fill_and_compact_round_trip(self):
+        cache = EmbeddingCache(self.directory, self.MODEL)
+        self.assertEqual(cache.missing(['clean', 'fast', 'clean']), ['clean', 'fast'])
+        cache.add(['clean', 'fast'], self.vectors(['clean', 'fast']))
+
+        cache.add(cache.missing(['fast', 'great value']), self.vectors(['great value']))
+        self.assertEqual(cache.missing(['clean', 'fast', 'great value']), [])
+
+        texts = ['great value', 'clean', 'great value', 'fast']
+        expected = self.vectors(texts)
+        np.testing.assert_array_equal(cache.fill(texts, np.zeros((4, 3), dtype=np.float32)), expected)
+
+        cache.compact()
+        reopened = EmbeddingCache(self.directory, self.MODEL)
+        self.assertEqual((len(reopened), reopened.dim), (3, 3))
+        self.assertEqual(sorted(path.name for path in reopened.directory.iterdir()), [
+            'segment_00000.npy', 'segment_00000_keys.npy',
+        ])
+        np.testing.assert_array_equal(reopened.fill(texts, np.zeros((4, 3), dtype=np.float32)), expected)
+
+    def test_keys_depend_on_model(self):
+        cache = EmbeddingCache(self.directory, self.MODEL)
+        cache.add(['clean'], self.vectors(['clean']))
+
+        self.assertEqual(EmbeddingCache(self.directory, 'other-model').missing(['clean']), ['clean'])
+
+    def test_dimension_mismatch_is_rejected(self):
+        cache = EmbeddingCache(self.directory, self.MODEL)
+        cache.add(['clean'], self.vectors(['clean']))
+
+        with self.assertRaises(ValueError):
+            cache.add(['fast'], np.zeros((1, 4)))
+
+    def test_segment_without_keys_file_is_ignored(self):
+        cache = EmbeddingCache(self.directory, self.MODEL)
+        cache.add(['clean'], self.vectors(['clean']))
+        # An interrupted run wrote vectors but never its keys file
+        np.save(cache.directory / 'segment_00001.npy', self.vectors(['fast']))
+
+        reopened = EmbeddingCache(self.directory, self.MODEL)
+
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened.missing(['clean', 'fast']), ['fast'])
+
+
+class CleanerEmbeddingIndexTests(SimpleTestCase):
+    """Top-K retrieval of recommendations.services.embedding_index"""
+
+    def setUp(self):
+        self.index = CleanerEmbeddingIndex(
+            cleaner_ids=[30, 10, 20, 40],
+            cleaner_vectors=[[2.0, 0.0], [0.0, 3.0], [1.0, 1.0], [-1.0, 0.0]],
+            client_ids=[7, 8],
+            client_vectors=[[5.0, 0.0], [0.0, 1.0]],
+            backend='numpy',
+        )
+
+    def assert_top(self, result, expected):
+        self.assertEqual([cleaner_id for cleaner_id, _ in result], [cleaner_id for cleaner_id, _ in expected])
+        np.testing.assert_allclose([score for _, score in result], [score for _, score in expected], atol=1e-6)
+
+    def test_top_cleaners_by_cosine_similarity(self):
+        self.assert_top(self.index.top_cleaners(7, 2), [(30, 1.0), (20, 0.7071068)])
+        self.assert_top(self.index.top_cleaners(8, 1), [(10, 1.0)])
+
+    def test_k_larger_than_index_returns_everything_sorted(self):
+        self.assert_top(self.index.top_cleaners(7, 10), [(30, 1.0), (20, 0.7071068), (10, 0.0), (40, -1.0)])
+
+    def test_allowed_cleaners_restrict_the_result(self):
+        self.assert_top(self.index.top_cleaners(7, 5, allowed_cleaner_ids={10, 40, 99}), [(10, 0.0), (40, -1.0)])
+        self.assertEqual(self.index.top_cleaners(7, 5, allowed_cleaner_ids=[]), [])
+
+    def test_membership(self):
+        np.testing.assert_array_equal(self.index.contains([10, 15, 40, 99]), [True, False, True, False])
+        self.assertTrue(self.index.has_client(7))
+        self.assertFalse(self.index.has_client(30))
+
+    def test_save_and_load_round_trip(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'hybrid_embeddings.npz'
+
+        self.index.save(path)
+        loaded = CleanerEmbeddingIndex.load(path, backend='numpy')
+
+        self.assertEqual(len(loaded), 4)
+        self.assert_top(loaded.top_cleaners(7, 4), self.index.top_cleaners(7, 4))
+
+
+@unittest.skipUnless(TORCH_AVAILABLE, 'PyTorch not installed')
+class QuantizedExportTests(SimpleTestCase):
+    """Accuracy gate of ModelManager.export_quantized / load_quantized"""
+
+    def setUp(self):
+        import torch
+        from recommendations.services.ml_models import HybridRecommendationModel, ModelManager
+
+        torch.manual_seed(0)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.manager = ModelManager(model_dir=Path(directory.name))
+        self.manager.device = torch.device('cpu')
+        self.checkpoint_path = Path(directory.name) / 'hybrid_recommendation_v1.0.pt'
+        self.model = HybridRecommendationModel(num_clients=5, num_cleaners=7).eval()
+        self.probe = (
+            torch.randint(5, (64,)),
+            torch.randint(7, (64,)),
+            torch.randint(4, (64,)),
+            torch.rand(64, NUM_FEATURES),
+        )
+
+    @override_settings(RECOMMENDATION_QUANTIZATION_CONFIG={'max_delta': 0.05})
+    def test_accepted_variant_stays_close_to_float_model(self):
+        import torch
+
+        report = self.manager.export_quantized(self.model, self.checkpoint_path, self.probe)
+
+        self.assertTrue(report['accepted'])
+        self.assertEqual(report['probe_size'], 64)
+        self.assertLessEqual(report['mean_abs_delta'], report['max_abs_delta'])
+        self.assertLessEqual(report['max_abs_delta'], 0.05)
+
+        quantized = self.manager.load_quantized(self.checkpoint_path, {'quantized': report})
+        self.assertIsNotNone(quantized)
+        with torch.no_grad():
+            expected, _ = self.model(*self.probe)
+            scores, _ = quantized(*self.probe)
+        # The saved variant reproduces the delta measured at export time
+        self.assertAlmostEqual(float((scores - expected).abs().max()), report['max_abs_delta'], places=5)
+
+    def test_rejected_variant_is_removed_and_not_served(self):
+        with override_settings(RECOMMENDATION_QUANTIZATION_CONFIG={'max_delta': 0.05}):
+            self.manager.export_quantized(self.model, self.checkpoint_path, self.probe)
+        self.assertTrue(self.manager.quantized_path(self.checkpoint_path).exists())
+
+        with override_settings(RECOMMENDATION_QUANTIZATION_CONFIG={'max_delta': -1.0}):
+            with self.assertLogs('recommendations.services.ml_models', level='WARNING'):
+                report = self.manager.export_quantized(self.model, self.checkpoint_path, self.probe)
+
+        self.assertFalse(report['accepted'])
+        self.assertFalse(self.manager.quantized_path(self.checkpoint_path).exists())
+        self.assertIsNone(self.manager.load_quantized(self.checkpoint_path, {'quantized': report}))
+
+
+@unittest.skipUnless(TORCH_AVAILABLE, 'PyTorch not installed')
+class TrainHybridModelTests(SimpleTestCase):
+    """Batching edge cases of ml_models.train_hybrid_model"""
+
+    def make_data(self, num_samples):
+        rng = np.random.default_rng(0)
+        return {
+            'client_ids': rng.integers(0, 3, num_samples),
+            'cleaner_ids': rng.integers(0, 4, num_samples),
+            'property_types': rng.integers(0, 3, num_samples),
+            'features': rng.random((num_samples, NUM_FEATURES), dtype=np.float32),
+            'labels': rng.random(num_samples, dtype=np.float32),
+            'num_clients': 3,
+            'num_cleaners': 4,
+        }
+
+    def test_single_sample_remainder_batch_is_skipped(self):
+        from recommendations.services.ml_models import train_hybrid_model
+
+        # 9 samples in batches of 4 leaves a batch of one, which BatchNorm rejects in train mode
+        model = train_hybrid_model(self.make_data(9), self.make_data(4), num_epochs=2, batch_size=4)
+
+        self.assertIsNotNone(model)
+
+    def test_single_training_sample_is_rejected(self):
+        from recommendations.services.ml_models import train_hybrid_model
+
+        with self.assertRaises(ValueError):
+            train_hybrid_model(self.make_data(1), self.make_data(4), num_epochs=1, batch_size=4)
@@ -8,7 +8,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Avg, Count
+from django.db.models import Q, Avg, Count, Max
 import logging
 
 from users.serializers import UserSerializer
@@ -122,10 +122,8 @@ def recommend_cleaners_for_location(request):
     
     logger.info('Location search without job context - using hybrid scoring (distance + quality)')
     
-    # Get stats for all eligible cleaners
-    cleaner_stats = {}
-    for cleaner in eligible_cleaners:
-        cleaner_stats[cleaner.id] = _get_cleaner_stats(cleaner)
+    # Get stats for all eligible cleaners (grouped queries, not per cleaner)
+    cleaner_stats = _get_cleaner_stats_bulk(eligible_cleaners)
     
     # Find max values for normalization
     max_jobs = max([stats['total_jobs'] for stats in cleaner_stats.values()]) or 1
@@ -164,53 +162,40 @@ def recommend_cleaners_for_location(request):
         cleaner_scores[cleaner.id] = final_score
     
     # Boost scores for cleaners with history (check ALL client properties, not just selected one)
-    from cleaning_jobs.models import CleaningJob
-    from django.db.models import Avg, Count, Q
-    from properties.models import Property
-    
-    # Get all properties owned by the requesting client
-    client_properties = Property.objects.filter(owner=request.user)
-    
-    if client_properties.exists():
-        for cleaner in eligible_cleaners:
-            # Check if cleaner has worked at ANY of the client's properties
-            previous_jobs_query = CleaningJob.objects.filter(
-                property__in=client_properties,
-                cleaner=cleaner,
-                status='completed'
-            )
-            
-            previous_jobs_count = previous_jobs_query.count()
-            
-            if previous_jobs_count > 0:
-                # Significant boost for cleaners who've worked with this client before
-                # 25% boost for 1 job, 30% for 2+ jobs
-                history_boost = 0.25 if previous_jobs_count == 1 else 0.30
-                
-                # Apply boost to existing score (cap at 1.0)
-                original_score = cleaner_scores.get(cleaner.id, 0.0)
-                boosted_score = min(original_score + history_boost, 1.0)
-                cleaner_scores[cleaner.id] = boosted_score
-                
-                logger.info(f'Client history boost: Cleaner {cleaner.id} has cleaned {previous_jobs_count} of client\'s properties. Score: {original_score:.2f} → {boosted_score:.2f}')
+    client_history = _get_client_history_bulk(request.user, eligible_cleaners)
+    
+    for cleaner_id, history in client_history.items():
+        previous_jobs_count = history['previous_jobs']
+        
+        # Significant boost for cleaners who've worked with this client before
+        # 25% boost for 1 job, 30% for 2+ jobs
+        history_boost = 0.25 if previous_jobs_count == 1 else 0.30
+        
+        # Apply boost to existing score (cap at 1.0)
+        original_score = cleaner_scores.get(cleaner_id, 0.0)
+        boosted_score = min(original_score + history_boost, 1.0)
+        cleaner_scores[cleaner_id] = boosted_score
+        
+        logger.info(f'Client history boost: Cleaner {cleaner_id} has cleaned {previous_jobs_count} of client\'s properties. Score: {original_score:.2f} → {boosted_score:.2f}')
     
     
     # Step 4: Build response with enriched cleaner data
+    from users.serializers import ServiceAreaSerializer
+    
     recommendations = []
     for cleaner in eligible_cleaners:
         # Get cleaner stats
-        stats = _get_cleaner_stats(cleaner)
+        stats = cleaner_stats[cleaner.id]
         
         # Get ML score (or fallback score)
         ml_score = cleaner_scores.get(cleaner.id, 0.0)
         
-        # Serialize cleaner
+        # Serialize cleaner (reuses the stats row cached by _get_cleaner_stats_bulk)
         cleaner_data = UserSerializer(cleaner).data
         
-        # Add service areas
-        from users.serializers import ServiceAreaSerializer
+        # Add service areas (from the prefetched service_areas)
         cleaner_data['service_areas'] = ServiceAreaSerializer(
-            cleaner.service_areas.filter(is_active=True),
+            [area for area in cleaner.service_areas.all() if area.is_active],
             many=True
         ).data
         
@@ -222,41 +207,22 @@ def recommend_cleaners_for_location(request):
         }
         
         # Add client history metadata (check ALL client properties)
-        from cleaning_jobs.models import CleaningJob
-        from django.db.models import Avg
-        from properties.models import Property
-        
-        client_properties = Property.objects.filter(owner=request.user)
-        
-        if client_properties.exists():
-            # Get all completed jobs this cleaner did for ANY of client's properties
-            previous_jobs = CleaningJob.objects.filter(
-                property__in=client_properties,
-                cleaner=cleaner,
-                status='completed'
-            ).select_related('property').order_by('-scheduled_date')
+        history = client_history.get(cleaner.id)
+        if history:
+            last_job = history['last_job']
+            rec['previous_jobs'] = history['previous_jobs']
+            rec['last_cleaned'] = last_job.scheduled_date.isoformat()
             
-            previous_jobs_count = previous_jobs.count()
+            # Average rating from all previous jobs with this client
+            if history['avg_rating']:
+                rec['previous_rating'] = round(float(history['avg_rating']), 2)
             
-            if previous_jobs_count > 0:
-                rec['previous_jobs'] = previous_jobs_count
-                rec['last_cleaned'] = previous_jobs.first().scheduled_date.isoformat()
-                
-                # Get average rating from all previous jobs with this client
-                avg_rating = previous_jobs.aggregate(
-                    avg_rating=Avg('client_rating')
-                )['avg_rating']
-                
-                if avg_rating:
-                    rec['previous_rating'] = round(float(avg_rating), 2)
-                    
-                # Add last review if available
-                last_job = previous_jobs.first()
-                if last_job.client_review:
-                    rec['last_review'] = last_job.client_review[:150]  # Truncate for preview
-                
-                # Add which property they cleaned (for context)
-                rec['last_property_address'] = f"{last_job.property.address_line1}, {last_job.property.city}"
+            # Add last review if available
+            if last_job.client_review:
+                rec['last_review'] = last_job.client_review[:150]  # Truncate for preview
+            
+            # Add which property they cleaned (for context)
+            rec['last_property_address'] = f"{last_job.property.address_line1}, {last_job.property.city}"
         
         # Add distance if available
         if hasattr(cleaner, 'distance_miles'):
@@ -343,33 +309,70 @@ def _build_features_from_params(latitude, longitude, property_type, property_siz
     return features
 
 
-def _get_cleaner_stats(cleaner):
-    """Get performance statistics for a cleaner."""
-    from cleaning_jobs.models import CleaningJob
-    from reviews.models import Review
+def _get_cleaner_stats_bulk(cleaners):
+    """
+    Get performance statistics for many cleaners.
+    
+    Reads the materialized CleanerStats rows (one query for all cleaners);
+    the rows are cached on each cleaner so UserSerializer reuses them.
+    
+    Returns:
+        dict: {cleaner_id: {'avg_rating', 'total_jobs', 'completion_rate'}}
+    """
+    from recommendations.services.cleaner_stats import CleanerStatsService
+    
+    stats = {}
+    for cleaner_id, cleaner_stats in CleanerStatsService.get_stats_for_cleaners(cleaners).items():
+        stats[cleaner_id] = {
+            'avg_rating': round(cleaner_stats.avg_rating or 0.0, 2),
+            'total_jobs': cleaner_stats.completed_jobs,
+            'completion_rate': round(cleaner_stats.completion_rate, 2)
+        }
+    
+    return stats
+
+
+def _get_client_history_bulk(client, cleaners):
+    """
+    Get each cleaner's completed-job history across ALL of a client's properties.
+    
+    Uses one grouped aggregate (job count, average client rating, latest
+    scheduled date) plus one query for the jobs on each cleaner's latest date.
     
-    completed_jobs = CleaningJob.objects.filter(
-        cleaner=cleaner,
+    Returns:
+        dict: {cleaner_id: {'previous_jobs', 'avg_rating', 'last_job'}} for
+        cleaners with at least one completed job for the client
+    """
+    history_jobs = CleaningJob.objects.filter(
+        property__owner=client,
+        cleaner_id__in=[cleaner.id for cleaner in cleaners],
         status='completed'
     )
     
-    total_jobs = completed_jobs.count()
+    rows = list(history_jobs.values('cleaner_id').annotate(
+        previous_jobs=Count('id'),
+        avg_rating=Avg('client_rating'),
+        last_date=Max('scheduled_date')
+    ))
+    history = {
+        row['cleaner_id']: {
+            'previous_jobs': row['previous_jobs'],
+            'avg_rating': row['avg_rating'],
+            'last_job': None
+        }
+        for row in rows
+    }
     
-    # Get average rating (reviewee is the cleaner being reviewed)
-    avg_rating = Review.objects.filter(
-        reviewee=cleaner
-    ).aggregate(avg=Avg('overall_rating'))['avg'] or 0.0
+    if not history:
+        return history
     
-    # Calculate completion rate (completed / assigned)
-    assigned_jobs = CleaningJob.objects.filter(
-        cleaner=cleaner,
-        status__in=['confirmed', 'in_progress', 'completed']
-    ).count()
+    latest = Q()
+    for row in rows:
+        latest |= Q(cleaner_id=row['cleaner_id'], scheduled_date=row['last_date'])
     
-    completion_rate = total_jobs / assigned_jobs if assigned_jobs > 0 else 0.0
+    # Several jobs can share a cleaner's latest date; the newest one wins
+    for job in history_jobs.filter(latest).select_related('property').order_by('cleaner_id', '-id'):
+        if history[job.cleaner_id]['last_job'] is None:
+            history[job.cleaner_id]['last_job'] = job
     
-    return {
-        'avg_rating': round(avg_rating, 2),
-        'total_jobs': total_jobs,
-        'completion_rate': round(completion_rate, 2)
-    }
+    return history
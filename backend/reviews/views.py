@@ -179,14 +179,38 @@ class ReviewStatsView(APIView):
         """Calculate and return review statistics for a user"""
         user = get_object_or_404(User, id=user_id)
         
-        # Get all visible reviews for this user
-        reviews = Review.objects.filter(
-            reviewee=user,
-            is_visible=True
-        )
-        
-        # Count total reviews
-        total_reviews = reviews.count()
+        if user.role == 'cleaner':
+            # Cleaners read the materialized stats row
+            from recommendations.services.cleaner_stats import CleanerStatsService
+            
+            stats = CleanerStatsService.get_stats(user)
+            total_reviews = stats.visible_review_count
+            avg_overall = stats.visible_avg_rating
+            avg_quality = stats.avg_quality or 0.0
+            avg_communication = stats.avg_communication or 0.0
+            avg_professionalism = stats.avg_professionalism or 0.0
+            avg_timeliness = stats.avg_timeliness or 0.0
+        else:
+            # Get all visible reviews for this user
+            reviews = Review.objects.filter(
+                reviewee=user,
+                is_visible=True
+            )
+            
+            # Count total reviews
+            total_reviews = reviews.count()
+            
+            if total_reviews:
+                # Calculate average overall rating
+                avg_overall = reviews.aggregate(Avg('overall_rating'))['overall_rating__avg']
+                
+                # Calculate average sub-ratings
+                ratings = ReviewRating.objects.filter(review__in=reviews)
+                
+                avg_quality = ratings.filter(category='quality').aggregate(Avg('rating'))['rating__avg'] or 0.0
+                avg_communication = ratings.filter(category='communication').aggregate(Avg('rating'))['rating__avg'] or 0.0
+                avg_professionalism = ratings.filter(category='professionalism').aggregate(Avg('rating'))['rating__avg'] or 0.0
+                avg_timeliness = ratings.filter(category='timeliness').aggregate(Avg('rating'))['rating__avg'] or 0.0
         
         if total_reviews == 0:
             return Response({
@@ -201,17 +225,6 @@ class ReviewStatsView(APIView):
                 'average_timeliness': 0.0,
             })
         
-        # Calculate average overall rating
-        avg_overall = reviews.aggregate(Avg('overall_rating'))['overall_rating__avg']
-        
-        # Calculate average sub-ratings
-        ratings = ReviewRating.objects.filter(review__in=reviews)
-        
-        avg_quality = ratings.filter(category='quality').aggregate(Avg('rating'))['rating__avg'] or 0.0
-        avg_communication = ratings.filter(category='communication').aggregate(Avg('rating'))['rating__avg'] or 0.0
-        avg_professionalism = ratings.filter(category='professionalism').aggregate(Avg('rating'))['rating__avg'] or 0.0
-        avg_timeliness = ratings.filter(category='timeliness').aggregate(Avg('rating'))['rating__avg'] or 0.0
-        
         stats_data = {
             'user_id': user.id,
             'user_name': f"{user.first_name} {user.last_name}".strip() or user.username,
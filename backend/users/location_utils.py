@@ -3,9 +3,11 @@ Location-based cleaner search utilities.
 Helper functions for finding cleaners by geographic location.
 """
 
-from math import radians, cos, sin, asin, sqrt
+from django.db import connection
 from django.db.models import Q
+from core.geo import haversine, distances_from_point
 from .models import ServiceArea, User
+from .spatial_index import service_area_index
 
 
 def calculate_distance(lat1, lon1, lat2, lon2, unit='km'):
@@ -21,21 +23,95 @@ def calculate_distance(lat1, lon1, lat2, lon2, unit='km'):
     Returns:
         Distance in specified unit (km or miles)
     """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
+    return float(haversine(lat1, lon1, lat2, lon2, unit=unit))
+
+
+def get_cleaner_distances(latitude, longitude, unit='km'):
+    """
+    Find the cleaners whose radius service areas cover a location.
     
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
+    Candidate areas come from the in-memory grid index (users/spatial_index.py);
+    the exact haversine check is only run for those.
     
-    if unit == 'mi':
-        r = 3956  # Radius of earth in miles
-    else:  # default to km
-        r = 6371  # Radius of earth in kilometers
+    Args:
+        latitude (float): Latitude of the location
+        longitude (float): Longitude of the location
+        unit (str): 'km' (default) or 'mi' for miles
     
-    return c * r
+    Returns:
+        dict: {cleaner_id: distance to the nearest covering area center (in unit)}
+    """
+    cleaner_distances = {}
+    
+    # Only examine areas whose grid cells contain the location
+    areas = service_area_index.lookup(latitude, longitude)
+    if not areas:
+        return cleaner_distances
+    
+    # Distance from search location to every candidate area center at once
+    distances_km = distances_from_point(
+        latitude, longitude,
+        [area['center_latitude'] for area in areas],
+        [area['center_longitude'] for area in areas],
+        unit='km'
+    )
+    
+    for area, distance_km in zip(areas, distances_km):
+        # Check if location is within the service area radius
+        if distance_km <= area['radius_km']:
+            # Store minimum distance for this cleaner (in requested unit)
+            distance_in_unit = float(distance_km) if unit == 'km' else float(distance_km) * 0.621371
+            cleaner_id = area['cleaner_id']
+            if cleaner_id not in cleaner_distances or distance_in_unit < cleaner_distances[cleaner_id]:
+                cleaner_distances[cleaner_id] = distance_in_unit
+    
+    return cleaner_distances
+
+
+def get_cleaner_ids_by_address(city, postal_code, state=None, country='US'):
+    """
+    Find the cleaners whose city or postal-code service areas cover an address.
+    
+    Complements get_cleaner_distances, which only knows radius areas.
+    
+    Args:
+        city (str): City name
+        postal_code (str): Postal/ZIP code
+        state (str, optional): State/province; areas without a state match any
+        country (str): Country code (default: US)
+    
+    Returns:
+        set: IDs of cleaners with a matching active city or postal-code area
+    """
+    areas = ServiceArea.objects.filter(
+        is_active=True,
+        country__iexact=country,
+        cleaner__role='cleaner',
+        cleaner__is_active=True
+    )
+    cleaner_ids = set()
+    
+    if city:
+        city_query = Q(area_type='city', city__iexact=city)
+        if state:
+            city_query &= Q(state__isnull=True) | Q(state='') | Q(state__iexact=state)
+        cleaner_ids.update(areas.filter(city_query).values_list('cleaner_id', flat=True))
+    
+    if postal_code:
+        postal_areas = areas.filter(area_type='postal_codes')
+        if connection.features.supports_json_field_contains:
+            cleaner_ids.update(
+                postal_areas.filter(postal_codes__contains=[postal_code])
+                .values_list('cleaner_id', flat=True)
+            )
+        else:
+            cleaner_ids.update(
+                cleaner_id
+                for cleaner_id, postal_codes in postal_areas.values_list('cleaner_id', 'postal_codes')
+                if postal_code in (postal_codes or [])
+            )
+    
+    return cleaner_ids
 
 
 def find_cleaners_by_location(latitude, longitude, max_radius=50, unit='km'):
@@ -51,43 +127,11 @@ def find_cleaners_by_location(latitude, longitude, max_radius=50, unit='km'):
     Returns:
         list: Cleaners who service this location, sorted by distance
     """
-    # Convert radius to km if provided in miles
-    max_radius_km = max_radius if unit == 'km' else max_radius * 1.60934
-    
-    # Find all radius-based service areas
-    radius_areas = ServiceArea.objects.filter(
-        is_active=True,
-        area_type='radius',
-        center_latitude__isnull=False,
-        center_longitude__isnull=False,
-        radius_miles__isnull=False
-    ).select_related('cleaner')
-    
-    matching_cleaners = set()
-    cleaner_distances = {}
-    
-    for area in radius_areas:
-        # Convert service area radius from miles to km (DB stores in miles)
-        area_radius_km = float(area.radius_miles) * 1.60934
-        
-        # Calculate distance from search location to service area center
-        distance_km = calculate_distance(
-            latitude, longitude,
-            area.center_latitude, area.center_longitude,
-            unit='km'
-        )
-        
-        # Check if location is within the service area radius
-        if distance_km <= area_radius_km:
-            matching_cleaners.add(area.cleaner_id)
-            # Store minimum distance for this cleaner (in requested unit)
-            distance_in_unit = distance_km if unit == 'km' else distance_km * 0.621371
-            if area.cleaner_id not in cleaner_distances or distance_in_unit < cleaner_distances[area.cleaner_id]:
-                cleaner_distances[area.cleaner_id] = distance_in_unit
+    cleaner_distances = get_cleaner_distances(latitude, longitude, unit=unit)
     
     # Get cleaners and add distance info
     cleaners = User.objects.filter(
-        id__in=matching_cleaners,
+        id__in=cleaner_distances.keys(),
         role='cleaner',
         is_active=True
     ).prefetch_related('service_areas')
@@ -293,21 +293,15 @@ class ServiceArea(models.Model):
             self.center_latitude, self.center_longitude, self.radius_miles
         ]):
             # Calculate distance using Haversine formula
-            from math import radians, cos, sin, asin, sqrt
+            from core.geo import haversine
             
-            # Convert to radians
-            lat1, lon1 = radians(float(latitude)), radians(float(longitude))
-            lat2, lon2 = radians(float(self.center_latitude)), radians(float(self.center_longitude))
+            distance = float(haversine(
+                latitude, longitude,
+                self.center_latitude, self.center_longitude,
+                unit='mi'
+            ))
             
-            # Haversine formula
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            r = 3956  # Radius of earth in miles
-            distance = c * r
-            
-            return distance <= self.radius_miles
+            return distance <= float(self.radius_miles)
         
         # For other area types, return True for now
         # (can be enhanced with more complex geographic checks)
@@ -11,6 +11,7 @@ from django.db.models import Avg, Count, Q
 from users.models import User
 from cleaning_jobs.models import CleaningJob
 from reviews.models import Review, ReviewRating
+from recommendations.services.cleaner_stats import CleanerStatsService
 
 
 class CleanerPublicProfileView(APIView):
@@ -108,69 +109,29 @@ class CleanerPublicProfileView(APIView):
         
         profile_data['client_history'] = client_history
         
-        # Job stats
-        completed_jobs = CleaningJob.objects.filter(
-            cleaner=cleaner,
-            status='completed'
-        )
+        # Job and review stats (materialized per cleaner)
+        stats = CleanerStatsService.get_stats(cleaner)
         
         profile_data['job_stats'] = {
-            'total_completed': completed_jobs.count(),
-            'total_jobs': CleaningJob.objects.filter(cleaner=cleaner).count(),
+            'total_completed': stats.completed_jobs,
+            'total_jobs': stats.total_jobs,
         }
         
-        # Review stats
-        reviews = Review.objects.filter(
-            reviewee=cleaner,
-            is_visible=True
-        ).prefetch_related('ratings')
-        
-        if reviews.exists():
-            # Overall average
-            avg_overall = reviews.aggregate(Avg('overall_rating'))['overall_rating__avg']
-            
-            # Sub-rating averages
-            quality_avg = ReviewRating.objects.filter(
-                review__in=reviews,
-                category='quality'
-            ).aggregate(Avg('rating'))['rating__avg'] or 0
-            
-            communication_avg = ReviewRating.objects.filter(
-                review__in=reviews,
-                category='communication'
-            ).aggregate(Avg('rating'))['rating__avg'] or 0
-            
-            professionalism_avg = ReviewRating.objects.filter(
-                review__in=reviews,
-                category='professionalism'
-            ).aggregate(Avg('rating'))['rating__avg'] or 0
-            
-            timeliness_avg = ReviewRating.objects.filter(
-                review__in=reviews,
-                category='timeliness'
-            ).aggregate(Avg('rating'))['rating__avg'] or 0
-            
-            profile_data['review_stats'] = {
-                'total_reviews': reviews.count(),
-                'overall_average': round(avg_overall, 1) if avg_overall else 0,
-                'sub_ratings': {
-                    'quality': round(quality_avg, 1),
-                    'communication': round(communication_avg, 1),
-                    'professionalism': round(professionalism_avg, 1),
-                    'timeliness': round(timeliness_avg, 1),
-                }
-            }
-        else:
-            profile_data['review_stats'] = {
-                'total_reviews': 0,
-                'overall_average': 0,
-                'sub_ratings': {
-                    'quality': 0,
-                    'communication': 0,
-                    'professionalism': 0,
-                    'timeliness': 0,
-                }
+        profile_data['review_stats'] = {
+            'total_reviews': stats.visible_review_count,
+            'overall_average': round(stats.visible_avg_rating, 1) if stats.visible_avg_rating else 0,
+            'sub_ratings': {
+                'quality': round(stats.avg_quality or 0, 1),
+                'communication': round(stats.avg_communication or 0, 1),
+                'professionalism': round(stats.avg_professionalism or 0, 1),
+                'timeliness': round(stats.avg_timeliness or 0, 1),
             }
+        }
+        
+        completed_jobs = CleaningJob.objects.filter(
+            cleaner=cleaner,
+            status='completed'
+        )
         
         # Eco-impact (if available)
         eco_metrics = completed_jobs.exclude(
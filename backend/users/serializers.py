@@ -82,44 +82,28 @@ class UserSerializer(serializers.ModelSerializer):
         if obj.role != 'cleaner':
             return None
         
-        try:
-            from django.db.models import Avg
-            from reviews.models import Review
-            
-            avg_rating = Review.objects.filter(reviewee=obj).aggregate(
-                avg=Avg('overall_rating')
-            )['avg']
-            
-            return round(avg_rating, 1) if avg_rating else None
-        except ImportError:
-            # Reviews app not available
-            return None
+        from recommendations.services.cleaner_stats import CleanerStatsService
+        
+        avg_rating = CleanerStatsService.get_stats(obj).avg_rating
+        return round(avg_rating, 1) if avg_rating else None
     
     def get_reviews_count(self, obj):
         """Get total number of reviews (for cleaners)."""
         if obj.role != 'cleaner':
             return None
         
-        try:
-            from reviews.models import Review
-            return Review.objects.filter(reviewee=obj).count()
-        except ImportError:
-            # Reviews app not available
-            return 0
+        from recommendations.services.cleaner_stats import CleanerStatsService
+        
+        return CleanerStatsService.get_stats(obj).review_count
     
     def get_jobs_completed(self, obj):
         """Get total completed jobs (for cleaners)."""
         if obj.role != 'cleaner':
             return None
         
-        try:
-            from cleaning_jobs.models import CleaningJob
-            return CleaningJob.objects.filter(
-                cleaner=obj,
-                status='completed'
-            ).count()
-        except ImportError:
-            return 0
+        from recommendations.services.cleaner_stats import CleanerStatsService
+        
+        return CleanerStatsService.get_stats(obj).completed_jobs
     
     def validate_first_name(self, value):
         """Validate first name format."""
@@ -0,0 +1,41 @@
+"""
+Signals for users and service areas
+
+Keeps the in-memory service area index in sync with the database.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.db import transaction
+from .models import ServiceArea
+from .spatial_index import service_area_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ServiceArea)
+def service_area_post_save(sender, instance, **kwargs):
+    """Update the spatial index when a service area is created or changed."""
+    transaction.on_commit(lambda: _update_index(instance))
+
+
+@receiver(post_delete, sender=ServiceArea)
+def service_area_post_delete(sender, instance, **kwargs):
+    """Remove a deleted service area from the spatial index."""
+    area_id = instance.pk
+    transaction.on_commit(lambda: _remove_from_index(area_id))
+
+
+def _update_index(area):
+    try:
+        service_area_index.update_area(area)
+    except Exception as e:
+        logger.error(f"Error updating service area index for area {area.pk}: {e}", exc_info=True)
+
+
+def _remove_from_index(area_id):
+    try:
+        service_area_index.remove_area(area_id)
+    except Exception as e:
+        logger.error(f"Error removing area {area_id} from service area index: {e}", exc_info=True)
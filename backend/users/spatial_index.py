@@ -0,0 +1,231 @@
+"""
+In-memory spatial index for radius-based service areas.
+
+Service areas are bucketed into a regular latitude/longitude grid: each area
+is registered in every cell its bounding box overlaps, so a point lookup only
+examines the areas registered in the query point's cell instead of every
+active area in the database.
+
+The index is built lazily once per process and kept in sync by ServiceArea
+signals (see users/signals.py). Other processes notice changes through a
+version counter stored in the Django cache and rebuild on their next lookup;
+this relies on the default cache being shared between processes (Redis, see
+CACHES in settings). With a per-process cache, such as LocMemCache, changes
+made elsewhere (management commands, Celery workers, other web workers)
+are only seen after a restart.
+"""
+
+import math
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+
+# Kilometers per degree of latitude (approximately constant)
+KM_PER_DEGREE = 111.32
+
+# Service area radii are stored in miles
+KM_PER_MILE = 1.60934
+
+
+class SpatialGrid:
+    """
+    Grid of keyed circles (center + radius) for fast point/range lookups.
+    
+    Not thread-safe on its own; owners are expected to hold a lock.
+    """
+    
+    def __init__(self, cell_size_degrees=0.1):
+        self.cell_size = cell_size_degrees
+        self._cells = defaultdict(set)  # (row, col) -> {key}
+        self._item_cells = {}           # key -> [(row, col), ...]
+    
+    def __len__(self):
+        return len(self._item_cells)
+    
+    def cell_for(self, latitude, longitude):
+        """Grid cell containing a point."""
+        return (
+            math.floor(float(latitude) / self.cell_size),
+            math.floor(float(longitude) / self.cell_size),
+        )
+    
+    def cells_for_circle(self, latitude, longitude, radius_km):
+        """All grid cells overlapping the bounding box of a circle."""
+        latitude, longitude = float(latitude), float(longitude)
+        delta_lat = radius_km / KM_PER_DEGREE
+        delta_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        
+        min_row, min_col = self.cell_for(latitude - delta_lat, longitude - delta_lng)
+        max_row, max_col = self.cell_for(latitude + delta_lat, longitude + delta_lng)
+        
+        return [
+            (row, col)
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ]
+    
+    def insert(self, key, latitude, longitude, radius_km):
+        """Register (or move) a circle under `key`."""
+        self.remove(key)
+        cells = self.cells_for_circle(latitude, longitude, radius_km)
+        for cell in cells:
+            self._cells[cell].add(key)
+        self._item_cells[key] = cells
+    
+    def remove(self, key):
+        """Unregister `key` if present."""
+        for cell in self._item_cells.pop(key, []):
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+    
+    def query_point(self, latitude, longitude):
+        """Keys whose bounding box may contain the point."""
+        return set(self._cells.get(self.cell_for(latitude, longitude), ()))
+    
+    def query_circle(self, latitude, longitude, radius_km):
+        """Keys whose bounding box may intersect the circle."""
+        keys = set()
+        for cell in self.cells_for_circle(latitude, longitude, radius_km):
+            keys.update(self._cells.get(cell, ()))
+        return keys
+    
+    def clear(self):
+        self._cells.clear()
+        self._item_cells.clear()
+
+
+class ServiceAreaIndex:
+    """
+    Process-local grid index over active radius service areas.
+    
+    Usage:
+        for area in service_area_index.lookup(latitude, longitude):
+            area['cleaner_id'], area['center_latitude'], area['radius_km'], ...
+    
+    Lookups return candidate areas only; callers still apply the exact
+    distance check.
+    """
+    
+    VERSION_CACHE_KEY = 'users:service_area_index:version'
+    
+    def __init__(self, cell_size_degrees=None):
+        self.cell_size_degrees = cell_size_degrees
+        self._grid = None
+        self._areas = {}      # area_id -> area dict
+        self._version = None  # Cache version this process last synced with
+        self._lock = threading.RLock()
+    
+    def lookup(self, latitude, longitude):
+        """
+        Get candidate service areas whose grid cells contain a point.
+        
+        Returns:
+            list of dicts with area_id, cleaner_id, center_latitude,
+            center_longitude and radius_km
+        """
+        with self._lock:
+            self._ensure_current()
+            return [self._areas[area_id] for area_id in self._grid.query_point(latitude, longitude)]
+    
+    def update_area(self, area):
+        """Insert, move or drop a single area after it was saved."""
+        with self._lock:
+            if self._grid is not None:
+                if self._is_indexable(area):
+                    self._add(area)
+                else:
+                    self._remove(area.pk)
+            self._bump_version()
+    
+    def remove_area(self, area_id):
+        """Drop an area after it was deleted."""
+        with self._lock:
+            if self._grid is not None:
+                self._remove(area_id)
+            self._bump_version()
+    
+    def invalidate(self):
+        """
+        Force every process to rebuild on next lookup.
+        Use after bulk changes that bypass model signals (bulk_create, update()).
+        """
+        with self._lock:
+            self._grid = None
+            self._bump_version()
+    
+    def rebuild(self):
+        """Load all active radius service areas into a fresh grid."""
+        from .models import ServiceArea
+        
+        with self._lock:
+            # Read the version first so changes made during the load trigger another rebuild
+            version = cache.get(self.VERSION_CACHE_KEY, 0)
+            
+            cell_size = self.cell_size_degrees or getattr(settings, 'SERVICE_AREA_INDEX_CELL_DEGREES', 0.1)
+            self._grid = SpatialGrid(cell_size)
+            self._areas = {}
+            
+            areas = ServiceArea.objects.filter(
+                is_active=True,
+                area_type='radius',
+                center_latitude__isnull=False,
+                center_longitude__isnull=False,
+                radius_miles__isnull=False
+            ).only('id', 'cleaner_id', 'center_latitude', 'center_longitude', 'radius_miles',
+                   'area_type', 'is_active')
+            
+            for area in areas:
+                self._add(area)
+            
+            self._version = version
+    
+    def _ensure_current(self):
+        if self._grid is None or cache.get(self.VERSION_CACHE_KEY, 0) != self._version:
+            self.rebuild()
+    
+    def _bump_version(self):
+        cache.add(self.VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            new_version = cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            # Key evicted between add() and incr()
+            cache.set(self.VERSION_CACHE_KEY, 1, timeout=None)
+            new_version = 1
+        
+        # Only skip the rebuild if no other process changed areas in between
+        if self._version is not None and new_version == self._version + 1:
+            self._version = new_version
+        else:
+            self._grid = None
+    
+    def _is_indexable(self, area):
+        return (
+            area.is_active
+            and area.area_type == 'radius'
+            and area.center_latitude is not None
+            and area.center_longitude is not None
+            and area.radius_miles is not None
+        )
+    
+    def _add(self, area):
+        entry = {
+            'area_id': area.pk,
+            'cleaner_id': area.cleaner_id,
+            'center_latitude': float(area.center_latitude),
+            'center_longitude': float(area.center_longitude),
+            'radius_km': float(area.radius_miles) * KM_PER_MILE,
+        }
+        self._areas[area.pk] = entry
+        self._grid.insert(area.pk, entry['center_latitude'], entry['center_longitude'], entry['radius_km'])
+    
+    def _remove(self, area_id):
+        self._areas.pop(area_id, None)
+        self._grid.remove(area_id)
+
+
+# Global service area index instance
+service_area_index = ServiceAreaIndex()
@@ -1,3 +1,48 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from users.spatial_index import KM_PER_DEGREE, SpatialGrid
+
+
+class SpatialGridTests(SimpleTestCase):
+    """Cell bookkeeping and lookups of users.spatial_index.SpatialGrid"""
+
+    def setUp(self):
+        self.grid = SpatialGrid(cell_size_degrees=0.1)
+
+    def test_point_lookup_finds_covering_circle(self):
+        self.grid.insert('athens', 37.98, 23.73, radius_km=5)
+        self.grid.insert('thessaloniki', 40.64, 22.94, radius_km=5)
+
+        self.assertEqual(self.grid.query_point(37.9755, 23.7348), {'athens'})
+        self.assertEqual(self.grid.query_point(40.64, 22.94), {'thessaloniki'})
+        self.assertEqual(self.grid.query_point(38.50, 23.73), set())
+
+    def test_circle_is_registered_in_every_overlapped_cell(self):
+        # One cell height north of the center is still inside a two-cell radius
+        self.grid.insert('wide', 37.95, 23.75, radius_km=2 * 0.1 * KM_PER_DEGREE)
+
+        self.assertEqual(self.grid.query_point(38.05, 23.75), {'wide'})
+        self.assertEqual(self.grid.query_point(37.85, 23.65), {'wide'})
+        self.assertEqual(self.grid.query_point(38.25, 23.75), set())
+
+    def test_circle_query_finds_intersecting_circles(self):
+        self.grid.insert('near', 37.98, 23.73, radius_km=1)
+        self.grid.insert('far', 40.64, 22.94, radius_km=1)
+
+        self.assertEqual(self.grid.query_circle(38.10, 23.73, radius_km=20), {'near'})
+
+    def test_reinsert_moves_circle(self):
+        self.grid.insert('area', 37.98, 23.73, radius_km=1)
+        self.grid.insert('area', 40.64, 22.94, radius_km=1)
+
+        self.assertEqual(len(self.grid), 1)
+        self.assertEqual(self.grid.query_point(37.98, 23.73), set())
+        self.assertEqual(self.grid.query_point(40.64, 22.94), {'area'})
+
+    def test_remove_drops_empty_cells(self):
+        self.grid.insert('area', 37.98, 23.73, radius_km=15)
+        self.grid.remove('area')
+        self.grid.remove('missing')
+
+        self.assertEqual(len(self.grid), 0)
+        self.assertEqual(self.grid._cells, {})